@@ -1,6 +1,9 @@
+import numpy as np
 import constants
 import config
 from utils import geometry_utils
+from track_objects import TrackStore
+from track_objects.track_store import TRACK_KEYS, NO_TEAM
 
 class BallAssigner:
     def __init__(self):
@@ -19,17 +22,41 @@ class BallAssigner:
     def assign_ball_control(self, tracks):
         """
         Determines ball possession for each frame based on player proximity to the ball.
+        Uses the vectorized engine, which gives the same result as assign_ball_control_by_frame.
 
-        :param tracks: Tracking data for all frames containing players and ball positions.
+        :param tracks: Tracking data for all frames containing players and ball positions,
+                       as a TrackStore or in the dictionary layout.
+        :return: List indicating which team has ball control for each frame.
+        """
+        return self.assign_ball_control_vectorized(tracks)
+
+    def assign_ball_control_by_frame(self, tracks):
+        """
+        Determines ball possession for each frame based on player proximity to the ball,
+        walking the frames and players one at a time.
+
+        :param tracks: Tracking data for all frames containing players and ball positions,
+                       as a TrackStore or in the dictionary layout.
         :return: List indicating which team has ball control for each frame.
         """
         team_ball_control = []
+        store = tracks if isinstance(tracks, TrackStore) else None
+        frames_number = len(store) if store is not None else len(tracks[constants.BALL_KEY])
 
-        for frame_num, ball_positions in enumerate(tracks[constants.BALL_KEY]):
-            if ball_positions:
-                ball_position = ball_positions[1][constants.BOUNDING_BOX_KEY]
-                closest_player, team_id, distance = self.get_closest_player(
-                    tracks[constants.PLAYERS_KEY][frame_num], ball_position)
+        for frame_num in range(frames_number):
+            if store is not None:
+                ball_rows = store.get_rows(frame_num, constants.BALL_KEY)
+                ball_position = store.bounding_box[ball_rows][0].tolist() if ball_rows.stop > ball_rows.start else None
+            else:
+                ball_positions = tracks[constants.BALL_KEY][frame_num]
+                ball_position = ball_positions[1][constants.BOUNDING_BOX_KEY] if ball_positions else None
+
+            if ball_position is not None:
+                if store is not None:
+                    closest_player, team_id, distance = self.get_closest_player_in_store(store, frame_num, ball_position)
+                else:
+                    closest_player, team_id, distance = self.get_closest_player(
+                        tracks[constants.PLAYERS_KEY][frame_num], ball_position)
                 
                 if closest_player is not None and distance <= self.distance_threshold:
                     if self.last_player_with_possession == closest_player:
@@ -77,3 +104,140 @@ class BallAssigner:
                 closest_team_id = player_data[constants.TEAM_KEY]
                 
         return closest_player, closest_team_id, closest_distance
+
+    def get_closest_player_in_store(self, tracks, frame_num, ball_position):
+        """
+        Finds the closest player to the ball, reading the player columns of a TrackStore directly.
+
+        :param tracks: TrackStore with the tracking data.
+        :param frame_num: The current frame number.
+        :param ball_position: The current position of the ball.
+        :return: Tuple containing the closest player ID, their team ID, and the distance to the ball.
+        """
+        rows = tracks.get_rows(frame_num, constants.PLAYERS_KEY)
+        bounding_boxes = tracks.bounding_box[rows].astype(np.float64)
+        if len(bounding_boxes) == 0 or np.isnan(ball_position[:2]).any():
+            return None, None, float('inf')
+
+        # Foot positions truncated to integers, as in geometry_utils.get_foot_position
+        foot_x = np.trunc((bounding_boxes[:, 0] + bounding_boxes[:, 2]) / 2)
+        foot_y = np.trunc(bounding_boxes[:, 3])
+        distances = ((ball_position[0] - foot_x) ** 2 + (ball_position[1] - foot_y) ** 2) ** 0.5
+
+        closest_index = int(np.argmin(distances))
+        team_id = int(tracks.team[rows][closest_index])
+        return int(tracks.track_id[rows][closest_index]), team_id or None, float(distances[closest_index])
+
+    def assign_ball_control_vectorized(self, tracks):
+        """
+        Determines ball possession for all frames at once. The closest player to the ball is found
+        for every frame in one step over padded arrays of foot positions, and the possession time
+        threshold is applied as a scan over runs of frames with the same closest player.
+        The possession state is carried over between calls, like in assign_ball_control_by_frame.
+
+        :param tracks: Tracking data for all frames containing players and ball positions,
+                       as a TrackStore or in the dictionary layout.
+        :return: List indicating which team has ball control for each frame.
+        """
+        foot_positions, player_ids, player_teams, ball_positions = self.get_frame_arrays(tracks)
+        frames_number = len(ball_positions)
+        if frames_number == 0:
+            return []
+
+        # Distance from the ball to every player's foot position; padding and missing data are infinitely far
+        distances = ((ball_positions[:, None, 0] - foot_positions[:, :, 0]) ** 2 +
+                     (ball_positions[:, None, 1] - foot_positions[:, :, 1]) ** 2) ** 0.5
+        distances[np.isnan(distances)] = np.inf
+
+        closest_index = np.argmin(distances, axis=1)
+        closest_distance = distances[np.arange(frames_number), closest_index]
+        close_frames = np.flatnonzero(closest_distance <= self.distance_threshold)
+        closest_players = player_ids[close_frames, closest_index[close_frames]]
+        closest_teams = player_teams[close_frames, closest_index[close_frames]]
+
+        # Frames with a close player form runs of the same closest player; frames without one do not break a run
+        new_run = np.empty(len(close_frames), dtype=bool)
+        if len(close_frames):
+            new_run[0] = int(closest_players[0]) != self.last_player_with_possession
+            new_run[1:] = closest_players[1:] != closest_players[:-1]
+        positions = np.arange(len(close_frames))
+        run_start = np.maximum.accumulate(np.where(new_run, positions, -1)) if len(close_frames) else positions
+        frames_with_ball = np.where(run_start >= 0, positions - run_start + 1, positions + 1 + self.frames_with_ball)
+
+        # A team takes possession in every frame where its player's run reaches the threshold
+        has_possession = frames_with_ball >= self.possession_time_threshold
+        possession_frames = close_frames[has_possession]
+        possession_teams = [None if team == NO_TEAM else team for team in closest_teams[has_possession].tolist()]
+
+        # Every frame keeps the team of the last possession frame up to it
+        last_possession = np.full(frames_number, -1, dtype=np.int64)
+        last_possession[possession_frames] = np.arange(len(possession_frames))
+        last_possession = np.maximum.accumulate(last_possession)
+        team_values = [self.last_team_with_possession] + possession_teams
+        team_ball_control = [team_values[index + 1] for index in last_possession.tolist()]
+
+        if len(close_frames):
+            self.last_player_with_possession = int(closest_players[-1])
+            self.frames_with_ball = int(frames_with_ball[-1])
+        self.last_team_with_possession = team_ball_control[-1]
+        return team_ball_control
+
+    def get_frame_arrays(self, tracks):
+        """
+        Builds padded per-frame arrays of player foot positions, IDs, and teams, and the ball position of every frame.
+        Padding players and frames without a ball are NaN, and players without a team are NO_TEAM.
+
+        :param tracks: Tracking data for all frames, as a TrackStore or in the dictionary layout.
+        :return: Tuple of foot positions (frames, players, 2), player IDs (frames, players),
+                 player teams (frames, players), and ball positions (frames, 2).
+        """
+        if isinstance(tracks, TrackStore):
+            group_offsets = tracks.group_offsets.reshape(-1)
+            player_starts = group_offsets[0:-1:len(TRACK_KEYS)][:len(tracks)]
+            player_counts = group_offsets[1::len(TRACK_KEYS)][:len(tracks)] - player_starts
+            ball_starts = group_offsets[TRACK_KEYS.index(constants.BALL_KEY)::len(TRACK_KEYS)][:len(tracks)]
+            ball_counts = group_offsets[TRACK_KEYS.index(constants.BALL_KEY) + 1::len(TRACK_KEYS)][:len(tracks)] - ball_starts
+
+            player_rows = np.flatnonzero(tracks.object_class == TRACK_KEYS.index(constants.PLAYERS_KEY))
+            player_boxes = tracks.bounding_box[player_rows].astype(np.float64)
+            player_ids, player_teams = tracks.track_id[player_rows], tracks.team[player_rows]
+            player_frames = tracks.frame[player_rows]
+            columns = player_rows - np.repeat(player_starts, player_counts)
+
+            ball_boxes = np.full((len(tracks), 4), np.nan)
+            has_ball = ball_counts > 0
+            ball_boxes[has_ball] = tracks.bounding_box[ball_starts[has_ball]]
+        else:
+            frames_number = len(tracks[constants.BALL_KEY])
+            player_frames, player_ids, player_teams, player_boxes = [], [], [], []
+            for frame_num, player_track in enumerate(tracks[constants.PLAYERS_KEY][:frames_number]):
+                for player_id, player_data in player_track.items():
+                    player_frames.append(frame_num)
+                    player_ids.append(player_id)
+                    player_teams.append(player_data.get(constants.TEAM_KEY) or NO_TEAM)
+                    player_boxes.append(player_data[constants.BOUNDING_BOX_KEY])
+            player_frames = np.array(player_frames, dtype=np.int64)
+            player_boxes = np.array(player_boxes, dtype=np.float64).reshape(-1, 4)
+            player_counts = np.bincount(player_frames, minlength=frames_number)
+            columns = np.arange(len(player_frames)) - np.repeat(np.cumsum(player_counts) - player_counts, player_counts)
+
+            ball_boxes = np.full((frames_number, 4), np.nan)
+            for frame_num, ball_track in enumerate(tracks[constants.BALL_KEY]):
+                if ball_track:
+                    ball_boxes[frame_num] = ball_track[1][constants.BOUNDING_BOX_KEY]
+
+        # Scatter the players of every frame into the rows of a padded array, with at least one padding column
+        frames_number = len(ball_boxes)
+        max_players = max(int(player_counts.max()) if frames_number else 0, 1)
+        foot_positions = np.full((frames_number, max_players, 2), np.nan)
+        padded_ids = np.full((frames_number, max_players), -1, dtype=np.int64)
+        padded_teams = np.full((frames_number, max_players), NO_TEAM, dtype=np.int64)
+
+        # Foot positions truncated to integers, as in geometry_utils.get_foot_position
+        foot_positions[player_frames, columns, 0] = np.trunc((player_boxes[:, 0] + player_boxes[:, 2]) / 2)
+        foot_positions[player_frames, columns, 1] = np.trunc(player_boxes[:, 3])
+        padded_ids[player_frames, columns] = player_ids
+        padded_teams[player_frames, columns] = player_teams
+
+        # Distances are measured from the top-left corner of the ball's bounding box, as in get_closest_player
+        return foot_positions, padded_ids, padded_teams, ball_boxes[:, :2]
@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+
+# Detector of the current worker process, created once by the pool initializer so its model is loaded once per worker
+_worker_detector = None
+
+
+def _init_worker():
+    global _worker_detector
+    from detect_objects import ObjectDetector
+
+    _worker_detector = ObjectDetector()
+
+
+def _run_job(job):
+    """
+    Analyzes one match in a worker process. Any error is caught and returned with the result,
+    so a failed match does not stop the other matches of the batch.
+
+    :param job: Dictionary with the name and paths of the match, see BatchRunner.get_jobs.
+    :return: Dictionary with the job, its status, the number of frames, the wall time, and the error if it failed.
+    """
+    start_time = time.perf_counter()
+    result = {'name': job['name'], 'video_path': job['video_path'], 'output_path': job['output_path'], 'frames': 0}
+    try:
+        from football_analyzer import FootballAnalyzer
+        from draw import ParallelRenderer
+
+        detector = _worker_detector
+        if detector is None:
+            # Jobs run in the current process when there is a single worker
+            _init_worker()
+            detector = _worker_detector
+        detector.reset()
+
+        os.makedirs(os.path.dirname(job['output_path']) or '.', exist_ok=True)
+        analyzer = FootballAnalyzer(job['video_path'], job['output_path'], job['cache_dir'], job['metrics_path'],
+                                    job['prometheus_path'], detector=detector)
+        analyzer.renderer = ParallelRenderer(workers=job['render_workers'])
+        if config.STREAMING_ENABLED:
+            analyzer.run_streaming()
+        else:
+            analyzer.run()
+
+        result.update(status='ok', frames=len(analyzer.tracks))
+    except Exception as e:
+        result.update(status='failed', error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+
+class BatchRunner:
+    def __init__(self, workers=None, output_dir=None, cache_dir=None, render_workers=None):
+        """
+        Initializes the batch runner, which analyzes many matches in a pool of worker processes.
+        Every worker loads the detection model once and reuses it for all of its matches, and
+        every match gets its own output video, cache directory, and metrics file.
+
+        :param workers: Number of matches analyzed in parallel, defaults to config.BATCH_WORKERS.
+        :param output_dir: Directory for the output videos, metrics, and summary, defaults to config.BATCH_OUTPUT_DIR.
+        :param cache_dir: Directory with one cache directory per match, defaults to config.BATCH_CACHE_DIR.
+        :param render_workers: Render processes per match, defaults to config.BATCH_RENDER_WORKERS.
+        """
+        self.workers = max(config.BATCH_WORKERS if workers is None else workers, 1)
+        self.output_dir = output_dir or config.BATCH_OUTPUT_DIR
+        self.cache_dir = cache_dir or config.BATCH_CACHE_DIR
+        self.render_workers = config.BATCH_RENDER_WORKERS if render_workers is None else render_workers
+        self.video_extensions = config.BATCH_VIDEO_EXTENSIONS
+
+    def get_jobs(self, source):
+        """
+        Lists the matches of a directory of videos or of a JSON manifest. A manifest holds a list whose
+        entries are either video paths or objects with a `video_path` and optionally a `name`,
+        `output_path`, and `cache_dir`; relative paths are relative to the manifest.
+
+        :param source: Directory of videos or path of a JSON manifest.
+        :return: List of job dictionaries with the name and paths of every match.
+        """
+        if os.path.isdir(source):
+            entries = [{'video_path': os.path.join(source, file_name)} for file_name in sorted(os.listdir(source))
+                       if file_name.lower().endswith(self.video_extensions)]
+        else:
+            with open(source, 'r') as f:
+                entries = json.load(f)
+            manifest_dir = os.path.dirname(os.path.abspath(source))
+            entries = [{'video_path': entry} if isinstance(entry, str) else dict(entry) for entry in entries]
+            for entry in entries:
+                for key in ('video_path', 'output_path', 'cache_dir'):
+                    if entry.get(key):
+                        entry[key] = os.path.join(manifest_dir, entry[key])
+
+        jobs, names = [], set()
+        for entry in entries:
+            # Matches with the same file name get a numbered name, so their outputs do not overwrite each other
+            base_name = entry.get('name') or os.path.splitext(os.path.basename(entry['video_path']))[0]
+            name, index = base_name, 1
+            while name in names:
+                index += 1
+                name = f"{base_name}_{index}"
+            names.add(name)
+
+            jobs.append({
+                'name': name,
+                'video_path': entry['video_path'],
+                'output_path': entry.get('output_path') or os.path.join(self.output_dir, f"{name}.avi"),
+                'cache_dir': entry.get('cache_dir') or os.path.join(self.cache_dir, name),
+                'metrics_path': os.path.join(self.output_dir, f"{name}_metrics.json"),
+                'prometheus_path': self.get_prometheus_path(name),
+                'render_workers': self.render_workers
+            })
+        return jobs
+
+    def get_prometheus_path(self, name):
+        """
+        Returns the Prometheus textfile of a match, next to config.METRICS_PROMETHEUS_PATH, so the
+        node exporter picks up one file per match.
+
+        :param name: Name of the match.
+        :return: Path of the textfile, or None if Prometheus metrics are disabled.
+        """
+        if not config.METRICS_PROMETHEUS_PATH:
+            return None
+        root, extension = os.path.splitext(config.METRICS_PROMETHEUS_PATH)
+        return f"{root}_{name}{extension}"
+
+    def run(self, source):
+        """
+        Analyzes all matches of a directory or manifest, prints a throughput summary, and writes it
+        to batch_summary.json in the output directory.
+
+        :param source: Directory of videos or path of a JSON manifest.
+        :return: Dictionary with the summary and the result of every match.
+        """
+        jobs = self.get_jobs(source)
+        if not jobs:
+            raise ValueError(f"No matches found in {source}.")
+
+        print(f"Analyzing {len(jobs)} matches with {self.workers} workers")
+        start_time = time.perf_counter()
+        results = []
+        if self.workers == 1:
+            for job in jobs:
+                results.append(self._report_result(_run_job(job)))
+        else:
+            from detect_objects import backends
+
+            # Export the model for the detector backend once here, instead of once in every worker
+            backends.prepare_model(config.MODEL_PATH)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)), initializer=_init_worker) as executor:
+                futures = {executor.submit(_run_job, job): job for job in jobs}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker process itself died, e.g. killed for running out of memory
+                        job = futures[future]
+                        result = {'name': job['name'], 'video_path': job['video_path'], 'output_path': job['output_path'],
+                                  'frames': 0, 'seconds': 0.0, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+                    results.append(self._report_result(result))
+
+        summary = self.get_summary(results, time.perf_counter() - start_time)
+        self.print_summary(summary)
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, 'batch_summary.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def get_summary(self, results, seconds):
+        """
+        Returns the throughput of the batch.
+
+        :param results: Result of every match, from _run_job.
+        :param seconds: Wall time of the whole batch.
+        :return: Dictionary with the number of matches done and failed, frames, wall time, throughput, and the results.
+        """
+        done = [result for result in results if result['status'] == 'ok']
+        frames_number = sum(result['frames'] for result in done)
+        return {
+            'workers': self.workers,
+            'matches': len(results),
+            'matches_done': len(done),
+            'matches_failed': len(results) - len(done),
+            'frames': frames_number,
+            'seconds': seconds,
+            'frames_per_second': frames_number / seconds if seconds > 0 else 0.0,
+            'matches_per_hour': len(done) * 3600 / seconds if seconds > 0 else 0.0,
+            'results': sorted(results, key=lambda result: result['name'])
+        }
+
+    def print_summary(self, summary):
+        """
+        Prints the result of every match and the throughput of the batch.
+
+        :param summary: Dictionary from get_summary.
+        """
+        for result in summary['results']:
+            if result['status'] == 'ok':
+                print(f"{result['name']}: {result['frames']} frames in {result['seconds']:.1f}s -> {result['output_path']}")
+            else:
+                print(f"{result['name']}: failed after {result['seconds']:.1f}s, {result['error']}")
+        print(f"Batch finished: {summary['matches_done']}/{summary['matches']} matches, {summary['frames']} frames in "
+              f"{summary['seconds']:.1f}s ({summary['frames_per_second']:.1f} frames/s, {summary['matches_per_hour']:.1f} matches/hour)")
+
+    def _report_result(self, result):
+        status = 'done' if result['status'] == 'ok' else f"failed: {result['error']}"
+        print(f"Match {result['name']} {status}")
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a directory or JSON manifest of matches in parallel.")
+    parser.add_argument('source', help="Directory of videos or JSON manifest of matches.")
+    parser.add_argument('--workers', type=int, help="Number of matches analyzed in parallel.")
+    parser.add_argument('--output-dir', help="Directory for the output videos, metrics, and summary.")
+    parser.add_argument('--cache-dir', help="Directory with one cache directory per match.")
+    args = parser.parse_args()
+
+    summary = BatchRunner(args.workers, args.output_dir, args.cache_dir).run(args.source)
+    if summary['matches_failed']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Compares the detector inference backends on frames of the configured video: throughput in frames/s
+and agreement of the detections with the PyTorch fp32 model.
+
+    python -m benchmarks.backend_benchmark --frames 100 --backends pytorch:fp32 onnx:fp32 openvino:fp32 openvino:int8
+"""
+import argparse
+import json
+import time
+import numpy as np
+import config
+from detect_objects import DetectionStore
+from detect_objects import backends
+from utils import geometry_utils, video_control_utils
+
+MATCH_IOU_THRESHOLD = 0.5  # Minimum IoU for a detection to match the reference detection of the same class
+
+
+def run_backend(frames, backend, precision, warmup_frames):
+    """
+    Detects objects on the frames with one backend and measures the throughput.
+
+    :param frames: List of frames.
+    :param backend: Inference backend.
+    :param precision: Model precision.
+    :param warmup_frames: Number of frames run before timing, so model loading and compilation are excluded.
+    :return: Tuple of the detections and the throughput in frames/s.
+    """
+    model = backends.load_model(config.MODEL_PATH, backend, precision)
+    predict = lambda batch: model.predict(batch, imgsz=config.DETECTOR_IMAGE_SIZE, conf=config.DETECTOR_CONFIDENCE_THRESHOLD, verbose=False)
+    predict(frames[:warmup_frames])
+
+    results = []
+    start_time = time.perf_counter()
+    for i in range(0, len(frames), config.DETECTOR_BATCH_SIZE):
+        results.extend(predict(frames[i:i + config.DETECTOR_BATCH_SIZE]))
+    frames_per_second = len(frames) / (time.perf_counter() - start_time)
+
+    return DetectionStore.from_ultralytics(results), frames_per_second
+
+
+def compare_detections(reference, detections):
+    """
+    Matches every detection to the best-overlapping unused reference detection of the same class in each frame.
+
+    :param reference: DetectionStore of the reference backend.
+    :param detections: DetectionStore of the compared backend.
+    :return: Dictionary with recall and precision against the reference and the mean IoU of matched boxes.
+    """
+    matched_ious, reference_number, detections_number = [], 0, 0
+    for reference_frame, frame in zip(reference, detections):
+        reference_number += len(reference_frame)
+        detections_number += len(frame)
+        if len(reference_frame) == 0 or len(frame) == 0:
+            continue
+
+        # IoU between every reference box and every compared box, ignoring pairs of different classes
+        iou = geometry_utils.pairwise_iou(np.vstack([reference_frame.xyxy, frame.xyxy]))[:len(reference_frame), len(reference_frame):]
+        iou[reference_frame.class_id[:, None] != frame.class_id[None, :]] = 0
+
+        for reference_index in np.argsort(-iou.max(axis=1)):
+            best = int(np.argmax(iou[reference_index]))
+            if iou[reference_index, best] < MATCH_IOU_THRESHOLD:
+                continue
+            matched_ious.append(iou[reference_index, best])
+            iou[:, best] = 0
+
+    return {
+        'recall': len(matched_ious) / reference_number if reference_number else 1.0,
+        'precision': len(matched_ious) / detections_number if detections_number else 1.0,
+        'mean_iou': float(np.mean(matched_ious)) if matched_ious else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and detection agreement of the detector backends.")
+    parser.add_argument('--frames', type=int, default=100, help="Number of frames from the start of the video.")
+    parser.add_argument('--warmup', type=int, default=4, help="Number of warmup frames per backend.")
+    parser.add_argument('--backends', nargs='+', default=['pytorch:fp32', 'onnx:fp32', 'openvino:fp32', 'openvino:int8'],
+                        help="Backends to compare as backend:precision; the first one is the reference.")
+    parser.add_argument('--output', help="Optional path of a JSON report.")
+    args = parser.parse_args()
+
+    frames = [frame for _, frame in zip(range(args.frames), video_control_utils.iter_video_frames(config.VIDEO_PATH))]
+    if not frames:
+        raise ValueError(f"No frames could be read from {config.VIDEO_PATH}.")
+
+    report, reference = {'video': config.VIDEO_PATH, 'frames': len(frames), 'backends': {}}, None
+    print(f"{'backend':>16} {'frames/s':>9} {'recall':>7} {'precision':>9} {'mean IoU':>8}")
+    for name in args.backends:
+        backend, precision = name.split(':')
+        detections, frames_per_second = run_backend(frames, backend, precision, args.warmup)
+        reference = detections if reference is None else reference
+
+        result = {'frames_per_second': frames_per_second, **compare_detections(reference, detections)}
+        report['backends'][name] = result
+        print(f"{name:>16} {frames_per_second:>9.2f} {result['recall']:>7.1%} {result['precision']:>9.1%} {result['mean_iou']:>8.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Checks that the batched color extractor gives the same dominant colors as the per-crop sklearn KMeans
+of TeamClassifier.extract_dominant_color, and compares their speed.
+
+The crops are synthetic player crops (field, jersey, and shorts with noise) of two teams, or the player
+crops of the first frames of the configured video with --video:
+
+    python -m benchmarks.color_extraction_check --crops 600 --threshold 40
+    python -m benchmarks.color_extraction_check --video --frames 20
+"""
+import argparse
+import time
+import numpy as np
+import config
+from classify_players import TeamClassifier
+from classify_players.color_extractor import BatchColorExtractor
+
+TEAM_COLORS = [(200, 40, 40), (240, 240, 240)]  # Jersey colors of the synthetic teams in BGR format
+SHORTS_COLOR = (30, 30, 30)
+FIELD_COLOR = (80, 170, 70)
+
+
+def make_synthetic_crops(crops_number, seed=0):
+    """
+    Builds noisy player crops of two teams, with field pixels on the sides and shorts at the bottom.
+
+    :param crops_number: Number of crops.
+    :param seed: Seed of the random generator.
+    :return: Tuple of the list of crops and the team of every crop.
+    """
+    generator = np.random.default_rng(seed)
+    crops, teams = [], generator.integers(0, 2, crops_number)
+    for team in teams:
+        height, width = generator.integers(8, 40), generator.integers(6, 24)
+        crop = np.empty((height, width, 3), dtype=np.float64)
+        crop[:] = TEAM_COLORS[team]
+        crop[int(height * generator.uniform(0.6, 0.9)):] = SHORTS_COLOR
+        field_width = generator.integers(0, width // 3 + 1)
+        crop[:, :field_width] = FIELD_COLOR
+        crop[:, width - field_width:] = FIELD_COLOR
+        crop += generator.normal(0, generator.uniform(2, 25), crop.shape)
+        crops.append(np.clip(crop, 0, 255).astype(np.uint8))
+    return crops, teams
+
+
+def get_video_crops(frames_number):
+    """
+    Returns the player crops of the first frames of the configured video, taking the player boxes from
+    the pickled tracks of the video.
+
+    :param frames_number: Number of frames to take the crops from.
+    :return: List of player crops.
+    """
+    from cache import cache_utils
+    from utils.frame_index_utils import VideoFrameReader
+
+    tracks = cache_utils.load_tracks_from_cache(config.LEGACY_CACHE_PATH)
+    if tracks is None:
+        raise ValueError(f"No pickled tracks at {config.LEGACY_CACHE_PATH}")
+
+    team_assigner = TeamClassifier()
+    crops = []
+    with VideoFrameReader(config.VIDEO_PATH) as reader:
+        for frame_num, frame in enumerate(reader.read_range(0, frames_number)):
+            for player in tracks['players'][frame_num].values():
+                crops.append(team_assigner.get_player_crop(frame, player['bounding_box']))
+    return [crop for crop in crops if crop.size]
+
+
+def team_agreement(colors, reference_colors):
+    """
+    Clusters both color sets into two teams and returns the fraction of crops put in the same team.
+
+    :param colors: Dominant colors of the batched extractor.
+    :param reference_colors: Dominant colors of the per-crop extractor.
+    :return: Agreement between 0 and 1, independent of the team numbering.
+    """
+    from sklearn.cluster import KMeans
+
+    labels = KMeans(n_clusters=2, n_init=10, random_state=0).fit_predict(colors)
+    reference_labels = KMeans(n_clusters=2, n_init=10, random_state=0).fit_predict(reference_colors)
+    agreement = np.mean(labels == reference_labels)
+    return max(agreement, 1 - agreement)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare batched and per-crop dominant color extraction.")
+    parser.add_argument('--crops', type=int, default=600, help="Number of synthetic crops")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic crops")
+    parser.add_argument('--video', action='store_true', help="Use player crops of the configured video instead")
+    parser.add_argument('--frames', type=int, default=20, help="Number of video frames to take crops from")
+    parser.add_argument('--threshold', type=int, default=40, help="Difference in BGR units reported as a mismatch")
+    args = parser.parse_args()
+
+    crops = get_video_crops(args.frames) if args.video else make_synthetic_crops(args.crops, args.seed)[0]
+    team_assigner = TeamClassifier()
+    extractor = BatchColorExtractor()
+
+    start = time.perf_counter()
+    reference_colors = np.array([
+        team_assigner.extract_dominant_color(team_assigner.remove_green_pixels(crop)) for crop in crops
+    ])
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    colors = extractor.extract_dominant_colors(crops)
+    batched_time = time.perf_counter() - start
+
+    differences = np.abs(colors - reference_colors).max(axis=1)
+    print(f"Crops: {len(crops)}")
+    print(f"Identical colors: {np.sum(differences == 0)}")
+    print(f"Max difference: {differences.max()} BGR units")
+    print(f"Differences above {args.threshold}: {np.sum(differences > args.threshold)}")
+    print(f"Team agreement: {team_agreement(colors, reference_colors):.4f}")
+    print(f"Per-crop sklearn: {reference_time:.3f}s, batched: {batched_time:.3f}s "
+          f"({reference_time / max(batched_time, 1e-9):.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
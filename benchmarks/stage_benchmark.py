@@ -0,0 +1,326 @@
+"""
+Times every stage of the pipeline on its own, on synthetic frames and tracks, so no video or model is needed.
+
+Players move in a random walk over a green pitch and the ball follows one player at a time, with gaps.
+The detector runs with a stub model that returns the synthetic boxes. Stages that work on images draw
+their frames window by window outside the timed sections, so memory stays bounded up to a full match:
+
+    python -m benchmarks.stage_benchmark --minutes 90 --image-frames 3000 --output stage_benchmark.json
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import cv2
+import numpy as np
+import config
+import constants
+from detect_objects import ObjectDetector, DetectionStore
+from track_objects import ObjectTracker, TrackStore
+from track_objects.track_store import TRACK_KEYS, NO_TEAM
+from classify_players import TeamClassifier
+from assign_ball import BallAssigner
+from calculate_possession import PossessionCalculator
+from draw import Drawer, Scoreboard
+from utils import video_control_utils
+
+STAGES = ('detector', 'tracker', 'ball_interpolation', 'team_classification', 'ball_assignment', 'possession',
+          'draw_annotations', 'scoreboard', 'save_video')
+CLASS_NAMES = {constants.BALL_CLASS_ID: constants.BALL_KEY, 1: constants.GOALKEEPER_KEY,
+               constants.PLAYER_CLASS_ID: 'player', constants.REFEREE_CLASS_ID: 'referee'}
+PITCH_COLOR = (60, 160, 80)  # BGR green of the synthetic pitch
+SAVE_VIDEO_POOL_SIZE = 64    # Distinct frames cycled through when timing video encoding
+
+
+class StubModel:
+    def __init__(self, detections):
+        """
+        Stands in for the YOLO model and returns the synthetic detections, one frame per input image, in call order.
+
+        :param detections: DetectionStore with the synthetic detections of every frame.
+        """
+        # Imported here rather than in predict, so the import time is not part of the detector timing
+        import torch
+        from ultralytics.engine.results import Results
+
+        self.torch = torch
+        self.results_class = Results
+        self.detections = detections
+        self.position = 0
+
+    def predict(self, frames, **kwargs):
+        results = []
+        for frame in frames:
+            detections = self.detections[self.position % len(self.detections)]
+            boxes = np.hstack([detections.xyxy, detections.confidence[:, None], detections.class_id[:, None]])
+            boxes = self.torch.from_numpy(boxes.astype(np.float32))
+            results.append(self.results_class(frame, path='', names=CLASS_NAMES, boxes=boxes))
+            self.position += 1
+        return results
+
+
+def reflect(values, low, high):
+    """
+    Folds values back into [low, high], so random walks bounce off the edges of the pitch.
+
+    :param values: Array of values.
+    :param low: Lower bound.
+    :param high: Upper bound.
+    :return: Array of values within the bounds.
+    """
+    period = 2 * (high - low)
+    values = (values - low) % period
+    return np.where(values > high - low, period - values, values) + low
+
+
+def generate_tracks(frames_number, players_number, referees_number, width, height, seed):
+    """
+    Generates synthetic tracks: players and referees walking randomly over the pitch, and a ball that
+    stays at the feet of one player at a time and is missing in about a tenth of the frames.
+
+    :param frames_number: Number of frames.
+    :param players_number: Number of players, split evenly into the two teams.
+    :param referees_number: Number of referees.
+    :param width: Frame width in pixels.
+    :param height: Frame height in pixels.
+    :param seed: Seed of the random generator.
+    :return: Tuple of the TrackStore with the ground-truth teams of the players and the team of every player.
+    """
+    rng = np.random.default_rng(seed)
+    scale = height / 1080
+    box_width, box_height, ball_size = 40 * scale, 90 * scale, 14 * scale
+
+    # Foot positions of all people, as a random walk per person
+    people_number = players_number + referees_number
+    start = rng.uniform([0, 0], [width - box_width, height - box_height], size=(people_number, 2))
+    steps = rng.normal(0, 3 * scale, size=(frames_number, people_number, 2))
+    corner = start[None, :, :] + np.cumsum(steps, axis=0)
+    corner[..., 0] = reflect(corner[..., 0], 0, width - box_width)
+    corner[..., 1] = reflect(corner[..., 1], 0, height - box_height)
+    people_boxes = np.concatenate([corner, corner + [box_width, box_height]], axis=2)
+
+    # The ball is at the feet of a player who changes about every two seconds
+    carrier = np.repeat(rng.integers(0, players_number, size=frames_number // 60 + 1), 60)[:frames_number]
+    feet = people_boxes[np.arange(frames_number), carrier]
+    ball_corner = np.stack([(feet[:, 0] + feet[:, 2]) / 2 + 10 * scale, feet[:, 3] - ball_size], axis=1)
+    ball_boxes = np.concatenate([ball_corner, ball_corner + ball_size], axis=1)
+    ball_visible = np.repeat(rng.random(frames_number // 10 + 1) > 0.1, 10)[:frames_number]
+
+    # Rows ordered by frame and then by class, as TrackStore expects
+    frame = np.concatenate([np.repeat(np.arange(frames_number), people_number), np.flatnonzero(ball_visible)])
+    track_id = np.concatenate([np.tile(np.arange(1, people_number + 1), frames_number), np.ones(ball_visible.sum(), dtype=int)])
+    person_class = np.where(np.arange(people_number) < players_number, TRACK_KEYS.index(constants.PLAYERS_KEY),
+                            TRACK_KEYS.index(constants.REFEREES_KEY))
+    object_class = np.concatenate([np.tile(person_class, frames_number), np.full(ball_visible.sum(), TRACK_KEYS.index(constants.BALL_KEY))])
+    bounding_box = np.concatenate([people_boxes.reshape(-1, 4), ball_boxes[ball_visible]])
+    order = np.lexsort((object_class, frame))
+
+    tracks = TrackStore(frame[order], track_id[order], object_class[order], bounding_box[order],
+                        np.full(len(order), NO_TEAM), np.zeros(len(order), dtype=bool), frames_number)
+    player_teams = np.where(np.arange(players_number) < players_number // 2, constants.HOME_TEAM_ID, constants.AWAY_TEAM_ID)
+    return tracks, player_teams
+
+
+def get_detections(tracks):
+    """
+    Converts tracks into the raw detections the detector would have produced for them.
+
+    :param tracks: The synthetic tracks.
+    :return: DetectionStore with one detection per track row.
+    """
+    class_ids = np.array([constants.PLAYER_CLASS_ID, constants.REFEREE_CLASS_ID, constants.BALL_CLASS_ID])[tracks.object_class]
+    frame_offsets = np.searchsorted(tracks.frame, np.arange(len(tracks) + 1))
+    return DetectionStore(tracks.bounding_box, np.full(len(class_ids), 0.9), class_ids, frame_offsets, CLASS_NAMES)
+
+
+def draw_frame(tracks, frame_num, width, height, player_teams):
+    """
+    Draws a synthetic frame: players as boxes in their team colors, referees, and the ball on a green pitch.
+
+    :param tracks: The synthetic tracks.
+    :param frame_num: The frame number.
+    :param width: Frame width in pixels.
+    :param height: Frame height in pixels.
+    :param player_teams: Team of every player, indexed by track ID - 1.
+    :return: The frame.
+    """
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = PITCH_COLOR
+    team_colors = {constants.HOME_TEAM_ID: config.HOME_TEAM_COLOR, constants.AWAY_TEAM_ID: config.AWAY_TEAM_COLOR}
+
+    for key in TRACK_KEYS:
+        rows = tracks.get_rows(frame_num, key)
+        for track_id, (x1, y1, x2, y2) in zip(tracks.track_id[rows].tolist(), tracks.bounding_box[rows].astype(int).tolist()):
+            if key == constants.PLAYERS_KEY:
+                color = team_colors[player_teams[track_id - 1]]
+            elif key == constants.REFEREES_KEY:
+                color = config.REFEREE_COLOR
+            else:
+                color = (255, 255, 255)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+    return frame
+
+
+def iter_frame_windows(tracks, frames_number, width, height, player_teams):
+    """
+    Draws the synthetic frames window by window, so only one window of frames is held at a time.
+
+    :param tracks: The synthetic tracks.
+    :param frames_number: Number of frames to draw from the start.
+    :param width: Frame width in pixels.
+    :param height: Frame height in pixels.
+    :param player_teams: Team of every player, indexed by track ID - 1.
+    :return: Generator of (first frame number, list of frames).
+    """
+    for start_frame in range(0, frames_number, config.STREAMING_WINDOW_SIZE):
+        stop_frame = min(start_frame + config.STREAMING_WINDOW_SIZE, frames_number)
+        yield start_frame, [draw_frame(tracks, frame_num, width, height, player_teams) for frame_num in range(start_frame, stop_frame)]
+
+
+def run_stages(stages, tracks, player_teams, image_frames_number, width, height):
+    """
+    Times every selected stage on its own.
+
+    :param stages: Names of the stages to run, from STAGES.
+    :param tracks: The synthetic tracks.
+    :param player_teams: Team of every player, indexed by track ID - 1.
+    :param image_frames_number: Number of frames used by the stages that process images.
+    :param width: Frame width in pixels.
+    :param height: Frame height in pixels.
+    :return: Dictionary mapping stage names to their frames and seconds.
+    """
+    frames_number = len(tracks)
+    results = {}
+    windows = lambda: iter_frame_windows(tracks, image_frames_number, width, height, player_teams)
+
+    def record(stage, seconds, frames):
+        results[stage] = {'frames': frames, 'seconds': seconds, 'frames_per_second': frames / seconds if seconds > 0 else None}
+        print(f"{stage:>20} {frames:>8} {seconds:>9.3f} {results[stage]['frames_per_second'] or 0:>11.1f}")
+
+    # Ground-truth teams for the stages after team classification
+    team_tracks = TrackStore(tracks.frame, tracks.track_id, tracks.object_class, tracks.bounding_box, tracks.team,
+                             tracks.has_ball, frames_number)
+    team_tracks.set_player_teams(np.arange(1, len(player_teams) + 1), player_teams,
+                                 {constants.HOME_TEAM_ID: np.array(config.HOME_TEAM_COLOR, dtype=np.float64),
+                                  constants.AWAY_TEAM_ID: np.array(config.AWAY_TEAM_COLOR, dtype=np.float64)})
+    team_ball_control = BallAssigner().assign_ball_control(team_tracks)
+    possession = PossessionCalculator().calculate_possession_series(team_ball_control)
+
+    print(f"{'stage':>20} {'frames':>8} {'seconds':>9} {'frames/s':>11}")
+    if 'detector' in stages:
+        detector = ObjectDetector()
+        detector._model = StubModel(get_detections(tracks))  # Replaces the lazily loaded YOLO model
+        seconds = 0.0
+        for start_frame, window in windows():
+            start_time = time.perf_counter()
+            detector.detect_objects_with_stride(window, start_frame)
+            seconds += time.perf_counter() - start_time
+        record('detector', seconds, image_frames_number)
+
+    if 'tracker' in stages:
+        detections, tracker = get_detections(tracks), ObjectTracker()
+        tracker.tracker  # Loads ByteTrack before the timing starts
+        start_time = time.perf_counter()
+        tracker.track_objects(detections, frames_number)
+        record('tracker', time.perf_counter() - start_time, frames_number)
+
+    if 'ball_interpolation' in stages:
+        ball_positions = tracks.get_track_list(constants.BALL_KEY)
+        start_time = time.perf_counter()
+        ObjectTracker().interpolate_ball_positions(ball_positions)
+        record('ball_interpolation', time.perf_counter() - start_time, frames_number)
+
+    if 'team_classification' in stages:
+        team_assigner, seconds = TeamClassifier(), 0.0
+        for start_frame, window in windows():
+            window_tracks = tracks.to_tracks(start_frame, start_frame + len(window))
+            start_time = time.perf_counter()
+            team_assigner.assign_teams_to_players(window_tracks, window)
+            seconds += time.perf_counter() - start_time
+        record('team_classification', seconds, image_frames_number)
+
+    if 'ball_assignment' in stages:
+        start_time = time.perf_counter()
+        BallAssigner().assign_ball_control(team_tracks)
+        record('ball_assignment', time.perf_counter() - start_time, frames_number)
+
+    if 'possession' in stages:
+        possession_calculator = PossessionCalculator()
+        start_time = time.perf_counter()
+        possession_calculator.calculate_possession_series(team_ball_control)
+        possession_calculator.calculate_possession(team_ball_control)
+        record('possession', time.perf_counter() - start_time, frames_number)
+
+    if 'draw_annotations' in stages:
+        drawer, seconds = Drawer(), 0.0
+        home_team_color, away_team_color = np.array(config.HOME_TEAM_COLOR), np.array(config.AWAY_TEAM_COLOR)
+        for start_frame, window in windows():
+            start_time = time.perf_counter()
+            for frame_num, frame in enumerate(window, start_frame):
+                drawer.draw_annotations(frame_num, frame, team_tracks, team_ball_control, possession[0][frame_num], possession[1][frame_num],
+                                        possession[2][frame_num], possession[3][frame_num], home_team_color, away_team_color)
+            seconds += time.perf_counter() - start_time
+        record('draw_annotations', seconds, image_frames_number)
+
+    if 'scoreboard' in stages:
+        scoreboard, seconds = Scoreboard(), 0.0
+        for start_frame, window in windows():
+            start_time = time.perf_counter()
+            for frame_num, frame in enumerate(window, start_frame):
+                scoreboard.draw(frame, possession[2][frame_num], possession[3][frame_num], possession[0][frame_num], possession[1][frame_num])
+            seconds += time.perf_counter() - start_time
+        record('scoreboard', seconds, image_frames_number)
+
+    if 'save_video' in stages:
+        pool = [draw_frame(tracks, frame_num, width, height, player_teams) for frame_num in range(min(SAVE_VIDEO_POOL_SIZE, frames_number))]
+        with tempfile.TemporaryDirectory() as output_dir:
+            start_time = time.perf_counter()
+            video_control_utils.save_video_stream((pool[i % len(pool)] for i in range(image_frames_number)),
+                                                  os.path.join(output_dir, 'benchmark.avi'))
+            record('save_video', time.perf_counter() - start_time, image_frames_number)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic frames and tracks.")
+    parser.add_argument('--frames', type=int, default=1800, help="Number of frames.")
+    parser.add_argument('--minutes', type=float, help="Length in minutes of match time at config.FRAME_RATE; overrides --frames.")
+    parser.add_argument('--image-frames', type=int, help="Number of frames used by stages that process images, defaults to all frames.")
+    parser.add_argument('--players', type=int, default=22, help="Number of players.")
+    parser.add_argument('--referees', type=int, default=3, help="Number of referees.")
+    parser.add_argument('--width', type=int, default=1920, help="Frame width in pixels.")
+    parser.add_argument('--height', type=int, default=1080, help="Frame height in pixels.")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help="Stages to run.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data.")
+    parser.add_argument('--output', help="Optional path of a JSON report.")
+    args = parser.parse_args()
+
+    frames_number = int(args.minutes * 60 * config.FRAME_RATE) if args.minutes else args.frames
+    image_frames_number = frames_number if args.image_frames is None else min(args.image_frames, frames_number)
+    if frames_number < config.INITIALIZATION_FRAMES or args.players < 2:
+        raise ValueError(f"At least {config.INITIALIZATION_FRAMES} frames and 2 players are needed.")
+
+    start_time = time.perf_counter()
+    tracks, player_teams = generate_tracks(frames_number, args.players, args.referees, args.width, args.height, args.seed)
+    print(f"Generated {frames_number} frames of synthetic tracks in {time.perf_counter() - start_time:.2f}s")
+
+    report = {
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'frames': frames_number,
+        'image_frames': image_frames_number,
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'opencv': cv2.__version__,
+                        'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+        'stages': run_stages(args.stages, tracks, player_teams, image_frames_number, args.width, args.height)
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
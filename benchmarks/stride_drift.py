@@ -0,0 +1,87 @@
+"""
+Reports how far the possession statistics drift when the detector only runs on every n-th frame.
+
+Strided detection is simulated from the raw detections of a full run (read from the detections cache,
+or computed and cached once), so the model runs at most once for all strides:
+
+    python -m benchmarks.stride_drift --strides 2 3 5 10 --output stride_drift.json
+"""
+import argparse
+import json
+import config
+from football_analyzer import FootballAnalyzer
+from track_objects import ObjectTracker, TrackStore
+from classify_players import TeamClassifier
+from assign_ball import BallAssigner
+from calculate_possession import PossessionCalculator
+from utils import video_control_utils
+
+
+def get_full_detections(analyzer):
+    """
+    Returns the detections of every frame of the configured video, running the detector if they are not cached.
+
+    :param analyzer: FootballAnalyzer for the configured video and model.
+    :return: DetectionStore with detections on every frame.
+    """
+    analyzer.detector.stride = 1
+    detections_cache_path = analyzer.get_detections_cache_path()
+    detections = analyzer.detector.get_cached_detections(detections_cache_path)
+    if detections is None:
+        detections = analyzer.detect_with_checkpoints(detections_cache_path)
+    return detections
+
+
+def compute_team_ball_control(video_path, detections, stride, window_size):
+    """
+    Runs tracking, team assignment, and ball assignment as if the detector had only run on every stride-th frame.
+
+    :param video_path: Path to the video, decoded in windows for team colors.
+    :param detections: DetectionStore with detections on every frame.
+    :param stride: Number of frames between detected frames.
+    :param window_size: Number of frames decoded at once.
+    :return: List indicating which team has ball control for each frame.
+    """
+    tracker = ObjectTracker(stride)
+    tracks = TrackStore.from_tracks(tracker.track_objects(detections.with_stride(stride), len(detections)))
+    tracks = tracker.smooth_ball_track(tracker.interpolate_skipped_frames(tracks))
+
+    team_assigner = TeamClassifier()
+    frames = video_control_utils.iter_video_frames(video_path)
+    for start_frame, window in video_control_utils.iter_frame_windows(frames, window_size):
+        team_assigner.collect_track_samples(tracks.to_tracks(start_frame, start_frame + len(window)), window)
+    team_assigner.assign_teams_from_track_samples(tracks)
+
+    return BallAssigner().assign_ball_control(tracks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Possession drift of strided detection against detection on every frame.")
+    parser.add_argument('--strides', type=int, nargs='+', default=[2, 3, 5, 10], help="Detection strides to compare.")
+    parser.add_argument('--output', help="Optional path of a JSON report.")
+    args = parser.parse_args()
+
+    analyzer = FootballAnalyzer()
+    detections = get_full_detections(analyzer)
+    reference_ball_control = compute_team_ball_control(analyzer.video_path, detections, 1, config.STREAMING_WINDOW_SIZE)
+
+    possession_calculator = PossessionCalculator()
+    report = {'video': analyzer.video_path, 'frames': len(detections), 'strides': {}}
+    print(f"{'stride':>6} {'model frames':>12} {'final drift':>11} {'max drift':>9} {'agreement':>9}")
+    for stride in args.strides:
+        team_ball_control = compute_team_ball_control(analyzer.video_path, detections, stride, config.STREAMING_WINDOW_SIZE)
+        drift = possession_calculator.compare_possession(reference_ball_control, team_ball_control)
+        drift['model_frames'] = int(detections.with_stride(stride).detected.sum())
+        report['strides'][stride] = drift
+
+        print(f"{stride:>6} {drift['model_frames']:>12} {drift['final_possession_drift']:>+10.2f}% "
+              f"{drift['max_possession_drift']:>8.2f}% {drift['ball_control_agreement']:>9.1%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
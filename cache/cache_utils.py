@@ -1,20 +1,18 @@
 import pickle
 import os
+import json
+import shutil
+import hashlib
+import numpy as np
 
-def save_tracks_to_cache(tracks, cache_path):
-    """
-    Save tracking data to cache file.
-    """
-    try:
-        with open(cache_path, 'wb') as f:
-            pickle.dump(tracks, f)
-        print(f"Tracks saved to cache at {cache_path}")
-    except (OSError, IOError) as e:
-        print(f"Error saving tracks to cache: {e}")
+# Version of the on-disk array cache format; entries written with another version are ignored
+CACHE_FORMAT_VERSION = 1
+MANIFEST_FILE_NAME = 'manifest.json'
+FILE_HASHES_FILE_NAME = 'file_hashes.json'
 
 def load_tracks_from_cache(cache_path):
     """
-    Load tracking data from cache file.
+    Load tracking data in the dictionary layout from a pickle file written by earlier versions.
     """
     try:
         print(f"Loading tracks from cache: {cache_path}")
@@ -25,3 +23,146 @@ def load_tracks_from_cache(cache_path):
     except (OSError, IOError, pickle.UnpicklingError) as e:
         print(f"Error loading tracks from cache: {e}")
         return None
+
+def compute_file_hash(file_path, cache_dir=None, chunk_size=1 << 20):
+    """
+    Compute a content hash of a file. When a cache directory is given, hashes are
+    remembered there by path, size and modification time so large videos are hashed once.
+    """
+    stat = os.stat(file_path)
+    file_key = os.path.abspath(file_path)
+    file_hashes = {}
+    hashes_path = os.path.join(cache_dir, FILE_HASHES_FILE_NAME) if cache_dir else None
+
+    if hashes_path and os.path.exists(hashes_path):
+        try:
+            with open(hashes_path, 'r') as f:
+                file_hashes = json.load(f)
+        except (OSError, IOError, ValueError):
+            file_hashes = {}
+
+    known = file_hashes.get(file_key)
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        return known['hash']
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    file_hash = digest.hexdigest()
+
+    if hashes_path:
+        file_hashes[file_key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': file_hash}
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temporary_path = f"{hashes_path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'w') as f:
+                json.dump(file_hashes, f, indent=2)
+            os.replace(temporary_path, hashes_path)
+        except (OSError, IOError) as e:
+            print(f"Error saving file hashes: {e}")
+
+    return file_hash
+
+def build_cache_key(file_hashes, settings):
+    """
+    Build a cache key from the hashes of the input files and the settings that affect the cached result.
+    """
+    key_data = json.dumps({
+        'version': CACHE_FORMAT_VERSION,
+        'files': file_hashes,
+        'settings': settings
+    }, sort_keys=True)
+    return hashlib.blake2b(key_data.encode('utf-8'), digest_size=16).hexdigest()
+
+def get_cache_entry_path(cache_dir, name, cache_key):
+    """
+    Get the directory of a cache entry.
+    """
+    return os.path.join(cache_dir, f"{name}-{cache_key}")
+
+def get_checkpoint_path(entry_path):
+    """
+    Get the directory holding the partial results of a cache entry that is still being computed.
+    """
+    return f"{entry_path}.partial"
+
+def list_checkpoint_chunks(checkpoint_path):
+    """
+    List the completed chunk entries of a checkpoint directory in order.
+    Chunks are numbered from zero, and only the unbroken sequence from the start is returned.
+    """
+    chunk_paths = []
+    while True:
+        chunk_path = get_checkpoint_chunk_path(checkpoint_path, len(chunk_paths))
+        if not os.path.exists(os.path.join(chunk_path, MANIFEST_FILE_NAME)):
+            return chunk_paths
+        chunk_paths.append(chunk_path)
+
+def get_checkpoint_chunk_path(checkpoint_path, chunk_index):
+    """
+    Get the entry directory of one chunk in a checkpoint directory.
+    """
+    return os.path.join(checkpoint_path, f"chunk-{chunk_index:06d}")
+
+def remove_cache_entry(entry_path):
+    """
+    Remove a cache entry or checkpoint directory.
+    """
+    shutil.rmtree(entry_path, ignore_errors=True)
+
+def save_arrays_to_cache(arrays, entry_path, metadata=None):
+    """
+    Save a dictionary of NumPy arrays, such as the columns of a track store, as a cache entry.
+    Every array is written to its own .npy file so it can be memory-mapped when loaded.
+    The entry is written to a temporary directory first and renamed into place when complete.
+    """
+    temporary_path = f"{entry_path}.{os.getpid()}.tmp"
+    try:
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        os.makedirs(temporary_path)
+
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary_path, f"{name}.npy"), np.asarray(array), allow_pickle=False)
+
+        manifest = {
+            'version': CACHE_FORMAT_VERSION,
+            'arrays': sorted(arrays),
+            'metadata': metadata or {}
+        }
+        with open(os.path.join(temporary_path, MANIFEST_FILE_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        shutil.rmtree(entry_path, ignore_errors=True)
+        os.replace(temporary_path, entry_path)
+        print(f"Arrays saved to cache at {entry_path}")
+    except (OSError, IOError) as e:
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        print(f"Error saving arrays to cache: {e}")
+
+def load_arrays_from_cache(entry_path, mmap_mode='c'):
+    """
+    Load a dictionary of NumPy arrays from a cache entry. Arrays are memory-mapped,
+    so only the parts that are accessed are read from disk. The default copy-on-write
+    mode allows in-memory changes without modifying the cache.
+    """
+    manifest_path = os.path.join(entry_path, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != CACHE_FORMAT_VERSION:
+            print(f"Ignoring cache at {entry_path} with format version {manifest.get('version')}")
+            return None
+
+        arrays = {
+            name: np.load(os.path.join(entry_path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in manifest['arrays']
+        }
+        print(f"Arrays loaded from cache at {entry_path}")
+        return arrays
+    except (OSError, IOError, ValueError, KeyError) as e:
+        print(f"Error loading arrays from cache: {e}")
+        return None
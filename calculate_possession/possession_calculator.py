@@ -8,6 +8,15 @@ class PossessionCalculator:
         Initializes the PossessionCalculator with the frame rate from the configuration.
         """
         self.frame_rate = config.FRAME_RATE
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the running possession counters used by update.
+        """
+        self.frames_counted = 0
+        self.home_team_frames = 0
+        self.away_team_frames = 0
 
     def calculate_possession(self, team_ball_control):
         """
@@ -29,3 +38,96 @@ class PossessionCalculator:
         away_team_possession = 100 - home_team_possession  # Ensures total is always 100%
 
         return home_team_time, away_team_time, home_team_possession, away_team_possession
+
+    def update(self, team_id):
+        """
+        Adds one frame of ball control to the running counters and returns the possession
+        statistics up to and including that frame in constant time.
+
+        :param team_id: Team in control of the ball for the frame, or None.
+        :return: Tuple containing home team possession time, away team possession time,
+                 home team possession percentage, and away team possession percentage.
+        """
+        self.frames_counted += 1
+        if team_id == constants.HOME_TEAM_ID:
+            self.home_team_frames += 1
+        elif team_id == constants.AWAY_TEAM_ID:
+            self.away_team_frames += 1
+
+        return self._possession_from_counts(self.home_team_frames, self.away_team_frames, self.frames_counted)
+
+    def calculate_possession_series(self, team_ball_control):
+        """
+        Calculates the running possession statistics for every frame in one vectorized pass.
+        Entry i of each array equals calculate_possession(team_ball_control[:i + 1]).
+
+        :param team_ball_control: List indicating which team has ball control for each frame.
+        :return: Tuple of arrays containing home team possession time, away team possession time,
+                 home team possession percentage, and away team possession percentage per frame.
+        """
+        team_ball_control = np.asarray(team_ball_control, dtype=object)
+
+        # Prefix sums of frames controlled by each team
+        home_team_frames = np.cumsum(team_ball_control == constants.HOME_TEAM_ID)
+        away_team_frames = np.cumsum(team_ball_control == constants.AWAY_TEAM_ID)
+        total_frames = np.arange(1, len(team_ball_control) + 1)
+
+        home_team_time = home_team_frames / self.frame_rate
+        away_team_time = away_team_frames / self.frame_rate
+        total_time = total_frames / self.frame_rate
+
+        # Same operation order as calculate_possession so the rounding matches exactly
+        home_team_possession = np.round(home_team_time / total_time * 100).astype(int)
+        away_team_possession = 100 - home_team_possession
+
+        return home_team_time, away_team_time, home_team_possession, away_team_possession
+
+    def compare_possession(self, reference_ball_control, team_ball_control):
+        """
+        Measures how far the possession statistics of a run drift from a reference run over the same frames,
+        e.g. strided detection against detection on every frame.
+
+        :param reference_ball_control: Ball control per frame of the reference run.
+        :param team_ball_control: Ball control per frame of the compared run.
+        :return: Dictionary with the final, maximum, and mean absolute drift of the home team possession
+                 in percentage points, the final drift of both possession times in seconds, and the
+                 fraction of frames in which both runs agree on ball control.
+        """
+        if len(reference_ball_control) != len(team_ball_control) or len(team_ball_control) == 0:
+            raise ValueError("Both runs must cover the same, non-empty range of frames.")
+
+        reference_home_time, reference_away_time, _, _ = self.calculate_possession_series(reference_ball_control)
+        home_time, away_time, _, _ = self.calculate_possession_series(team_ball_control)
+        total_time = np.arange(1, len(team_ball_control) + 1) / self.frame_rate
+
+        # Drift of the unrounded home team possession percentage after every frame
+        possession_drift = (home_time - reference_home_time) / total_time * 100
+        agreement = np.asarray(reference_ball_control, dtype=object) == np.asarray(team_ball_control, dtype=object)
+
+        return {
+            'final_possession_drift': float(possession_drift[-1]),
+            'max_possession_drift': float(np.abs(possession_drift).max()),
+            'mean_possession_drift': float(np.abs(possession_drift).mean()),
+            'home_team_time_drift': float(home_time[-1] - reference_home_time[-1]),
+            'away_team_time_drift': float(away_time[-1] - reference_away_time[-1]),
+            'ball_control_agreement': float(agreement.mean())
+        }
+
+    def _possession_from_counts(self, home_team_frames, away_team_frames, total_frames):
+        """
+        Converts frame counts into possession times and percentages.
+
+        :param home_team_frames: Number of frames controlled by the home team.
+        :param away_team_frames: Number of frames controlled by the away team.
+        :param total_frames: Total number of frames.
+        :return: Tuple containing home team possession time, away team possession time,
+                 home team possession percentage, and away team possession percentage.
+        """
+        total_time = total_frames / self.frame_rate
+        home_team_time = np.float64(home_team_frames) / self.frame_rate
+        away_team_time = np.float64(away_team_frames) / self.frame_rate
+
+        home_team_possession = round((home_team_time / total_time) * 100) if total_time > 0 else 50
+        away_team_possession = 100 - home_team_possession
+
+        return home_team_time, away_team_time, home_team_possession, away_team_possession
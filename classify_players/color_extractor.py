@@ -0,0 +1,232 @@
+import numpy as np
+import config
+
+# Field colors removed before estimating the dominant color, in BGR format
+LOWER_GREEN = np.array([50, 150, 50])
+UPPER_GREEN = np.array([120, 190, 100])
+
+# KMeans settings of TeamClassifier.extract_dominant_color, which the batched extractor reproduces
+KMEANS_RANDOM_STATE = 42
+KMEANS_TOLERANCE = 1e-4
+KMEANS_LOCAL_TRIALS = 2  # k-means++ candidates per center, 2 + int(log(2)) as in sklearn
+TIE_TOLERANCE = 1e-9  # Relative distance difference below which a pixel is labeled exactly as sklearn rounds it
+
+
+class BatchColorExtractor:
+    def __init__(self):
+        """
+        Initializes the batched color extractor, which estimates the dominant color of many player crops
+        at once. Every crop is clustered like sklearn's KMeans(n_clusters=2, init="k-means++", n_init=1,
+        random_state=42) in TeamClassifier.extract_dominant_color: the same k-means++ seeding per crop,
+        then Lloyd iterations run for all crops in one NumPy pass until each crop has converged.
+        """
+        self.batch_size = config.COLOR_EXTRACTION_BATCH_SIZE
+        self.max_iterations = config.COLOR_EXTRACTION_MAX_ITERATIONS
+
+    def remove_green_pixels(self, pixels):
+        """
+        Sets field-colored pixels to black, like TeamClassifier.remove_green_pixels does for one image.
+
+        :param pixels: Array of BGR pixels with shape (n, 3).
+        :return: Pixels with green pixels set to zero.
+        """
+        green = np.all((pixels >= LOWER_GREEN) & (pixels <= UPPER_GREEN), axis=1)
+        pixels = pixels.copy()
+        pixels[green] = 0
+        return pixels
+
+    def extract_dominant_colors(self, images):
+        """
+        Extracts the dominant color of every image, processing the images in batches.
+
+        :param images: List of BGR images, e.g. the central parts of player bounding boxes.
+        :return: Array of dominant colors in BGR format with shape (len(images), 3).
+        """
+        colors = np.zeros((len(images), 3), dtype=int)
+        for start in range(0, len(images), self.batch_size):
+            batch = images[start:start + self.batch_size]
+            colors[start:start + len(batch)] = self._extract_batch(batch)
+        return colors
+
+    def _extract_batch(self, images):
+        """
+        Runs green removal and two-cluster KMeans for a batch of images. As in sklearn, the pixels of every
+        image are centered on their mean before clustering, and the dominant cluster is the larger one,
+        the first cluster on ties. Images with fewer than two pixels, which sklearn cannot cluster, get
+        the color of their pixel or black.
+
+        :param images: List of BGR images.
+        :return: Array of dominant colors in BGR format with shape (len(images), 3).
+        """
+        colors = np.zeros((len(images), 3), dtype=int)
+        pixel_counts = np.array([image.shape[0] * image.shape[1] for image in images], dtype=np.int64)
+        if pixel_counts.sum() == 0:
+            return colors
+
+        pixels = np.concatenate([image.reshape(-1, 3) for image in images])
+        pixels = self.remove_green_pixels(pixels).astype(np.float64)
+        offsets = np.concatenate([[0], np.cumsum(pixel_counts)])
+
+        single = np.flatnonzero(pixel_counts == 1)
+        colors[single] = pixels[offsets[single]].astype(int)
+        clustered = np.flatnonzero(pixel_counts >= 2)
+        if len(clustered) == 0:
+            return colors
+
+        # Center every image and seed its two centers with k-means++
+        image_pixels, means = [], np.zeros((len(clustered), 3))
+        centers, tolerances = np.zeros((len(clustered), 2, 3)), np.zeros(len(clustered))
+        for i, image_num in enumerate(clustered):
+            centered_pixels = pixels[offsets[image_num]:offsets[image_num + 1]]
+            means[i] = centered_pixels.mean(axis=0)
+            centered_pixels = centered_pixels - means[i]
+            image_pixels.append(centered_pixels)
+            centers[i] = self._init_centers(centered_pixels)
+            tolerances[i] = np.mean(np.var(centered_pixels, axis=0)) * KMEANS_TOLERANCE
+
+        labels, centers = self._run_lloyd(np.concatenate(image_pixels), pixel_counts[clustered], centers, tolerances)
+        image_index = np.repeat(np.arange(len(clustered)), pixel_counts[clustered])
+        cluster_sizes = np.bincount(image_index * 2 + labels, minlength=len(clustered) * 2).reshape(-1, 2)
+        dominant_cluster = np.argmax(cluster_sizes, axis=1)
+        colors[clustered] = (centers[np.arange(len(clustered)), dominant_cluster] + means).astype(int)
+        return colors
+
+    def _init_centers(self, pixels):
+        """
+        Seeds the two centers of one image with k-means++, drawing the same random numbers as sklearn.
+
+        :param pixels: Centered pixels of the image with shape (n, 3).
+        :return: Array of the two initial centers with shape (2, 3).
+        """
+        random_state = np.random.RandomState(KMEANS_RANDOM_STATE)
+        weights = np.ones(len(pixels))
+        squared_norms = np.einsum('ij,ij->i', pixels, pixels)
+
+        first_center = random_state.choice(len(pixels), p=weights / weights.sum())
+        closest_distances = self._squared_distances(pixels[[first_center]], pixels, squared_norms)
+        potential = closest_distances @ weights
+
+        # Candidates are drawn with probability proportional to their squared distance to the first center
+        random_values = random_state.uniform(size=KMEANS_LOCAL_TRIALS) * potential
+        candidates = np.searchsorted(np.cumsum(weights * closest_distances), random_values)
+        np.clip(candidates, None, len(pixels) - 1, out=candidates)
+        candidate_distances = np.minimum(closest_distances, self._squared_distances(pixels[candidates], pixels, squared_norms))
+        best_candidate = candidates[np.argmin(candidate_distances @ weights.reshape(-1, 1))]
+        return pixels[[first_center, best_candidate]]
+
+    def _squared_distances(self, centers, pixels, squared_norms):
+        distances = -2 * (centers @ pixels.T)
+        distances += np.einsum('ij,ij->i', centers, centers)[:, None]
+        distances += squared_norms[None, :]
+        return np.maximum(distances, 0)
+
+    def _run_lloyd(self, pixels, pixel_counts, centers, tolerances):
+        """
+        Runs Lloyd iterations for all images at once. An image stops when its labels no longer change
+        or its centers move less than its tolerance, and the images still running are iterated on.
+
+        :param pixels: Centered pixels of all images, image after image.
+        :param pixel_counts: Number of pixels of every image.
+        :param centers: Initial centers with shape (images, 2, 3).
+        :param tolerances: Convergence tolerance of every image.
+        :return: Tuple of the final label of every pixel and the final centers.
+        """
+        images_number = len(pixel_counts)
+        image_index = np.repeat(np.arange(images_number), pixel_counts)
+        labels = np.zeros(len(pixels), dtype=np.int64)
+        centers = centers.copy()
+
+        # Pixels of the images still running, and their labels from the previous iteration
+        rows = np.arange(len(pixels))
+        previous_labels = np.full(len(pixels), -1, dtype=np.int64)
+        for _ in range(self.max_iterations):
+            if len(rows) == 0:
+                break
+            row_images = image_index[rows]
+            row_labels = self._assign_labels(pixels[rows], centers, row_images)
+            new_centers = self._update_centers(pixels[rows], row_labels, row_images, centers, images_number)
+
+            running = np.unique(row_images)
+            changed = np.bincount(row_images, weights=row_labels != previous_labels, minlength=images_number)
+            strict = changed[running] == 0
+            center_shift = np.sqrt(((new_centers[running] - centers[running]) ** 2).sum(axis=2))
+            converged = strict | ((center_shift ** 2).sum(axis=1) <= tolerances[running])
+            centers[running] = new_centers[running]
+
+            # Images that converged without a strict label match get labels that match their final centers
+            labels[rows] = row_labels
+            relabeled = np.isin(row_images, running[converged & ~strict])
+            labels[rows[relabeled]] = self._assign_labels(pixels[rows[relabeled]], centers, row_images[relabeled])
+
+            keep = ~np.isin(row_images, running[converged])
+            rows, previous_labels = rows[keep], row_labels[keep]
+
+        if len(rows):
+            labels[rows] = self._assign_labels(pixels[rows], centers, image_index[rows])
+        return labels, centers
+
+    def _assign_labels(self, pixels, centers, image_index):
+        """
+        Assigns every pixel to the closer center of its image, comparing ||c||² - 2 x·c as sklearn does,
+        with ties going to the first cluster. Pixels almost equally far from both centers, whose label
+        depends on rounding, are compared again with the matrix product sklearn uses, so that they are
+        rounded the same way.
+
+        :param pixels: Centered pixels.
+        :param centers: Centers of all images with shape (images, 2, 3).
+        :param image_index: Image of every pixel.
+        :return: Label of every pixel.
+        """
+        center_norms = np.einsum('ikj,ikj->ik', centers, centers)
+        distances = center_norms[image_index] - 2 * np.einsum('ij,ikj->ik', pixels, centers[image_index])
+        labels = (distances[:, 1] < distances[:, 0]).astype(np.int64)
+
+        near_ties = np.abs(distances[:, 1] - distances[:, 0]) <= TIE_TOLERANCE * (np.abs(distances).sum(axis=1) + center_norms[image_index].sum(axis=1))
+        tie_rows = np.flatnonzero(near_ties)
+        for image_num in np.unique(image_index[tie_rows]):
+            rows = tie_rows[image_index[tie_rows] == image_num]
+            image_centers = np.ascontiguousarray(centers[image_num])
+            image_distances = np.einsum('ij,ij->i', image_centers, image_centers) + (-2 * (pixels[rows] @ image_centers.T))
+            labels[rows] = image_distances[:, 1] < image_distances[:, 0]
+        return labels
+
+    def _update_centers(self, pixels, labels, image_index, centers, images_number):
+        """
+        Moves every center to the mean of its pixels. An empty cluster takes the pixel farthest from
+        its center, as in sklearn, or the place of the other center if all pixels are on their centers.
+
+        :param pixels: Centered pixels of the running images.
+        :param labels: Label of every pixel.
+        :param image_index: Image of every pixel.
+        :param centers: Current centers of all images.
+        :param images_number: Number of images.
+        :return: New centers of all images; only the running images are updated.
+        """
+        cluster_index = image_index * 2 + labels
+        cluster_sizes = np.bincount(cluster_index, minlength=images_number * 2).reshape(images_number, 2).astype(np.float64)
+        cluster_sums = np.stack([
+            np.bincount(cluster_index, weights=pixels[:, channel], minlength=images_number * 2)
+            for channel in range(3)
+        ], axis=1).reshape(images_number, 2, 3)
+
+        running = np.unique(image_index)
+        for image_num in running[(cluster_sizes[running] == 0).any(axis=1)]:
+            image_rows = np.flatnonzero(image_index == image_num)
+            distances = ((pixels[image_rows] - centers[image_num][labels[image_rows]]) ** 2).sum(axis=1)
+            if distances.max() == 0:
+                continue
+            far_row = image_rows[np.argmax(distances)]
+            empty_cluster, old_cluster = np.argmin(cluster_sizes[image_num]), labels[far_row]
+            cluster_sums[image_num, old_cluster] -= pixels[far_row]
+            cluster_sums[image_num, empty_cluster] = pixels[far_row]
+            cluster_sizes[image_num, empty_cluster] = 1
+            cluster_sizes[image_num, old_cluster] -= 1
+
+        new_centers = centers.copy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            new_centers[running] = cluster_sums[running] * (1.0 / cluster_sizes[running])[:, :, None]
+        # An empty cluster is placed on the larger cluster
+        for image_num in running[(cluster_sizes[running] == 0).any(axis=1)]:
+            larger_cluster = np.argmax(cluster_sizes[image_num])
+            new_centers[image_num, 1 - larger_cluster] = new_centers[image_num, larger_cluster]
+        return new_centers
@@ -1,8 +1,11 @@
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
 import constants
 import config
+from utils import geometry_utils
+from track_objects import TrackStore
+from track_objects.track_store import TRACK_KEYS
+from .color_extractor import BatchColorExtractor
 
 class TeamClassifier:
     def __init__(self):
@@ -22,6 +25,19 @@ class TeamClassifier:
         self.initialization_frames = config.INITIALIZATION_FRAMES
         self.initialized = False
 
+        # Batched color extraction used for whole frames and windows of frames
+        self.color_extractor = BatchColorExtractor()
+
+        # Track-level assignment: sampled colors and number of sightings per track ID
+        self.samples_per_track = config.TEAM_SAMPLES_PER_TRACK
+        self.sample_frame_stride = config.TEAM_SAMPLE_FRAME_STRIDE
+        self.track_color_samples = {}
+        self.track_sightings = {}
+        self.final_track_teams = {}  # Teams voted on all samples_per_track samples, which no longer change
+
+        # Counts of events too frequent to print every time, e.g. for the metrics of a run
+        self.event_counts = {}
+
     def remove_green_pixels(self, image):
         """
         Removes green pixels from the image to avoid interference from the field.
@@ -42,6 +58,8 @@ class TeamClassifier:
         :param image: The input image to extract the dominant color from.
         :return: The dominant color in BGR format.
         """
+        from sklearn.cluster import KMeans
+
         image_2d = image.reshape(-1, 3)
         kmeans = KMeans(n_clusters=2, init="k-means++", n_init=1, random_state=42)
         kmeans.fit(image_2d)
@@ -56,21 +74,44 @@ class TeamClassifier:
         :param bounding_box: The bounding box of the player.
         :return: The dominant color of the player in BGR format.
         """
-        x1, y1, x2, y2 = map(int, bounding_box)
-        player_image = frame[y1:y2, x1:x2]
-        height, width, _ = player_image.shape
-        central_part = player_image[int(height / 4):int(3 * height / 4), int(width / 4):int(3 * width / 4)]
+        central_part = self.get_player_crop(frame, bounding_box)
 
         # Remove green pixels and find dominant color
         central_part_no_green = self.remove_green_pixels(central_part)
         return self.extract_dominant_color(central_part_no_green)
 
+    def get_player_crop(self, frame, bounding_box):
+        """
+        Extracts the central part of a player's bounding box, where the jersey is.
+
+        :param frame: The current video frame.
+        :param bounding_box: The bounding box of the player.
+        :return: The central part of the player image.
+        """
+        x1, y1, x2, y2 = map(int, bounding_box)
+        player_image = frame[y1:y2, x1:x2]
+        height, width, _ = player_image.shape
+        return player_image[int(height / 4):int(3 * height / 4), int(width / 4):int(3 * width / 4)]
+
+    def get_player_colors(self, frames, bounding_boxes):
+        """
+        Extracts the dominant colors of many players at once with the batched color extractor.
+
+        :param frames: Frame of every player; the same frame may appear many times.
+        :param bounding_boxes: Bounding box of every player.
+        :return: Array of dominant colors in BGR format, one per player.
+        """
+        crops = [self.get_player_crop(frame, bounding_box) for frame, bounding_box in zip(frames, bounding_boxes)]
+        return self.color_extractor.extract_dominant_colors(crops)
+
     def perform_kmeans_clustering(self, player_colors):
         """
         Performs KMeans clustering on player colors to determine team colors.
 
         :param player_colors: List of player colors to cluster.
         """
+        from sklearn.cluster import KMeans  # Imported on first use, since sklearn takes seconds to import
+
         kmeans = KMeans(n_clusters=2, init="k-means++", n_init=1, random_state=42)
         kmeans.fit(player_colors)
         self.kmeans = kmeans
@@ -88,11 +129,12 @@ class TeamClassifier:
         :param frames: List of initial video frames.
         :param player_detections_list: List of player detections for the initial frames.
         """
-        all_player_colors = [
-            self.get_player_color(frame, player_detection[constants.BOUNDING_BOX_KEY])
-            for frame, player_detections in zip(frames, player_detections_list)
-            for player_detection in player_detections.values()
-        ]
+        player_frames, player_bounding_boxes = [], []
+        for frame, player_detections in zip(frames, player_detections_list):
+            for player_detection in player_detections.values():
+                player_frames.append(frame)
+                player_bounding_boxes.append(player_detection[constants.BOUNDING_BOX_KEY])
+        all_player_colors = list(self.get_player_colors(player_frames, player_bounding_boxes))
 
         if len(all_player_colors) < 2:
             print("Not enough player colors for KMeans clustering")
@@ -101,22 +143,21 @@ class TeamClassifier:
         self.perform_kmeans_clustering(all_player_colors)
         self.initialized = True
 
-    def calculate_iou(self, boxA, boxB):
+    def get_overlapping_players(self, player_track):
         """
-        Calculates the Intersection over Union (IoU) for two bounding boxes.
+        Finds the players whose bounding box overlaps another player's box in the same frame,
+        using one IoU matrix for all pairs of players.
 
-        :param boxA: First bounding box (x1, y1, x2, y2).
-        :param boxB: Second bounding box (x1, y1, x2, y2).
-        :return: IoU value.
+        :param player_track: Dictionary of player tracks in one frame.
+        :return: Boolean array, True for every player (in dictionary order) overlapping another player.
         """
-        xA = max(boxA[0], boxB[0])
-        yA = max(boxA[1], boxB[1])
-        xB = min(boxA[2], boxB[2])
-        yB = min(boxA[3], boxB[3])
-        interArea = max(0, xB - xA) * max(0, yB - yA)
-        boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
-        boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
-        return interArea / float(boxAArea + boxBArea - interArea)
+        if len(player_track) < 2:
+            return np.zeros(len(player_track), dtype=bool)
+
+        bounding_boxes = [track[constants.BOUNDING_BOX_KEY] for track in player_track.values()]
+        iou = geometry_utils.pairwise_iou(bounding_boxes)
+        np.fill_diagonal(iou, 0)
+        return (iou > self.overlap_threshold).any(axis=1)
 
     def assign_teams_to_players(self, tracks, video):
         """
@@ -126,28 +167,38 @@ class TeamClassifier:
         :param video: List of video frames.
         """
         if not self.initialized:
-            frames_for_initialization = [video[i] for i in range(self.initialization_frames)]
-            player_detections_list = [tracks[constants.PLAYERS_KEY][i] for i in range(self.initialization_frames)]
+            initialization_frames = min(self.initialization_frames, len(video))
+            frames_for_initialization = [video[i] for i in range(initialization_frames)]
+            player_detections_list = [tracks[constants.PLAYERS_KEY][i] for i in range(initialization_frames)]
             self.initialize_team_colors(frames_for_initialization, player_detections_list)
 
-        for frame_num, player_track in enumerate(tracks[constants.PLAYERS_KEY]):
-            for player_id, track in player_track.items():
-                detected_color = self.get_player_color(video[frame_num], track[constants.BOUNDING_BOX_KEY])
+        # Extract the colors of all players in all frames in batches
+        player_frames, player_bounding_boxes = [], []
+        for frame_num, frame in enumerate(video):
+            for track in tracks[constants.PLAYERS_KEY][frame_num].values():
+                player_frames.append(frame)
+                player_bounding_boxes.append(track[constants.BOUNDING_BOX_KEY])
+        player_colors = iter(self.get_player_colors(player_frames, player_bounding_boxes))
 
-                if player_id in self.player_team_dict:
+        overlaps_number = 0
+        for frame_num, frame in enumerate(video):
+            player_track = tracks[constants.PLAYERS_KEY][frame_num]
+            overlapping_players = self.get_overlapping_players(player_track)
+            for (player_id, track), is_overlapping in zip(player_track.items(), overlapping_players):
+                detected_color = next(player_colors)
+
+                # An overlapping player keeps the color from the current frame, since the previous
+                # color may belong to the other player after an ID switch
+                if is_overlapping:
+                    overlaps_number += 1
+                elif player_id in self.player_team_dict:
                     previous_color = self.player_team_dict[player_id]['color']
                     color_distance = np.linalg.norm(detected_color - previous_color)
                     if color_distance > self.color_change_threshold:
-                        print(f"Player ID {player_id} color changed significantly, possible tracking error.")
+                        # Possible tracking error
+                        self.count_event('team_color_changes')
                         detected_color = previous_color
 
-                for other_id, other_track in player_track.items():
-                    if player_id != other_id:
-                        iou = self.calculate_iou(track[constants.BOUNDING_BOX_KEY], other_track[constants.BOUNDING_BOX_KEY])
-                        if iou > self.overlap_threshold:
-                            print(f"Player ID {player_id} is overlapping with Player ID {other_id}, recalculating color.")
-                            detected_color = self.get_player_color(video[frame_num], track[constants.BOUNDING_BOX_KEY])
-
                 team = self.get_player_team(detected_color, player_id)
                 tracks[constants.PLAYERS_KEY][frame_num][player_id][constants.TEAM_KEY] = team
 
@@ -156,6 +207,18 @@ class TeamClassifier:
                 else:
                     tracks[constants.PLAYERS_KEY][frame_num][player_id][constants.TEAM_COLOR_KEY] = self.away_team_color
 
+        self.count_event('team_overlapping_players', overlaps_number)
+
+    def count_event(self, name, count=1):
+        """
+        Adds to the count of a repeated event instead of printing every occurrence.
+
+        :param name: Name of the event.
+        :param count: Number of occurrences to add.
+        """
+        if count:
+            self.event_counts[name] = self.event_counts.get(name, 0) + count
+
     def get_player_team(self, player_color, player_id):
         """
         Predicts the team of a player based on their color using KMeans clustering.
@@ -170,3 +233,157 @@ class TeamClassifier:
         team_id = self.kmeans.predict(player_color.reshape(1, -1))[0] + 1
         self.player_team_dict[player_id] = {'team': team_id, 'color': player_color}
         return team_id
+
+    def assign_teams_by_track(self, tracks, video):
+        """
+        Assigns teams per track instead of per detection: colors are extracted for a bounded
+        number of sampled frames of every track, and the majority team is written to all of
+        the track's frames.
+
+        :param tracks: Tracking data for all frames.
+        :param video: List of video frames.
+        """
+        self.collect_track_samples(tracks, video)
+        self.assign_teams_from_track_samples(tracks)
+
+    def collect_track_samples(self, tracks, video, initialize=True):
+        """
+        Extracts player colors for sampled sightings of every track. Every `sample_frame_stride`-th
+        sighting of a track is sampled until the track has `samples_per_track` samples. The sighting
+        counts are kept between calls, so windows of frames can be passed one after another.
+
+        :param tracks: Tracking data for the frames in video.
+        :param video: List of video frames.
+        :param initialize: Whether to initialize the team colors first; False only collects samples, e.g.
+                           for samples merged into a classifier initialized elsewhere.
+        """
+        if initialize and not self.initialized:
+            initialization_frames = min(self.initialization_frames, len(video))
+            frames_for_initialization = [video[i] for i in range(initialization_frames)]
+            player_detections_list = [tracks[constants.PLAYERS_KEY][i] for i in range(initialization_frames)]
+            self.initialize_team_colors(frames_for_initialization, player_detections_list)
+
+        sample_track_ids, sample_frames, sample_bounding_boxes = [], [], []
+        for frame_num, frame in enumerate(video):
+            for player_id, track in tracks[constants.PLAYERS_KEY][frame_num].items():
+                sightings = self.track_sightings.get(player_id, 0)
+                self.track_sightings[player_id] = sightings + 1
+
+                # Samples taken so far: every sample_frame_stride-th sighting, up to samples_per_track
+                samples_taken = min(-(-sightings // self.sample_frame_stride), self.samples_per_track)
+                if sightings % self.sample_frame_stride == 0 and samples_taken < self.samples_per_track:
+                    sample_track_ids.append(player_id)
+                    sample_frames.append(frame)
+                    sample_bounding_boxes.append(track[constants.BOUNDING_BOX_KEY])
+
+        sample_colors = self.get_player_colors(sample_frames, sample_bounding_boxes)
+        for player_id, color in zip(sample_track_ids, sample_colors):
+            self.track_color_samples.setdefault(player_id, []).append(color)
+
+    def collect_track_samples_from_store(self, tracks, reader):
+        """
+        Samples the same sightings as collect_track_samples, but picks them from a TrackStore first and
+        decodes only the frames that hold a sample, plus the frames used to initialize the team colors.
+
+        :param tracks: Tracks of the frames of the reader, e.g. cached tracks of the whole video.
+        :param reader: VideoFrameReader of the video.
+        """
+        if not self.initialized:
+            initialization_frames = min(self.initialization_frames, len(tracks))
+            player_detections_list = tracks.to_tracks(0, initialization_frames)[constants.PLAYERS_KEY]
+            self.initialize_team_colors(reader.read_range(0, initialization_frames), player_detections_list)
+
+        # Player rows ordered by track, and by frame within every track
+        rows = np.flatnonzero(tracks.object_class == TRACK_KEYS.index(constants.PLAYERS_KEY))
+        rows = rows[np.argsort(tracks.track_id[rows], kind='stable')]
+        track_ids, first_rows, sightings = np.unique(tracks.track_id[rows], return_index=True, return_counts=True)
+
+        # Sighting number of every row, counted on from the sightings of earlier calls
+        previous_sightings = np.array([self.track_sightings.get(player_id, 0) for player_id in track_ids.tolist()], dtype=np.int64)
+        sighting = np.arange(len(rows)) - np.repeat(first_rows - previous_sightings, sightings)
+        sampled = (sighting % self.sample_frame_stride == 0) & (sighting // self.sample_frame_stride < self.samples_per_track)
+        sample_rows = np.sort(rows[sampled])
+        for player_id, count in zip(track_ids.tolist(), (previous_sightings + sightings).tolist()):
+            self.track_sightings[player_id] = count
+
+        # Crops are copied, so every decoded frame is released before the next one is decoded
+        sample_frames = tracks.frame[sample_rows]
+        crops = []
+        for frame_num, frame in reader.iter_frames(sample_frames):
+            for row in sample_rows[sample_frames == frame_num].tolist():
+                crops.append(self.get_player_crop(frame, tracks.bounding_box[row]).copy())
+
+        sample_colors = self.color_extractor.extract_dominant_colors(crops)
+        for player_id, color in zip(tracks.track_id[sample_rows].tolist(), sample_colors):
+            self.track_color_samples.setdefault(player_id, []).append(color)
+
+    def merge_track_samples(self, track_color_samples, track_ids=None):
+        """
+        Adds color samples collected by another classifier, e.g. on another part of the video,
+        keeping at most `samples_per_track` samples per track.
+
+        :param track_color_samples: Dictionary mapping track IDs to lists of sampled colors.
+        :param track_ids: Optional dictionary mapping those track IDs to the track IDs used here.
+        """
+        for player_id, samples in track_color_samples.items():
+            player_id = track_ids.get(player_id, player_id) if track_ids else player_id
+            merged_samples = self.track_color_samples.setdefault(player_id, [])
+            merged_samples.extend(samples[:max(self.samples_per_track - len(merged_samples), 0)])
+
+    def assign_teams_from_track_samples(self, tracks, track_ids=None):
+        """
+        Decides the team of every sampled track by majority vote over its samples and writes it to
+        all frames of the track. A TrackStore is updated with one vectorized lookup.
+
+        :param tracks: Tracking data for all frames, as a TrackStore or in the dictionary layout.
+        :param track_ids: Optional track IDs to vote on, e.g. the tracks in tracks; all sampled tracks if omitted.
+        :return: The updated tracking data.
+        """
+        track_teams = self.vote_track_teams(track_ids)
+
+        if isinstance(tracks, TrackStore):
+            track_ids = np.array(list(track_teams), dtype=np.int64)
+            teams = np.array(list(track_teams.values()), dtype=np.int64)
+            palette = {self.home_team: self.home_team_color, self.away_team: self.away_team_color}
+            tracks.set_player_teams(track_ids, teams, palette)
+            return tracks
+
+        for player_track in tracks[constants.PLAYERS_KEY]:
+            for player_id, track in player_track.items():
+                team = track_teams.get(player_id)
+                if team is None:
+                    continue
+                track[constants.TEAM_KEY] = team
+                track[constants.TEAM_COLOR_KEY] = self.home_team_color if team == self.home_team else self.away_team_color
+        return tracks
+
+    def vote_track_teams(self, track_ids=None):
+        """
+        Predicts the team of every color sample and takes the majority per track.
+        Ties go to the team of the earliest sample. A track with all samples_per_track
+        samples is voted once, and its team is reused by later calls.
+
+        :param track_ids: Optional track IDs to vote on; all sampled tracks if omitted.
+        :return: Dictionary mapping track IDs to team IDs.
+        """
+        if track_ids is None:
+            track_ids = list(self.track_color_samples)
+        track_teams = {player_id: self.final_track_teams[player_id] for player_id in track_ids if player_id in self.final_track_teams}
+        track_ids = [player_id for player_id in track_ids
+                     if player_id not in track_teams and self.track_color_samples.get(player_id)]
+        if not track_ids:
+            return track_teams
+
+        sample_counts = [len(self.track_color_samples[player_id]) for player_id in track_ids]
+        sample_colors = np.concatenate([self.track_color_samples[player_id] for player_id in track_ids])
+        sample_teams = self.kmeans.predict(sample_colors) + 1
+
+        for player_id, teams in zip(track_ids, np.split(sample_teams, np.cumsum(sample_counts)[:-1])):
+            votes = np.bincount(teams, minlength=3)
+            winners = np.flatnonzero(votes == votes.max())
+            team_id = next(team for team in teams if team in winners)
+            track_teams[player_id] = int(team_id)
+            if len(teams) >= self.samples_per_track:
+                self.final_track_teams[player_id] = int(team_id)
+            self.player_team_dict[player_id] = {'team': int(team_id), 'color': self.track_color_samples[player_id][0]}
+        return track_teams
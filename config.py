@@ -7,7 +7,8 @@
 # Paths for video input, model, cache, and output
 VIDEO_PATH = 'data/rfkzel.mp4'          # Path to the input video file
 MODEL_PATH = 'model/1280res100ep.pt'    # Path to the YOLO model file
-CACHE_PATH = 'cache/tracks_cache.pkl'   # Path for storing cached tracks
+CACHE_DIR = 'cache'                     # Directory for cache entries keyed by video, model and settings
+LEGACY_CACHE_PATH = 'cache/tracks_cache.pkl'  # Pickled tracks of VIDEO_PATH from earlier versions, imported into CACHE_DIR once
 OUTPUT_PATH = 'data/output.avi'         # Path for the output video file
 
 
@@ -32,6 +33,25 @@ OVERLAP_THRESHOLD = 0.2                 # Threshold for overlap detection (IoU >
 INITIALIZATION_FRAMES = 5               # Number of frames for initialization
 
 
+# ===========================
+# TEAM ASSIGNMENT SETTINGS
+# ===========================
+
+# Team assignment per track (sampled colors and majority vote) or per detection in every frame
+TEAM_ASSIGNMENT_MODE = 'track'          # 'track' or 'frame'
+TEAM_SAMPLES_PER_TRACK = 10             # Maximum number of color samples per track ID
+TEAM_SAMPLE_FRAME_STRIDE = 15           # Sample every n-th sighting of a track
+
+
+# ===========================
+# COLOR EXTRACTION SETTINGS
+# ===========================
+
+# Parameters for the batched jersey color extraction
+COLOR_EXTRACTION_BATCH_SIZE = 512       # Number of player crops clustered together in one NumPy pass
+COLOR_EXTRACTION_MAX_ITERATIONS = 300   # Maximum number of KMeans iterations per crop, as in sklearn
+
+
 # ===========================
 # BALL ASSIGNER CONFIGURATION
 # ===========================
@@ -49,6 +69,19 @@ BALL_ASSIGNER_POSSESSION_TIME_THRESHOLD = 12  # Time threshold for maintaining p
 DETECTOR_CONFIDENCE_THRESHOLD = 0.5     # Confidence threshold for object detection
 DETECTOR_BATCH_SIZE = 20                # Batch size for YOLO model predictions
 DETECTOR_IMAGE_SIZE = 1920              # Image size for YOLO predictions
+DETECTOR_CHUNK_SIZE = 500               # Frames per detection chunk committed to disk, so interrupted runs can resume
+DETECTOR_BACKEND = 'pytorch'            # Inference backend: 'pytorch', 'onnx' (ONNX Runtime) or 'openvino'
+DETECTOR_PRECISION = 'fp32'             # Precision of exported models: 'fp32', 'fp16' or 'int8'
+DETECTOR_CALIBRATION_DATA = None        # Dataset YAML used to calibrate int8 exports, None uses the ultralytics default
+DETECTOR_STRIDE = 1                     # Run the model on every n-th frame; tracks are interpolated in between
+
+# Ball-focused detection: players on a downscaled full frame, the ball at native resolution around its predicted position
+BALL_ROI_ENABLED = False                # Detect the ball in a region of interest instead of the full 1920 px frame
+BALL_ROI_FULL_FRAME_IMAGE_SIZE = 960    # Image size for full-frame predictions (players and referees)
+BALL_ROI_SIZE = 640                     # Size of the native-resolution crop searched for the ball
+BALL_ROI_MAX_LOST_FRAMES = 10           # Frames without a ball before the whole frame is tiled
+BALL_ROI_TILE_OVERLAP = 0.1             # Overlap between tiles when searching the whole frame
+BALL_ROI_TILE_INTERVAL = 15             # While the ball is lost, tile the whole frame only every n-th frame
 
 
 # ===========================
@@ -61,3 +94,74 @@ TRACKER_LOST_TRACK_BUFFER = 120           # Buffer size for lost tracks
 TRACKER_MINIMUM_MATCHING_THRESHOLD = 1    # Minimum threshold for matching detections to tracks
 TRACKER_MINIMUM_CONSECUTIVE_FRAMES = 5    # Minimum number of consecutive frames for track confirmation
 FRAME_RATE = 30                           # Frame rate of the video
+BALL_SMOOTHING_LOOKAHEAD = 30             # Frames the online ball smoother waits for a lost ball before holding its last position
+
+
+# ===========================
+# STREAMING SETTINGS
+# ===========================
+
+# Parameters for the streaming (bounded-memory) pipeline
+STREAMING_ENABLED = True                  # Stream frames through the pipeline instead of loading the whole video
+STREAMING_WINDOW_SIZE = 200               # Maximum number of decoded frames held in memory at once
+PIPELINE_QUEUE_SIZE = 8                   # Maximum number of frames waiting between decode, compute and encode threads
+SPARSE_DECODING_ENABLED = True            # With cached tracks, decode only the frames sampled for the team vote, seeking with the frame index
+
+
+# ===========================
+# RENDER SETTINGS
+# ===========================
+
+# Parameters for drawing annotations in parallel worker processes
+RENDER_WORKERS = 0                        # Number of render processes, 0 uses all CPU cores, 1 draws in the main process
+RENDER_MAX_IN_FLIGHT = 32                 # Maximum number of frames handed to the render workers at once
+
+
+# ===========================
+# LIVE MODE SETTINGS
+# ===========================
+
+# Parameters for analyzing a recording that is still being written, or a stream, while frames arrive
+LIVE_ENABLED = False                      # Run main.py in live mode instead of analyzing a finished video
+LIVE_SOURCE = None                        # Growing video file, pipe, stream URL, or '-' for raw BGR frames on stdin; None uses VIDEO_PATH
+LIVE_RAW_FRAME_SIZE = (1920, 1080)        # Width and height of raw frames read from stdin
+LIVE_BATCH_SIZE = 8                       # Maximum number of frames analyzed at once; fewer once the analysis has caught up
+LIVE_MAX_QUEUED_FRAMES = 300              # Maximum number of frames read ahead of the analysis
+LIVE_POLL_INTERVAL = 0.2                  # Seconds between checks for new frames in a growing file
+LIVE_IDLE_TIMEOUT = 10.0                  # Seconds without new frames after which a growing file is considered complete
+LIVE_STATUS_PATH = 'data/live_status.json'  # JSON file with the current possession figures, rewritten after every batch
+LIVE_LATENCY_WINDOW = 300                 # Number of most recent frames the latency percentiles are computed over
+
+
+# ===========================
+# METRICS SETTINGS
+# ===========================
+
+# Parameters for the per-stage metrics written at the end of a run
+METRICS_JSON_PATH = 'data/metrics.json'   # JSON file with the wall time, frames/s, peak memory and item counts of every stage; None disables it
+METRICS_PROMETHEUS_PATH = None            # Prometheus textfile for the node exporter textfile collector (must end in .prom); None disables it
+
+
+# ===========================
+# BATCH SETTINGS
+# ===========================
+
+# Parameters for analyzing many matches with batch_runner.py
+BATCH_WORKERS = 2                         # Number of matches analyzed in parallel; every worker process loads the model once
+BATCH_RENDER_WORKERS = 1                  # Render processes per match, since the matches already run in parallel
+BATCH_OUTPUT_DIR = 'data/batch'           # Directory for the output videos, metrics and summary of a batch
+BATCH_CACHE_DIR = 'cache/batch'           # Directory with one cache directory per match
+BATCH_VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.ts')  # Files picked up when a directory of matches is given
+
+
+# ===========================
+# SEGMENT SETTINGS
+# ===========================
+
+# Parameters for analyzing one long match in parallel segments
+SEGMENT_ENABLED = False                   # Detect, track and sample team colors of time segments in parallel processes; teams are assigned per track
+SEGMENT_WORKERS = 2                       # Number of segment processes; each loads its own copy of the model
+SEGMENT_LENGTH = 4500                     # Frames per segment (2.5 minutes at 30 fps), rounded up to whole detection strides
+SEGMENT_OVERLAP = 60                      # Frames tracked by both neighboring segments to join their track IDs
+SEGMENT_STITCH_IOU_THRESHOLD = 0.5        # Minimum IoU for boxes of two segments to belong to the same object
+SEGMENT_STITCH_MIN_FRAMES = 5             # Minimum number of overlap frames in which two tracks must match to be joined
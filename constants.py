@@ -22,3 +22,13 @@ HAS_BALL_KEY = 'has_ball'             # Key for checking ball possession status
 # Identifiers for teams
 HOME_TEAM_ID = 1                      # Identifier for the home team
 AWAY_TEAM_ID = 2                      # Identifier for the away team
+
+
+# ===========================
+# CLASS IDENTIFICATION
+# ===========================
+
+# Class IDs produced by the YOLO model
+BALL_CLASS_ID = 0                     # Class ID for the ball
+PLAYER_CLASS_ID = 2                   # Class ID for players
+REFEREE_CLASS_ID = 3                  # Class ID for referees
@@ -1 +1,3 @@
-from .detector import ObjectDetector
\ No newline at end of file
+from .detector import ObjectDetector
+from .detection_store import DetectionStore
+from .ball_roi_detector import BallRoiDetector
\ No newline at end of file
@@ -0,0 +1,127 @@
+import os
+import shutil
+import config
+from cache import cache_utils
+
+# Inference backends and the ultralytics export format of each; PyTorch runs the .pt model directly
+EXPORT_FORMATS = {
+    'pytorch': None,
+    'onnx': 'onnx',          # ONNX Runtime
+    'openvino': 'openvino'   # OpenVINO
+}
+PRECISIONS = ('fp32', 'fp16', 'int8')
+
+
+def load_model(model_path, backend=None, precision=None):
+    """
+    Loads the detection model for an inference backend. For ONNX Runtime and OpenVINO the .pt model
+    is exported once and the export is reused by later runs; ultralytics runs every backend
+    behind the same predict API, so the results are consumed in the same way.
+
+    :param model_path: Path to the YOLO .pt model.
+    :param backend: 'pytorch', 'onnx', or 'openvino', defaults to config.DETECTOR_BACKEND.
+    :param precision: 'fp32', 'fp16', or 'int8', defaults to config.DETECTOR_PRECISION.
+    :return: YOLO model.
+    """
+    from ultralytics import YOLO  # Imported here, so runs served from the tracks cache never load torch
+
+    exported_model_path = prepare_model(model_path, backend, precision)
+    if exported_model_path is None:
+        return YOLO(model_path)
+    return YOLO(exported_model_path, task='detect')
+
+
+def prepare_model(model_path, backend=None, precision=None):
+    """
+    Checks the backend settings and exports the model for the backend if it has not been exported yet.
+    Call it once before starting worker processes, so the workers find the export instead of each
+    exporting the model themselves.
+
+    :param model_path: Path to the YOLO .pt model.
+    :param backend: 'pytorch', 'onnx', or 'openvino', defaults to config.DETECTOR_BACKEND.
+    :param precision: 'fp32', 'fp16', or 'int8', defaults to config.DETECTOR_PRECISION.
+    :return: Path to the exported model, or None for the PyTorch backend, which runs the .pt model.
+    """
+    backend = config.DETECTOR_BACKEND if backend is None else backend
+    precision = config.DETECTOR_PRECISION if precision is None else precision
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {', '.join(EXPORT_FORMATS)}.")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown detector precision '{precision}', expected one of {', '.join(PRECISIONS)}.")
+
+    if backend == 'pytorch':
+        if precision != 'fp32':
+            raise ValueError("The PyTorch backend only runs in fp32 on CPU.")
+        return None
+
+    exported_model_path = get_exported_model_path(model_path, backend, precision)
+    if not os.path.exists(exported_model_path):
+        export_model(model_path, backend, precision, exported_model_path)
+    return exported_model_path
+
+
+def get_exported_model_path(model_path, backend, precision):
+    """
+    Returns where the export of a model for a backend and precision is kept. The path contains the
+    hash of the model file, so a changed model is exported again.
+
+    :param model_path: Path to the YOLO .pt model.
+    :param backend: 'onnx' or 'openvino'.
+    :param precision: 'fp32', 'fp16', or 'int8'.
+    :return: Path to the exported model file (ONNX) or directory (OpenVINO).
+    """
+    model_name = os.path.splitext(os.path.basename(model_path))[0]
+    model_hash = cache_utils.compute_file_hash(model_path, config.CACHE_DIR)
+    name = f"{model_name}-{model_hash}-{precision}"
+    if backend == 'onnx':
+        return os.path.join(config.CACHE_DIR, 'models', f"{name}.onnx")
+    return os.path.join(config.CACHE_DIR, 'models', f"{name}_openvino_model")
+
+
+def export_model(model_path, backend, precision, exported_model_path):
+    """
+    Exports a .pt model for a backend with dynamic input shapes, so any batch and image size can be used.
+    INT8 quantization is calibrated on config.DETECTOR_CALIBRATION_DATA. Every process exports into its
+    own temporary directory and renames the export into place, so processes exporting the same model at
+    once never write to the same path, and the first finished export is kept.
+
+    :param model_path: Path to the YOLO .pt model.
+    :param backend: 'onnx' or 'openvino'.
+    :param precision: 'fp32', 'fp16', or 'int8'.
+    :param exported_model_path: Where the exported model is moved to.
+    """
+    from ultralytics import YOLO
+
+    print(f"Exporting {model_path} for {backend} ({precision})...")
+    export_arguments = {
+        'format': EXPORT_FORMATS[backend],
+        'imgsz': config.DETECTOR_IMAGE_SIZE,
+        'dynamic': True,
+        'half': precision == 'fp16',
+        'int8': precision == 'int8'
+    }
+    if precision == 'int8' and config.DETECTOR_CALIBRATION_DATA:
+        export_arguments['data'] = config.DETECTOR_CALIBRATION_DATA
+
+    # The export is written next to the .pt model, so a copy of the model is exported in a temporary
+    # directory beside the cache entry, on the same file system for the final rename
+    temporary_dir = f"{exported_model_path}.{os.getpid()}.tmp"
+    shutil.rmtree(temporary_dir, ignore_errors=True)
+    os.makedirs(temporary_dir)
+    try:
+        temporary_model_path = os.path.join(temporary_dir, os.path.basename(model_path))
+        shutil.copyfile(model_path, temporary_model_path)
+        export_path = YOLO(temporary_model_path).export(**export_arguments)
+
+        if os.path.exists(exported_model_path):
+            print(f"Using the export finished meanwhile at {exported_model_path}")
+            return
+        try:
+            os.replace(str(export_path), exported_model_path)
+        except OSError:
+            # A directory cannot replace a non-empty one, so another process finished the export first
+            if not os.path.exists(exported_model_path):
+                raise
+    finally:
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+    print(f"Exported model saved to {exported_model_path}")
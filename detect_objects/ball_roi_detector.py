@@ -0,0 +1,189 @@
+import numpy as np
+import constants
+import config
+
+
+class BallRoiDetector:
+    def __init__(self, get_model):
+        """
+        Initializes the ball-focused detector. Players and referees are detected on the full frame at a
+        reduced image size, while the ball is detected at native resolution inside a crop around its
+        predicted position. The whole frame is tiled at native resolution only after the ball has been
+        lost for more than `max_lost_frames` frames, and then at most every `tile_interval` frames; in
+        between, the ball can still be found by the full-frame pass.
+
+        :param get_model: Function returning the YOLO model shared with ObjectDetector, called on first use.
+        """
+        self.get_model = get_model
+        self.confidence_threshold = config.DETECTOR_CONFIDENCE_THRESHOLD
+        self.batch_size = config.DETECTOR_BATCH_SIZE
+        self.imgsz = config.BALL_ROI_FULL_FRAME_IMAGE_SIZE
+        self.roi_size = config.BALL_ROI_SIZE
+        self.tile_overlap = config.BALL_ROI_TILE_OVERLAP
+        self.max_lost_frames = config.BALL_ROI_MAX_LOST_FRAMES
+        self.tile_interval = max(config.BALL_ROI_TILE_INTERVAL, 1)
+        self.reset()
+
+    @property
+    def model(self):
+        return self.get_model()
+
+    def reset(self):
+        """
+        Forgets the ball, so the next frame is searched by tiling.
+        """
+        self.ball_history = []  # (frame number, center) of the last two ball detections
+        self.last_tiled_frame = None  # Frame number of the last tiled search since the ball was lost
+
+    def get_cache_settings(self):
+        """
+        Returns the settings that affect the detections, used to key caches.
+
+        :return: Dictionary of ball ROI settings.
+        """
+        return {
+            'full_frame_image_size': self.imgsz,
+            'roi_size': self.roi_size,
+            'tile_overlap': self.tile_overlap,
+            'max_lost_frames': self.max_lost_frames,
+            'tile_interval': self.tile_interval
+        }
+
+    def detect(self, frames, frame_numbers):
+        """
+        Detects players and referees on the full frames and the ball in a region of interest of every frame.
+        Frames must be passed in video order, since the ball search depends on the previous detections.
+
+        :param frames: List of frames.
+        :param frame_numbers: Frame number of every frame, used to extrapolate the ball position.
+        :return: Tuple of a list of supervision detections (one per frame) and the class names of the model.
+        """
+        import supervision as sv
+
+        detections, class_names = [], {}
+        for i in range(0, len(frames), self.batch_size):
+            batch = frames[i:i + self.batch_size]
+            results = self.model.predict(batch, imgsz=self.imgsz, conf=self.confidence_threshold)
+
+            for frame, frame_number, result in zip(batch, frame_numbers[i:i + self.batch_size], results):
+                class_names = result.names
+                full_frame = sv.Detections.from_ultralytics(result)
+                is_ball = full_frame.class_id == constants.BALL_CLASS_ID
+
+                # Keep the ball from the full frame only if the high-resolution search finds nothing
+                ball = self.detect_ball(frame, frame_number)
+                if ball is None and is_ball.any():
+                    best = np.flatnonzero(is_ball)[np.argmax(full_frame.confidence[is_ball])]
+                    ball = (full_frame.xyxy[best], full_frame.confidence[best])
+
+                if ball is not None:
+                    self.update_ball_history(frame_number, ball[0])
+                    detections.append(sv.Detections(
+                        xyxy=np.vstack([full_frame.xyxy[~is_ball], ball[0][None, :]]),
+                        confidence=np.append(full_frame.confidence[~is_ball], ball[1]),
+                        class_id=np.append(full_frame.class_id[~is_ball], constants.BALL_CLASS_ID)
+                    ))
+                else:
+                    detections.append(sv.Detections(
+                        xyxy=full_frame.xyxy[~is_ball],
+                        confidence=full_frame.confidence[~is_ball],
+                        class_id=full_frame.class_id[~is_ball]
+                    ))
+
+        return detections, class_names
+
+    def detect_ball(self, frame, frame_number):
+        """
+        Searches the ball at native resolution, in a crop around the predicted position if the ball was
+        seen recently, or in tiles covering the whole frame otherwise. While the ball stays lost, the
+        frame is only tiled every `tile_interval` frames, since tiling costs more than the full-frame pass.
+
+        :param frame: The video frame.
+        :param frame_number: The frame number.
+        :return: Tuple of the ball bounding box in frame coordinates and its confidence, or None.
+        """
+        import supervision as sv
+
+        predicted_center = self.predict_ball_center(frame_number)
+        if predicted_center is not None:
+            regions = [self.get_region_around(predicted_center, frame.shape)]
+        elif self.last_tiled_frame is not None and frame_number - self.last_tiled_frame < self.tile_interval:
+            return None
+        else:
+            self.last_tiled_frame = frame_number
+            regions = self.get_tiles(frame.shape)
+
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        results = self.model.predict(crops, imgsz=self.roi_size, conf=self.confidence_threshold,
+                                     classes=[constants.BALL_CLASS_ID])
+
+        best_ball = None
+        for (x1, y1, _, _), result in zip(regions, results):
+            crop_detections = sv.Detections.from_ultralytics(result)
+            crop_detections = crop_detections[crop_detections.class_id == constants.BALL_CLASS_ID]
+            if len(crop_detections) == 0:
+                continue
+
+            best = int(np.argmax(crop_detections.confidence))
+            if best_ball is None or crop_detections.confidence[best] > best_ball[1]:
+                bounding_box = crop_detections.xyxy[best] + np.array([x1, y1, x1, y1], dtype=np.float32)
+                best_ball = (bounding_box, crop_detections.confidence[best])
+        return best_ball
+
+    def predict_ball_center(self, frame_number):
+        """
+        Extrapolates the ball center from the last two detections with constant velocity.
+
+        :param frame_number: The frame number to predict for.
+        :return: Predicted (x, y) center, or None if the ball has been lost for too long.
+        """
+        if not self.ball_history or frame_number - self.ball_history[-1][0] > self.max_lost_frames:
+            return None
+
+        last_frame_number, last_center = self.ball_history[-1]
+        if len(self.ball_history) < 2:
+            return last_center
+
+        previous_frame_number, previous_center = self.ball_history[-2]
+        velocity = (last_center - previous_center) / (last_frame_number - previous_frame_number)
+        return last_center + velocity * (frame_number - last_frame_number)
+
+    def update_ball_history(self, frame_number, bounding_box):
+        """
+        Records the center of a detected ball for extrapolation.
+
+        :param frame_number: The frame number.
+        :param bounding_box: The ball bounding box (x1, y1, x2, y2).
+        """
+        center = np.array([(bounding_box[0] + bounding_box[2]) / 2, (bounding_box[1] + bounding_box[3]) / 2], dtype=np.float64)
+        self.ball_history = self.ball_history[-1:] + [(frame_number, center)]
+        self.last_tiled_frame = None
+
+    def get_region_around(self, center, frame_shape):
+        """
+        Returns the crop of size roi_size centered on a point, shifted to lie inside the frame.
+
+        :param center: The (x, y) center of the crop.
+        :param frame_shape: Shape of the frame.
+        :return: Region (x1, y1, x2, y2) in frame coordinates.
+        """
+        frame_height, frame_width = frame_shape[:2]
+        width, height = min(self.roi_size, frame_width), min(self.roi_size, frame_height)
+        x1 = int(np.clip(center[0] - width / 2, 0, frame_width - width))
+        y1 = int(np.clip(center[1] - height / 2, 0, frame_height - height))
+        return x1, y1, x1 + width, y1 + height
+
+    def get_tiles(self, frame_shape):
+        """
+        Returns overlapping tiles of size roi_size covering the whole frame.
+
+        :param frame_shape: Shape of the frame.
+        :return: List of regions (x1, y1, x2, y2) in frame coordinates.
+        """
+        frame_height, frame_width = frame_shape[:2]
+        width, height = min(self.roi_size, frame_width), min(self.roi_size, frame_height)
+        step = max(int(self.roi_size * (1 - self.tile_overlap)), 1)
+
+        xs = list(range(0, frame_width - width, step)) + [frame_width - width]
+        ys = list(range(0, frame_height - height, step)) + [frame_height - height]
+        return [(x, y, x + width, y + height) for y in ys for x in xs]
@@ -0,0 +1,184 @@
+import numpy as np
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import supervision as sv
+
+
+class DetectionStore:
+    def __init__(self, xyxy: np.ndarray, confidence: np.ndarray, class_id: np.ndarray, frame_offsets: np.ndarray,
+                 class_names: Optional[Dict[int, str]] = None, detected: Optional[np.ndarray] = None):
+        """
+        Initializes a compact store of raw detections with one row per detected object.
+        The rows of frame i are xyxy[frame_offsets[i]:frame_offsets[i + 1]].
+
+        :param xyxy: Bounding box (x1, y1, x2, y2) of each detection.
+        :param confidence: Confidence of each detection.
+        :param class_id: Class ID of each detection.
+        :param frame_offsets: Row offsets of every frame, one more than the number of frames.
+        :param class_names: Dictionary mapping class IDs to class names.
+        :param detected: Whether the model ran on each frame; frames skipped by strided detection are False.
+        """
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.confidence = np.asarray(confidence, dtype=np.float32)
+        self.class_id = np.asarray(class_id, dtype=np.int16)
+        self.frame_offsets = np.asarray(frame_offsets, dtype=np.int64)
+        self.class_names = dict(class_names) if class_names else {}
+        self.detected = np.ones(len(self), dtype=bool) if detected is None else np.asarray(detected, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.frame_offsets) - 1
+
+    def __getitem__(self, frame_num: int) -> 'sv.Detections':
+        """
+        Returns the detections of one frame in the form consumed by the tracker.
+
+        :param frame_num: The frame number.
+        :return: Detections of the frame.
+        """
+        import supervision as sv  # Only needed for tracking, not for loading or caching detections
+
+        rows = slice(self.frame_offsets[frame_num], self.frame_offsets[frame_num + 1])
+        return sv.Detections(
+            xyxy=self.xyxy[rows],
+            confidence=self.confidence[rows],
+            class_id=self.class_id[rows].astype(int)
+        )
+
+    def __iter__(self):
+        for frame_num in range(len(self)):
+            yield self[frame_num]
+
+    @classmethod
+    def from_ultralytics(cls, results: List) -> 'DetectionStore':
+        """
+        Builds a store from YOLO results, copying only boxes, confidences, and class IDs out of them,
+        so the results (which hold the original images) can be released right away.
+
+        :param results: List of ultralytics results, one per frame.
+        :return: The equivalent DetectionStore.
+        """
+        class_names = results[0].names if results else {}
+        boxes = [result.boxes.cpu().numpy() for result in results]
+        return cls(
+            np.concatenate([frame_boxes.xyxy for frame_boxes in boxes]) if boxes else np.empty((0, 4)),
+            np.concatenate([frame_boxes.conf for frame_boxes in boxes]) if boxes else [],
+            np.concatenate([frame_boxes.cls for frame_boxes in boxes]) if boxes else [],
+            np.cumsum([0] + [len(frame_boxes) for frame_boxes in boxes]),
+            class_names
+        )
+
+    @classmethod
+    def from_detections(cls, detections: List['sv.Detections'], class_names: Optional[Dict[int, str]] = None) -> 'DetectionStore':
+        """
+        Builds a store from supervision detections, keeping only boxes, confidences, and class IDs.
+
+        :param detections: List of supervision detections, one per frame.
+        :param class_names: Dictionary mapping class IDs to class names.
+        :return: The equivalent DetectionStore.
+        """
+        return cls(
+            np.concatenate([detection.xyxy for detection in detections]) if detections else np.empty((0, 4)),
+            np.concatenate([detection.confidence for detection in detections]) if detections else [],
+            np.concatenate([detection.class_id for detection in detections]) if detections else [],
+            np.cumsum([0] + [len(detection) for detection in detections]),
+            class_names
+        )
+
+    @classmethod
+    def concatenate(cls, stores: List['DetectionStore']) -> 'DetectionStore':
+        """
+        Joins stores of consecutive frame windows into one store.
+
+        :param stores: Stores in frame order.
+        :return: A store covering all frames of the given stores.
+        """
+        if not stores:
+            raise ValueError("At least one detection store is required for concatenation.")
+
+        row_starts = np.cumsum([0] + [len(store.xyxy) for store in stores])
+        frame_offsets = [stores[0].frame_offsets[:1]] + [
+            store.frame_offsets[1:] + row_start for store, row_start in zip(stores, row_starts)
+        ]
+        class_names = {}
+        for store in stores:
+            class_names.update(store.class_names)
+
+        return cls(
+            np.concatenate([store.xyxy for store in stores]),
+            np.concatenate([store.confidence for store in stores]),
+            np.concatenate([store.class_id for store in stores]),
+            np.concatenate(frame_offsets),
+            class_names,
+            np.concatenate([store.detected for store in stores])
+        )
+
+    def slice_frames(self, start: int, stop: int) -> 'DetectionStore':
+        """
+        Returns the detections of a range of frames as a new store sharing the same arrays.
+
+        :param start: First frame number.
+        :param stop: Frame number after the last frame.
+        :return: Store with the detections of the frames in the range.
+        """
+        rows = slice(self.frame_offsets[start], self.frame_offsets[stop])
+        return DetectionStore(self.xyxy[rows], self.confidence[rows], self.class_id[rows],
+                              self.frame_offsets[start:stop + 1] - self.frame_offsets[start], self.class_names,
+                              self.detected[start:stop])
+
+    def expand_frames(self, detected: np.ndarray) -> 'DetectionStore':
+        """
+        Spreads the frames of this store over the frames marked as detected, e.g. after running the
+        model only on every n-th frame. The other frames get no detections and are marked as not detected.
+
+        :param detected: Boolean mask over the expanded frames, with one True entry per frame of this store.
+        :return: Store covering all frames of the mask.
+        """
+        detected = np.asarray(detected, dtype=bool)
+        detections_number = np.zeros(len(detected), dtype=np.int64)
+        detections_number[detected] = np.diff(self.frame_offsets)
+        frame_offsets = np.concatenate([[0], np.cumsum(detections_number)])
+        return DetectionStore(self.xyxy, self.confidence, self.class_id, frame_offsets, self.class_names, detected)
+
+    def with_stride(self, stride: int) -> 'DetectionStore':
+        """
+        Keeps only the detections of every stride-th frame, as if the model had only run on those frames.
+        Used to measure the effect of strided detection from a full detection run.
+
+        :param stride: Number of frames between detected frames.
+        :return: Store with the same frames, where only frames divisible by stride keep their detections.
+        """
+        detected = self.detected & (np.arange(len(self)) % stride == 0)
+        rows = np.repeat(detected, np.diff(self.frame_offsets))
+        frame_offsets = np.concatenate([[0], np.cumsum(np.diff(self.frame_offsets) * detected)])
+        return DetectionStore(self.xyxy[rows], self.confidence[rows], self.class_id[rows], frame_offsets,
+                              self.class_names, detected)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'DetectionStore':
+        """
+        Rebuilds a store from the arrays returned by to_arrays.
+
+        :param arrays: Dictionary of column arrays.
+        :return: The restored DetectionStore.
+        """
+        class_names = dict(zip(arrays['class_name_id'].tolist(), arrays['class_name'].tolist()))
+        return cls(arrays['xyxy'], arrays['confidence'], arrays['class_id'], arrays['frame_offsets'], class_names,
+                   arrays.get('detected'))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns the columns of the store as plain arrays, e.g. for caching.
+
+        :return: Dictionary of column arrays.
+        """
+        class_name_id = sorted(self.class_names)
+        return {
+            'xyxy': self.xyxy,
+            'confidence': self.confidence,
+            'class_id': self.class_id,
+            'frame_offsets': self.frame_offsets,
+            'detected': self.detected,
+            'class_name_id': np.array(class_name_id, dtype=np.int16),
+            'class_name': np.array([self.class_names[class_id] for class_id in class_name_id], dtype=str)
+        }
@@ -1,50 +1,208 @@
-from ultralytics import YOLO
+import numpy as np
 import constants
 import config
-import supervision as sv
 import logging
+import time
+from cache import cache_utils
+from utils import video_control_utils
+from .detection_store import DetectionStore
+from .ball_roi_detector import BallRoiDetector
+from . import backends
 
 class ObjectDetector:
     def __init__(self):
         """
         Initializes the object detector with the YOLO model and configuration parameters.
         """
-        self.model = YOLO(config.MODEL_PATH)
+        self.backend = config.DETECTOR_BACKEND
+        self.precision = config.DETECTOR_PRECISION
+        self._model = None  # Loaded on first use, so runs that hit the caches never load the weights
         self.confidence_threshold = config.DETECTOR_CONFIDENCE_THRESHOLD
         self.batch_size = config.DETECTOR_BATCH_SIZE
         self.imgsz = config.DETECTOR_IMAGE_SIZE  # Image size for YOLO predictions
+        self.chunk_size = config.DETECTOR_CHUNK_SIZE
+        self.stride = config.DETECTOR_STRIDE  # Run the model on every n-th frame only
+
+        # Ball-focused mode: reduced full-frame size for players, native-resolution crops for the ball
+        self.ball_roi_detector = BallRoiDetector(lambda: self.model) if config.BALL_ROI_ENABLED else None
+
+    @property
+    def model(self):
+        """
+        Returns the YOLO model, loading it on first access.
+
+        :return: YOLO model for the configured backend and precision.
+        """
+        if self._model is None:
+            start_time = time.perf_counter()
+            self._model = backends.load_model(config.MODEL_PATH, self.backend, self.precision)
+            print(f"Loaded detection model in {time.perf_counter() - start_time:.2f}s")
+        return self._model
+
+    def reset(self):
+        """
+        Forgets the state carried between frames, so the detector can be reused for another video.
+        """
+        if self.ball_roi_detector is not None:
+            self.ball_roi_detector.reset()
+
+    def get_cache_settings(self):
+        """
+        Returns the detector settings that affect the detections, used to key caches.
+
+        :return: Dictionary of detector settings.
+        """
+        settings = {
+            'confidence_threshold': self.confidence_threshold,
+            'image_size': self.imgsz,
+            'goalkeepers_as_players': True  # Earlier caches kept goalkeepers under their own class, which the tracker drops
+        }
+        if self.stride > 1:
+            settings['stride'] = self.stride  # Only set for strided detection, so existing caches stay valid
+        if (self.backend, self.precision) != ('pytorch', 'fp32'):
+            settings['backend'] = f"{self.backend}-{self.precision}"  # Exported models give slightly different boxes
+        if self.ball_roi_detector is not None:
+            settings['ball_roi'] = self.ball_roi_detector.get_cache_settings()
+        return settings
+
+    def get_cached_detections(self, cache_path):
+        """
+        Returns cached raw detections if they exist. Otherwise, returns None.
+
+        :param cache_path: Path to the cache entry of the detections.
+        :return: Cached DetectionStore or None if not available.
+        """
+        arrays = cache_utils.load_arrays_from_cache(cache_path) if cache_path else None
+        if arrays is None:
+            print("No cached detections found.")
+            return None
+
+        print(f"Loaded cached detections from {cache_path}")
+        return DetectionStore.from_arrays(arrays)
+
+    def save_detections_to_cache(self, detections, cache_path, metadata=None):
+        """
+        Saves raw detections to the cache so tracking can be replayed without running the model.
+
+        :param detections: DetectionStore with the detections to cache.
+        :param cache_path: Path to the cache entry of the detections.
+        :param metadata: Optional description of the inputs the detections were computed from.
+        """
+        cache_utils.save_arrays_to_cache(detections.to_arrays(), cache_path, metadata)
+
+    def get_checkpoint_frames_number(self, checkpoint_path):
+        """
+        Returns the number of frames already detected in the completed chunks of a checkpoint.
+
+        :param checkpoint_path: Path to the checkpoint directory.
+        :return: Number of frames covered by the completed chunks.
+        """
+        return sum(len(chunk) for chunk in self._load_checkpoint_chunks(checkpoint_path))
+
+    def detect_objects_in_chunks(self, frames, checkpoint_path, frames_number=None):
+        """
+        Detects objects chunk by chunk, committing every finished chunk to the checkpoint directory.
+        Chunks completed by an earlier, interrupted run are loaded instead of being detected again,
+        so `frames` must start at the frame returned by get_checkpoint_frames_number.
+
+        :param frames: Iterable of the frames not covered by the checkpoint yet.
+        :param checkpoint_path: Path to the checkpoint directory.
+        :param frames_number: Optional total number of frames, used for progress reporting.
+        :return: DetectionStore with the detections of all frames.
+        """
+        chunks = self._load_checkpoint_chunks(checkpoint_path)
+        frames_done = sum(len(chunk) for chunk in chunks)
+        if chunks:
+            print(f"Resuming detection from frame {frames_done} ({len(chunks)} chunks completed)")
+
+        start_time = time.perf_counter()
+        frames_detected = 0
+
+        for _, chunk_frames in video_control_utils.iter_frame_windows(frames, self.chunk_size):
+            chunk_start_time = time.perf_counter()
+            chunk = self.detect_objects_with_stride(chunk_frames, frames_done)
+            cache_utils.save_arrays_to_cache(chunk.to_arrays(), cache_utils.get_checkpoint_chunk_path(checkpoint_path, len(chunks)))
+            chunks.append(chunk)
+
+            # Report progress and throughput of the chunk and of this run so far
+            frames_done += len(chunk)
+            frames_detected += len(chunk)
+            chunk_fps = len(chunk) / max(time.perf_counter() - chunk_start_time, 1e-9)
+            run_fps = frames_detected / max(time.perf_counter() - start_time, 1e-9)
+            progress = f"{frames_done}/{frames_number} frames" if frames_number else f"{frames_done} frames"
+            print(f"Detection chunk {len(chunks) - 1} done: {progress}, {chunk_fps:.2f} frames/s (average {run_fps:.2f} frames/s)")
+
+        if not chunks:
+            return DetectionStore.from_ultralytics([])
+
+        return DetectionStore.concatenate(chunks)
+
+    def detect_objects_with_stride(self, frames, start_frame=0):
+        """
+        Detects objects on every stride-th frame of the video only. The skipped frames get no
+        detections and are marked as not detected, so the tracker can fill them in afterwards.
+
+        :param frames: List of consecutive frames.
+        :param start_frame: Frame number of the first frame, so the stride is counted from the start of the video.
+        :return: DetectionStore covering all given frames.
+        """
+        detected = (start_frame + np.arange(len(frames))) % self.stride == 0
+        detected_frames = [frame for frame, is_detected in zip(frames, detected) if is_detected]
+
+        if self.ball_roi_detector is not None:
+            frame_numbers = (start_frame + np.flatnonzero(detected)).tolist()
+            detections, class_names = self.ball_roi_detector.detect(detected_frames, frame_numbers)
+            for detection in detections:
+                self.convert_goalkeeper_to_player(detection.class_id, class_names)
+            return DetectionStore.from_detections(detections, class_names).expand_frames(detected)
+
+        return self.detect_objects_on_frames(detected_frames).expand_frames(detected)
+
+    def _load_checkpoint_chunks(self, checkpoint_path):
+        """
+        Loads the completed chunks of a checkpoint in frame order.
+
+        :param checkpoint_path: Path to the checkpoint directory.
+        :return: List of DetectionStore chunks.
+        """
+        chunks = []
+        for chunk_path in cache_utils.list_checkpoint_chunks(checkpoint_path):
+            arrays = cache_utils.load_arrays_from_cache(chunk_path)
+            if arrays is None:
+                break
+            chunks.append(DetectionStore.from_arrays(arrays))
+        return chunks
 
     def detect_objects_on_frames(self, frames):
         """
-        Detects objects in a list of frames using the YOLO model.
+        Detects objects in a list of frames using the YOLO model. The results of every batch are
+        reduced to compact arrays with goalkeepers already converted to players, so the full
+        ultralytics results and the images they reference are not kept.
 
         :param frames: List of frames to perform detection on.
-        :return: List of detections for each frame.
+        :return: DetectionStore with the detections of each frame.
         """
-        detections = []
+        batches = []
         for i in range(0, len(frames), self.batch_size):
             # Perform batch prediction
-            detections_batch = self.model.predict(
+            detections_batch = DetectionStore.from_ultralytics(self.model.predict(
                 frames[i:i + self.batch_size], 
                 imgsz=self.imgsz,  # Use image size from config
                 conf=self.confidence_threshold
-            )
-
-            # Process each detection batch
-            for detection in detections_batch:
-                detection_supervision = sv.Detections.from_ultralytics(detection)
-                self.convert_goalkeeper_to_player(detection_supervision, detection.names)
+            ))
+            self.convert_goalkeeper_to_player(detections_batch.class_id, detections_batch.class_names)
+            batches.append(detections_batch)
 
-            detections.extend(detections_batch)  # Efficient appending
-        return detections
+        if not batches:
+            return DetectionStore.from_ultralytics([])
+        return DetectionStore.concatenate(batches)
 
-    def convert_goalkeeper_to_player(self, detection_supervision, class_names):
+    def convert_goalkeeper_to_player(self, class_id, class_names):
         """
-        Converts detected goalkeeper class to player class.
+        Converts detected goalkeeper class to player class in place.
 
-        :param detection_supervision: Supervision detection object.
-        :param class_names: List of class names.
+        :param class_id: Array of class IDs of the detections.
+        :param class_names: Dictionary mapping class IDs to class names.
         """
-        for object_ind, class_id in enumerate(detection_supervision.class_id):
-            if class_names[class_id] == constants.GOALKEEPER_KEY:
-                detection_supervision.class_id[object_ind] = 2
+        goalkeeper_ids = [object_class_id for object_class_id, name in class_names.items() if name == constants.GOALKEEPER_KEY]
+        class_id[np.isin(class_id, goalkeeper_ids)] = constants.PLAYER_CLASS_ID
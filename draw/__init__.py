@@ -1,2 +1,3 @@
 from .drawer import Drawer
-from .scoreboard import Scoreboard
\ No newline at end of file
+from .scoreboard import Scoreboard
+from .parallel_renderer import ParallelRenderer
\ No newline at end of file
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 from utils import geometry_utils
+from track_objects import TrackStore
 import constants
 import config
 from .scoreboard import Scoreboard
@@ -85,29 +86,34 @@ class Drawer:
         return frame
 
 
-    def draw_team_ball_control(self, frame, frame_num, team_ball_control, home_team_time, away_team_time, home_team_possession, away_team_possession):
+    def draw_annotations(self, frame_num, frame, tracks, team_ball_control, home_team_time, away_team_time, home_team_possession, away_team_possession, home_team_color, away_team_color):
         """
-        Draws the scoreboard showing team possession and time control.
+        Draws all the annotations on the frame including players, referees, and ball.
 
-        :param frame: The video frame to draw on.
         :param frame_num: The current frame number.
+        :param frame: The video frame to draw on.
+        :param tracks: Tracking data for all frames, as a TrackStore or in the dictionary layout.
         :param team_ball_control: List of ball control states per frame.
         :param home_team_time: Total possession time for the home team.
         :param away_team_time: Total possession time for the away team.
         :param home_team_possession: Percentage possession for the home team.
         :param away_team_possession: Percentage possession for the away team.
-        :return: The frame with the scoreboard drawn.
+        :param home_team_color: Color to use for home team annotations.
+        :param away_team_color: Color to use for away team annotations.
+        :return: The frame with all annotations drawn.
         """
-        frame = self.scoreboard.draw(frame, home_team_possession, away_team_possession, home_team_time, away_team_time)
-        return frame
+        return self.draw_frame(
+            frame,
+            self.get_frame_data(tracks, frame_num, team_ball_control, home_team_time, away_team_time,
+                                home_team_possession, away_team_possession, home_team_color, away_team_color)
+        )
 
-    def draw_annotations(self, frame_num, frame, tracks, team_ball_control, home_team_time, away_team_time, home_team_possession, away_team_possession, home_team_color, away_team_color):
+    def get_frame_data(self, tracks, frame_num, team_ball_control, home_team_time, away_team_time, home_team_possession, away_team_possession, home_team_color, away_team_color):
         """
-        Draws all the annotations on the frame including players, referees, and ball.
+        Collects everything needed to annotate one frame, so the frame can be drawn without the tracks of the whole video.
 
+        :param tracks: Tracking data for all frames, as a TrackStore or in the dictionary layout.
         :param frame_num: The current frame number.
-        :param frame: The video frame to draw on.
-        :param tracks: Tracking data for all frames.
         :param team_ball_control: List of ball control states per frame.
         :param home_team_time: Total possession time for the home team.
         :param away_team_time: Total possession time for the away team.
@@ -115,37 +121,77 @@ class Drawer:
         :param away_team_possession: Percentage possession for the away team.
         :param home_team_color: Color to use for home team annotations.
         :param away_team_color: Color to use for away team annotations.
+        :return: Dictionary with the objects, ball control, and possession statistics of the frame.
+        """
+        return {
+            constants.PLAYERS_KEY: self.get_frame_objects(tracks, frame_num, constants.PLAYERS_KEY, home_team_color),
+            constants.REFEREES_KEY: self.get_frame_objects(tracks, frame_num, constants.REFEREES_KEY, self.referee_color),
+            constants.BALL_KEY: self.get_frame_objects(tracks, frame_num, constants.BALL_KEY, self.default_ball_color),
+            'ball_control': team_ball_control[frame_num],
+            'possession': (home_team_time, away_team_time, home_team_possession, away_team_possession),
+            'team_colors': (home_team_color, away_team_color)
+        }
+
+    def draw_frame(self, frame, frame_data):
+        """
+        Draws all the annotations on the frame from the data returned by get_frame_data.
+
+        :param frame: The video frame to draw on.
+        :param frame_data: Dictionary with the objects, ball control, and possession statistics of the frame.
         :return: The frame with all annotations drawn.
         """
-        player_dict = tracks[constants.PLAYERS_KEY][frame_num]
-        ball_dict = tracks[constants.BALL_KEY][frame_num]
-        referee_dict = tracks[constants.REFEREES_KEY][frame_num]
+        home_team_color, away_team_color = frame_data['team_colors']
+        home_team_time, away_team_time, home_team_possession, away_team_possession = frame_data['possession']
 
         # Draw players
-        for track_id, player in player_dict.items():
-            color = player.get(constants.TEAM_COLOR_KEY, home_team_color)
-            frame = self.draw_ellipse(frame, player[constants.BOUNDING_BOX_KEY], color, track_id)
+        for track_id, bounding_box, color, has_ball in frame_data[constants.PLAYERS_KEY]:
+            frame = self.draw_ellipse(frame, bounding_box, color, track_id)
 
             # Draw triangle above the player if they have the ball
-            if player.get(constants.HAS_BALL_KEY, False):
-                frame = self.draw_triangle(frame, player[constants.BOUNDING_BOX_KEY], color)
+            if has_ball:
+                frame = self.draw_triangle(frame, bounding_box, color)
 
         # Draw referees
-        for _, referee in referee_dict.items():
-            frame = self.draw_ellipse(frame, referee[constants.BOUNDING_BOX_KEY], self.referee_color)
+        for _, bounding_box, _, _ in frame_data[constants.REFEREES_KEY]:
+            frame = self.draw_ellipse(frame, bounding_box, self.referee_color)
 
         # Draw ball
-        for track_id, ball in ball_dict.items():
-            if team_ball_control[frame_num] == constants.HOME_TEAM_ID:
+        for _, bounding_box, _, _ in frame_data[constants.BALL_KEY]:
+            if frame_data['ball_control'] == constants.HOME_TEAM_ID:
                 ball_color = home_team_color
-            elif team_ball_control[frame_num] == constants.AWAY_TEAM_ID:
+            elif frame_data['ball_control'] == constants.AWAY_TEAM_ID:
                 ball_color = away_team_color
             else:
                 ball_color = self.default_ball_color
 
-            frame = self.draw_triangle(frame, ball[constants.BOUNDING_BOX_KEY], ball_color)
+            frame = self.draw_triangle(frame, bounding_box, ball_color)
         
         # Draw team possession and time control
-        frame = self.draw_team_ball_control(frame, frame_num, team_ball_control, home_team_time, away_team_time, home_team_possession, away_team_possession)
+        frame = self.scoreboard.draw(frame, home_team_possession, away_team_possession, home_team_time, away_team_time)
 
         return frame
+
+    def get_frame_objects(self, tracks, frame_num, key, default_color):
+        """
+        Lists the objects of one class in a frame, reading a TrackStore directly when given one.
+
+        :param tracks: Tracking data for all frames, as a TrackStore or in the dictionary layout.
+        :param frame_num: The current frame number.
+        :param key: The class of objects to list (players, referees, or ball).
+        :param default_color: Color used for objects without a team color.
+        :return: List of (track ID, bounding box, color, has ball) tuples.
+        """
+        if isinstance(tracks, TrackStore):
+            rows = tracks.get_rows(frame_num, key)
+            return [
+                (track_id, bounding_box, tracks.get_team_color(team_id, default_color), has_ball)
+                for track_id, bounding_box, team_id, has_ball in zip(
+                    tracks.track_id[rows].tolist(), tracks.bounding_box[rows].tolist(),
+                    tracks.team[rows].tolist(), tracks.has_ball[rows].tolist())
+            ]
+
+        return [
+            (track_id, track[constants.BOUNDING_BOX_KEY], track.get(constants.TEAM_COLOR_KEY, default_color),
+             track.get(constants.HAS_BALL_KEY, False))
+            for track_id, track in tracks[key][frame_num].items()
+        ]
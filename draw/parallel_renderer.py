@@ -0,0 +1,82 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import config
+from .drawer import Drawer
+
+# Drawer of the current worker process, created once by the pool initializer
+_worker_drawer = None
+
+
+def _init_worker():
+    global _worker_drawer
+    _worker_drawer = Drawer()
+
+
+def _render_frame(frame, frame_data):
+    return _worker_drawer.draw_frame(frame, frame_data)
+
+
+class ParallelRenderer:
+    def __init__(self, workers=None, max_in_flight=None):
+        """
+        Initializes the renderer, which draws annotations on frames in a pool of worker processes.
+
+        :param workers: Number of worker processes; 0 uses all CPU cores and 1 draws in the current process.
+        :param max_in_flight: Maximum number of frames submitted to the workers and not yet returned.
+        """
+        workers = config.RENDER_WORKERS if workers is None else workers
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max(config.RENDER_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight, self.workers)
+        self.executor = None
+
+    def start(self):
+        """
+        Starts the worker processes. Call it from the main thread before any pipeline thread is started:
+        with the fork start method, forking while another thread is inside a library call such as a
+        video decoder can deadlock the workers.
+        """
+        if self.workers == 1 or self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # The pool forks all of its workers on the first submitted task, so fork them here
+        self.executor.submit(int).result()
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def render(self, frames, frame_data):
+        """
+        Draws the annotations of every frame and yields the annotated frames in their original order.
+        At most `max_in_flight` frames are held by the workers at any time, so memory stays bounded.
+        Workers that were not started with start() are started here and stopped when the frames are drawn.
+
+        :param frames: Iterable of video frames.
+        :param frame_data: Iterable of per-frame data from Drawer.get_frame_data, one per frame.
+        :return: Generator of annotated frames.
+        """
+        if self.workers == 1:
+            drawer = Drawer()
+            for frame, data in zip(frames, frame_data):
+                yield drawer.draw_frame(frame, data)
+            return
+
+        started_here = self.executor is None
+        self.start()
+        try:
+            in_flight = deque()
+            for frame, data in zip(frames, frame_data):
+                if len(in_flight) >= self.max_in_flight:
+                    yield in_flight.popleft().result()
+                in_flight.append(self.executor.submit(_render_frame, frame, data))
+
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            if started_here:
+                self.close()
@@ -1,9 +1,10 @@
 import cv2
 import numpy as np
+from collections import OrderedDict
 
 # Константе за хардкодиране вредности
 FONT = cv2.FONT_HERSHEY_DUPLEX
-BACKGROUND_IMAGE_PATH = 'data/pozadina.png'
+BACKGROUND_IMAGE_PATH = 'data/pozadina_2.png'
 FONT_SCALE = 0.8
 FONT_COLOR = (255, 255, 255, 200)  # Бело са благом транспарентношћу
 FONT_SHADOW_COLOR = (30, 30, 30, 255)  # Већа сенка
@@ -16,6 +17,9 @@ TIME_OFFSET_Y = 150
 TIME_OFFSET_X = 80
 HOME_TEAM_COLOR = (0, 0, 255)  # Црвена боја за домаћи тим
 AWAY_TEAM_COLOR = (255, 255, 255)  # Бела боја за гостујући тим
+TEXT_SHADOW_OFFSET = 2
+TEXT_MARGIN = 4  # Extra pixels around text for anti-aliasing
+PATCH_CACHE_SIZE = 32  # Number of rendered scoreboard patches kept in memory
 
 class Scoreboard:
     def __init__(self):
@@ -24,6 +28,8 @@ class Scoreboard:
         """
         self.font = FONT
         self.background_image = cv2.imread(BACKGROUND_IMAGE_PATH, cv2.IMREAD_UNCHANGED)
+        if self.background_image is None:
+            raise ValueError(f"Cannot read scoreboard background image: {BACKGROUND_IMAGE_PATH}")
 
         # Text and progress bar drawing parameters
         self.font_scale = FONT_SCALE
@@ -39,6 +45,11 @@ class Scoreboard:
         self.home_team_color = HOME_TEAM_COLOR
         self.away_team_color = AWAY_TEAM_COLOR
 
+        # Resized overlays per overlay size, and rendered patches per frame size and displayed values
+        self.overlay_cache = {}
+        self.patch_cache = OrderedDict()
+        self.patch_cache_size = PATCH_CACHE_SIZE
+
     def draw(self, frame, home_team_possession, away_team_possession, home_team_time, away_team_time):
         """
         Draws the scoreboard with team possession and times.
@@ -51,23 +62,84 @@ class Scoreboard:
         :return: The frame with the scoreboard drawn.
         """
         frame_height, frame_width = frame.shape[:2]
+        displayed_values = self._get_displayed_values(frame_width, home_team_possession, away_team_possession, home_team_time, away_team_time)
+
+        # The scoreboard only changes when the displayed values change, so its patch is rendered once per values
+        key = (frame_width, frame_height) + displayed_values
+        patch = self.patch_cache.get(key)
+        if patch is None:
+            patch = self._render_patch(frame_width, frame_height, home_team_possession, away_team_possession, home_team_time, away_team_time)
+            self.patch_cache[key] = patch
+            if len(self.patch_cache) > self.patch_cache_size:
+                self.patch_cache.popitem(last=False)
+        else:
+            self.patch_cache.move_to_end(key)
 
-        # Calculate overlay dimensions
-        overlay_width, overlay_height = self._calculate_overlay_dimensions(frame_width)
+        (x1, y1, x2, y2), patch_base, patch_weight = patch
+        region = frame[y1:y2, x1:x2]
+        region[:] = (patch_base + patch_weight * region) // 255
+        return frame
 
-        # Position the scoreboard at the top, centered horizontally
-        pos_x, pos_y = self._calculate_top_center_overlay_position(frame_width, overlay_width, frame_height, overlay_height)
+    def _get_displayed_values(self, frame_width, home_team_possession, away_team_possession, home_team_time, away_team_time):
+        """
+        Returns the values shown on the scoreboard, which change at most once per second.
 
-        # Add background (overlay) to the frame with less transparency
-        frame = self._overlay_image(frame, overlay_width, overlay_height, pos_x, pos_y, alpha=0.8)
+        :param frame_width: Width of the video frame.
+        :param home_team_possession: Possession percentage of the home team.
+        :param away_team_possession: Possession percentage of the away team.
+        :param home_team_time: Total possession time for the home team.
+        :param away_team_time: Total possession time for the away team.
+        :return: Tuple of the time texts, the possession texts, and the home team bar length.
+        """
+        time1, time2, text1, text2 = self._format_time_and_possession(home_team_possession, away_team_possession, home_team_time, away_team_time)
+        overlay_width, _ = self._calculate_overlay_dimensions(frame_width)
+        home_team_bar_length = int((home_team_possession / 100) * int(overlay_width * 0.8))
+        return time1, time2, text1, text2, home_team_bar_length
 
-        # Draw text for time and possession
-        self._draw_time_and_possession(frame, home_team_possession, away_team_possession, home_team_time, away_team_time, overlay_width, pos_x, pos_y)
+    def _render_patch(self, frame_width, frame_height, home_team_possession, away_team_possession, home_team_time, away_team_time):
+        """
+        Renders the scoreboard region on a black and on a white background. The result on any background
+        follows from these two, since every drawing step is a per-pixel blend with the background:
+        result = (black * 255 + (white - black) * background) / 255.
 
-        # Draw progress bar
-        self._draw_progress_bar(frame, home_team_possession, overlay_width, overlay_height, pos_x, pos_y)
+        :param frame_width: Width of the video frame.
+        :param frame_height: Height of the video frame.
+        :param home_team_possession: Possession percentage of the home team.
+        :param away_team_possession: Possession percentage of the away team.
+        :param home_team_time: Total possession time for the home team.
+        :param away_team_time: Total possession time for the away team.
+        :return: Tuple of the region (x1, y1, x2, y2), the rounded base term, and the background weight, both int32.
+        """
+        overlay_width, overlay_height = self._calculate_overlay_dimensions(frame_width)
+        pos_x, pos_y = self._calculate_top_center_overlay_position(frame_width, overlay_width, frame_height, overlay_height)
+        x1, y1, x2, y2 = self._calculate_patch_region(frame_width, frame_height, home_team_possession, away_team_possession,
+                                                      home_team_time, away_team_time, overlay_width, overlay_height, pos_x, pos_y)
+
+        rendered = []
+        for background_value in (0, 255):
+            region = np.full((y2 - y1, x2 - x1, 3), background_value, dtype=np.uint8)
+            region = self._overlay_image(region, overlay_width, overlay_height, pos_x - x1, pos_y - y1, alpha=0.8)
+            self._draw_time_and_possession(region, home_team_possession, away_team_possession, home_team_time, away_team_time, overlay_width, pos_x - x1, pos_y - y1)
+            self._draw_progress_bar(region, home_team_possession, overlay_width, overlay_height, pos_x - x1, pos_y - y1)
+            rendered.append(region.astype(np.int32))
+
+        on_black, on_white = rendered
+        return (x1, y1, x2, y2), on_black * 255 + 127, on_white - on_black
+
+    def _calculate_patch_region(self, frame_width, frame_height, home_team_possession, away_team_possession,
+                                home_team_time, away_team_time, overlay_width, overlay_height, pos_x, pos_y):
+        """
+        Calculates the frame region covered by the overlay and the text drawn on it.
 
-        return frame
+        :return: Region (x1, y1, x2, y2) clipped to the frame.
+        """
+        x1, y1, x2, y2 = pos_x, pos_y, pos_x + overlay_width, pos_y + overlay_height
+        margin = self.font_thickness + TEXT_SHADOW_OFFSET + TEXT_MARGIN
+        for text, x, y in self._get_text_positions(home_team_possession, away_team_possession, home_team_time, away_team_time, overlay_width, pos_x, pos_y):
+            (text_width, text_height), baseline = cv2.getTextSize(text, self.font, self.font_scale, self.font_thickness)
+            x1, y1 = min(x1, x - margin), min(y1, y - text_height - margin)
+            x2, y2 = max(x2, x + text_width + margin), max(y2, y + baseline + margin)
+        return max(x1, 0), max(y1, 0), min(x2, frame_width), min(y2, frame_height)
 
     def _calculate_overlay_dimensions(self, frame_width):
         """
@@ -110,7 +182,10 @@ class Scoreboard:
         :param alpha: Alpha transparency for the overlay.
         :return: The frame with the overlay.
         """
-        overlay = cv2.resize(self.background_image, (overlay_width, overlay_height))
+        overlay = self.overlay_cache.get((overlay_width, overlay_height))
+        if overlay is None:
+            overlay = cv2.resize(self.background_image, (overlay_width, overlay_height))
+            self.overlay_cache[(overlay_width, overlay_height)] = overlay
         return self._overlay_image_on_frame(frame, overlay, pos_x, pos_y, alpha)
 
     def _draw_time_and_possession(self, frame, home_team_possession, away_team_possession, home_team_time, away_team_time, overlay_width, pos_x, pos_y):
@@ -126,21 +201,40 @@ class Scoreboard:
         :param pos_x: X position to draw text.
         :param pos_y: Y position to draw text.
         """
+        for text, x, y in self._get_text_positions(home_team_possession, away_team_possession, home_team_time, away_team_time, overlay_width, pos_x, pos_y):
+            self._add_text_with_shadow(frame, text, x, y, self.font_scale, self.font_color, self.font_thickness)
+
+    def _format_time_and_possession(self, home_team_possession, away_team_possession, home_team_time, away_team_time):
+        """
+        Formats the possession times as mm:ss and the possession percentages.
+
+        :return: Tuple of the home and away time texts and the home and away possession texts.
+        """
         time1 = f"{int(home_team_time // 60):02d}:{int(home_team_time % 60):02d}"
         time2 = f"{int(away_team_time // 60):02d}:{int(away_team_time % 60):02d}"
         text1 = f"{home_team_possession:.0f}%"
         text2 = f"{away_team_possession:.0f}%"
+        return time1, time2, text1, text2
+
+    def _get_text_positions(self, home_team_possession, away_team_possession, home_team_time, away_team_time, overlay_width, pos_x, pos_y):
+        """
+        Calculates where the time and possession texts are drawn.
+
+        :return: List of (text, x, y) tuples.
+        """
+        time1, time2, text1, text2 = self._format_time_and_possession(home_team_possession, away_team_possession, home_team_time, away_team_time)
 
         # Calculate text width for positioning
         text_width_time, _ = cv2.getTextSize(time2, self.font, self.font_scale, self.font_thickness)[0]
         text_width_possession, _ = cv2.getTextSize(text2, self.font, self.font_scale, self.font_thickness)[0]
 
-        # Draw time and possession percentages with offsets
-        self._add_text_with_shadow(frame, time1, pos_x + self.time_offset_x, pos_y + self.time_offset_y, self.font_scale, self.font_color, self.font_thickness)
-        self._add_text_with_shadow(frame, time2, pos_x + overlay_width - self.time_offset_x - text_width_time, pos_y + self.time_offset_y, self.font_scale, self.font_color, self.font_thickness)
-
-        self._add_text_with_shadow(frame, text1, pos_x + self.text_offset_x, pos_y + self.text_offset_y - 5, self.font_scale, self.font_color, self.font_thickness)
-        self._add_text_with_shadow(frame, text2, pos_x + overlay_width - self.text_offset_x - text_width_possession, pos_y + self.text_offset_y - 5, self.font_scale, self.font_color, self.font_thickness)
+        # Time and possession percentages with offsets
+        return [
+            (time1, pos_x + self.time_offset_x, pos_y + self.time_offset_y),
+            (time2, pos_x + overlay_width - self.time_offset_x - text_width_time, pos_y + self.time_offset_y),
+            (text1, pos_x + self.text_offset_x, pos_y + self.text_offset_y - 5),
+            (text2, pos_x + overlay_width - self.text_offset_x - text_width_possession, pos_y + self.text_offset_y - 5)
+        ]
 
     def _draw_progress_bar(self, frame, home_team_possession, overlay_width, overlay_height, pos_x, pos_y):
         """
@@ -211,7 +305,7 @@ class Scoreboard:
         :param thickness: Font thickness.
         """
         # Draw shadow
-        shadow_offset = 2  # Larger shadow
+        shadow_offset = TEXT_SHADOW_OFFSET  # Larger shadow
         cv2.putText(frame, text, (x + shadow_offset, y + shadow_offset), self.font, font_scale, self.font_shadow_color, thickness, cv2.LINE_AA)
         
         # Draw text with slight transparency
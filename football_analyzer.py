@@ -1,9 +1,11 @@
+import os
 import cv2
 import numpy as np
-from utils import video_control_utils
-from track_objects import ObjectTracker
-from detect_objects import ObjectDetector
-from draw import Drawer
+from concurrent.futures import ProcessPoolExecutor
+from utils import video_control_utils, pipeline_utils, metrics_utils, frame_index_utils
+from track_objects import ObjectTracker, TrackStore, TrackStitcher
+from detect_objects import ObjectDetector, DetectionStore, backends
+from draw import Drawer, ParallelRenderer
 from classify_players import TeamClassifier
 from assign_ball import BallAssigner
 from calculate_possession import PossessionCalculator
@@ -11,90 +13,553 @@ from cache import cache_utils
 import config
 import constants
 
+# Detector of the current segment worker process, created once by the pool initializer
+_worker_detector = None
+
+
+def _init_segment_worker(threads_number):
+    global _worker_detector
+    import torch
+
+    # The workers share the CPU cores, so each runs the model on its share of them
+    torch.set_num_threads(threads_number)
+    _worker_detector = ObjectDetector()
+
+
+def _analyze_segment(video_path, segment_start, start_frame, stop_frame, window_size, detections=None, frame_index=None, detector=None):
+    """
+    Detects, tracks, and samples player colors on one segment of the video, e.g. in a worker process.
+    The segment is tracked from segment_start, but colors are only sampled from start_frame on, so no
+    frame is sampled by two segments.
+
+    :param video_path: Path to the video file.
+    :param segment_start: First frame tracked, including the frames shared with the previous segment.
+    :param start_frame: First frame that belongs to the segment.
+    :param stop_frame: Frame after the last frame of the segment, None to read to the end of the video.
+    :param window_size: Maximum number of decoded frames held in memory at once.
+    :param detections: Cached detections of the tracked frames; detected here if omitted.
+    :param frame_index: Frame index of the video, used to seek to the first tracked frame; built here if omitted.
+    :param detector: ObjectDetector to use, defaults to the one of the worker process.
+    :return: Tuple of the tracks of all tracked frames (None if the segment has no frames), the new
+             detections of the frames that belong to the segment (None if cached), and the team classifier
+             with the color samples.
+    """
+    detector = detector or _worker_detector
+    detector.reset()
+    tracker, team_assigner = ObjectTracker(), TeamClassifier()
+    window_stores, detection_stores = [], []
+
+    with frame_index_utils.VideoFrameReader(video_path, frame_index) as reader:
+        frames = reader.iter_range(segment_start, stop_frame)
+        for window_start, window in video_control_utils.iter_frame_windows(frames, window_size):
+            if detections is None:
+                # Frame numbers are counted from the start of the video, so the detection stride lines up with a serial run
+                window_detections = detector.detect_objects_with_stride(window, segment_start + window_start)
+                detection_stores.append(window_detections)
+            else:
+                window_detections = detections.slice_frames(window_start, window_start + len(window))
+            window_tracks = tracker.track_objects(window_detections, len(window))
+
+            owned_start = max(start_frame - segment_start - window_start, 0)
+            if owned_start < len(window):
+                owned_tracks = {key: frame_tracks[owned_start:] for key, frame_tracks in window_tracks.items()}
+                # Only the first segment initializes the team colors; the samples of the others are merged into it
+                team_assigner.collect_track_samples(owned_tracks, window[owned_start:], initialize=start_frame == 0)
+            window_stores.append(TrackStore.from_tracks(window_tracks))
+
+    if not window_stores:
+        return None, None, team_assigner
+
+    tracks = TrackStore.concatenate(window_stores)
+    owned_detections = None
+    if detection_stores:
+        owned_detections = DetectionStore.concatenate(detection_stores).slice_frames(start_frame - segment_start, len(tracks))
+    return tracks, owned_detections, team_assigner
+
+
 class FootballAnalyzer:
-    def __init__(self):
+    def __init__(self, video_path=None, output_path=None, cache_dir=None, metrics_path=None, prometheus_path=None, detector=None):
         """
         Initializes the FootballAnalyzer with paths and components for video analysis.
+        Paths that are not given are taken from the config.
+
+        :param video_path: Path to the input video file.
+        :param output_path: Path for the output video file.
+        :param cache_dir: Directory for the cache entries of this video.
+        :param metrics_path: Path of the JSON file with the metrics of the run.
+        :param prometheus_path: Path of the Prometheus textfile with the metrics of the run.
+        :param detector: ObjectDetector to reuse, e.g. one whose model is already loaded; a new one is created if omitted.
         """
         # Paths configuration
-        self.video_path = config.VIDEO_PATH
+        self.video_path = video_path or config.VIDEO_PATH
         self.model_path = config.MODEL_PATH
-        self.cache_path = config.CACHE_PATH
-        self.output_path = config.OUTPUT_PATH
+        self.cache_dir = cache_dir or config.CACHE_DIR
+        self.output_path = output_path or config.OUTPUT_PATH
+        self.metrics_path = metrics_path or config.METRICS_JSON_PATH
+        self.prometheus_path = prometheus_path or config.METRICS_PROMETHEUS_PATH
+        self.window_size = config.STREAMING_WINDOW_SIZE
+        self.segment_workers = max(config.SEGMENT_WORKERS, 1)
+        self.segment_length = config.SEGMENT_LENGTH
+        self.segment_overlap = config.SEGMENT_OVERLAP
+        self.team_assignment_mode = config.TEAM_ASSIGNMENT_MODE
 
         # Video and tracking data initialization
         self.video = None
         self.tracks = None
+        self.frame_index = None
         
         # Initialize components for object detection, tracking, and analysis
-        self.detector = ObjectDetector() 
+        self.detector = detector or ObjectDetector()
         self.tracker = ObjectTracker()
         self.team_assigner = TeamClassifier()
         self.player_assigner = BallAssigner()
         self.possession_calculator = PossessionCalculator()
         self.drawer = Drawer()
+        self.renderer = ParallelRenderer()
+
+        # Wall time, throughput, memory and item counts of every stage of the run
+        self.metrics = metrics_utils.MetricsRecorder({'video': self.video_path})
 
     def run(self):
         """
         Main method to run the football analysis pipeline.
         """
         # Load video
-        self.video = video_control_utils.read_video(self.video_path)
+        with self.metrics.stage('read_video') as stage:
+            self.video = video_control_utils.read_video(self.video_path)
+            stage.frames = len(self.video)
         
         # Validate the loaded video frames
         if not self.video or self.video[0].shape[0] == 0 or self.video[0].shape[1] == 0:
             raise ValueError("Invalid video frame dimensions.")
         
         # Load cached tracks if available, otherwise perform detection and tracking
-        self.tracks = self.tracker.get_cached_tracks(self.cache_path)
+        tracks_cache_path = self.get_tracks_cache_path()
+        self.import_legacy_tracks(tracks_cache_path)
+        self.tracks = self.tracker.get_cached_tracks(tracks_cache_path)
 
         if self.tracks is None:
-            # Detect objects in video frames
-            detections = self.detector.detect_objects_on_frames(self.video)
-            # Track detected objects across frames
-            self.tracks = self.tracker.track_objects(detections, len(self.video))
+            # Load cached raw detections if available, otherwise detect objects in video frames
+            detections_cache_path = self.get_detections_cache_path()
+            detections = self.detector.get_cached_detections(detections_cache_path)
+            if detections is None:
+                detections = self.detect_with_checkpoints(detections_cache_path, self.video)
+            with self.metrics.stage('track', frames=len(self.video)) as stage:
+                # Track detected objects across frames
+                self.tracks = TrackStore.from_tracks(self.tracker.track_objects(detections, len(self.video)))
+                # Fill in the frames skipped by strided detection
+                self.tracks = self.tracker.interpolate_skipped_frames(self.tracks)
+                stage.add_items('track_rows', len(self.tracks.frame))
             # Cache the tracks to avoid recomputation in future runs
-            cache_utils.save_tracks_to_cache(self.tracks, self.cache_path)
+            self.tracker.save_tracks_to_cache(self.tracks, tracks_cache_path, self.get_cache_metadata())
 
         # Interpolate missing ball positions to improve continuity in tracking
-        self.tracks[constants.BALL_KEY] = self.tracker.interpolate_ball_positions(self.tracks[constants.BALL_KEY])
+        with self.metrics.stage('smooth_ball', frames=len(self.tracks)):
+            self.tracks = self.tracker.smooth_ball_track(self.tracks)
+
+        with self.metrics.stage('assign_teams', frames=len(self.video)):
+            # Dictionary view of the tracks for team assignment
+            tracks = self.tracks.to_tracks()
+
+            # Initialize team colors based on initial frames to improve accuracy in team assignment
+            frames_for_initialization = [self.video[i] for i in range(self.team_assigner.initialization_frames)]
+            player_detections_list = [tracks[constants.PLAYERS_KEY][i] for i in range(self.team_assigner.initialization_frames)]
+            self.team_assigner.initialize_team_colors(frames_for_initialization, player_detections_list)
 
-        # Initialize team colors based on initial frames to improve accuracy in team assignment
-        frames_for_initialization = [self.video[i] for i in range(self.team_assigner.initialization_frames)]
-        player_detections_list = [self.tracks[constants.PLAYERS_KEY][i] for i in range(self.team_assigner.initialization_frames)]
-        self.team_assigner.initialize_team_colors(frames_for_initialization, player_detections_list)
+            # Assign teams to players after initialization of team colors
+            if self.team_assignment_mode == 'track':
+                self.team_assigner.assign_teams_by_track(tracks, self.video)
+            else:
+                self.team_assigner.assign_teams_to_players(tracks, self.video)
 
-        # Assign teams to players after initialization of team colors
-        self.team_assigner.assign_teams_to_players(self.tracks, self.video)
+            # Store the final tracks in columnar form for ball assignment and drawing
+            self.tracks = TrackStore.from_tracks(tracks)
        
         # Assign ball control to players to determine which team is in possession
-        team_ball_control = self.player_assigner.assign_ball_control(self.tracks)
+        with self.metrics.stage('assign_ball', frames=len(self.tracks)):
+            team_ball_control = self.player_assigner.assign_ball_control(self.tracks)
+
+        # Draw annotations and possession statistics on every frame and save the processed video
+        with self.metrics.stage('render', frames=len(team_ball_control)):
+            annotated_frames = self._annotate_frames(self.video, team_ball_control)
+            video_control_utils.save_video_stream(annotated_frames, self.output_path)
+        self.export_metrics()
+
+    def run_streaming(self):
+        """
+        Runs the football analysis pipeline without holding the whole video in memory.
+
+        Frames are decoded lazily and processed in windows of at most `window_size` frames.
+        The first pass detects, tracks and assigns teams window by window; the second pass
+        decodes the video again, draws the annotations and writes each frame immediately.
+        With cached tracks and track-level team assignment, the first pass only decodes the
+        frames that the team vote samples.
+        """
+        # Load cached tracks if available, otherwise they are built window by window
+        tracks_cache_path = self.get_tracks_cache_path()
+        self.import_legacy_tracks(tracks_cache_path)
+        cached_tracks = self.tracker.get_cached_tracks(tracks_cache_path)
+        window_stores = []
+
+        # Without cached tracks, replay cached raw detections or run resumable detection first
+        if cached_tracks is None:
+            detections_cache_path = self.get_detections_cache_path()
+            detections = self.detector.get_cached_detections(detections_cache_path)
+            if detections is None:
+                detections = self.detect_with_checkpoints(detections_cache_path)
+
+        if cached_tracks is not None and self.team_assignment_mode == 'track' and config.SPARSE_DECODING_ENABLED:
+            # Tracks are cached and teams are voted per track, so only the sampled frames are decoded
+            self._sample_cached_tracks(cached_tracks)
+            self.tracks = cached_tracks
+            with self.metrics.stage('assign_teams'):
+                self.team_assigner.assign_teams_from_track_samples(self.tracks)
+            self._render_tracks()
+            return
+
+        # First pass: detection, tracking and team assignment on bounded windows of frames
+        pipeline = pipeline_utils.Pipeline()
+        try:
+            frames = pipeline.add_stage(video_control_utils.iter_video_frames(self.video_path), 'decode')
+            for start_frame, window in video_control_utils.iter_frame_windows(frames, self.window_size):
+                if start_frame == 0:
+                    self._validate_frame(window[0])
+
+                if cached_tracks is None:
+                    # The tracker keeps its state between windows, so track IDs stay consistent
+                    with self.metrics.stage('track', frames=len(window)):
+                        window_detections = detections.slice_frames(start_frame, start_frame + len(window))
+                        window_tracks = self.tracker.track_objects(window_detections, len(window))
+                else:
+                    window_tracks = cached_tracks.to_tracks(start_frame, start_frame + len(window))
+
+                with self.metrics.stage('assign_teams', frames=len(window)):
+                    if self.team_assignment_mode == 'track':
+                        # Only sample colors here; teams are voted once all windows are seen
+                        self.team_assigner.collect_track_samples(window_tracks, window)
+                    else:
+                        self.team_assigner.assign_teams_to_players(window_tracks, window)
+                    window_stores.append(TrackStore.from_tracks(window_tracks))
+        finally:
+            pipeline.close()
+        pipeline.print_stats()
+
+        if not window_stores:
+            raise ValueError("Invalid video frame dimensions.")
+
+        self.tracks = TrackStore.concatenate(window_stores)
+        if self.team_assignment_mode == 'track':
+            with self.metrics.stage('assign_teams'):
+                self.team_assigner.assign_teams_from_track_samples(self.tracks)
+
+        if cached_tracks is None:
+            # Fill in the frames skipped by strided detection, then cache the tracks to avoid recomputation in future runs
+            with self.metrics.stage('track') as stage:
+                self.tracks = self.tracker.interpolate_skipped_frames(self.tracks)
+                stage.add_items('track_rows', len(self.tracks.frame))
+            self.tracker.save_tracks_to_cache(self.tracks, tracks_cache_path, self.get_cache_metadata())
+
+        self._render_tracks()
+
+    def _sample_cached_tracks(self, cached_tracks):
+        """
+        Samples player colors for the track-level team vote from cached tracks, decoding only the
+        frames used to initialize the team colors and the frames that hold a sample.
+
+        :param cached_tracks: Cached tracks of the whole video.
+        """
+        with self.metrics.stage('assign_teams', frames=len(cached_tracks)) as stage:
+            with frame_index_utils.VideoFrameReader(self.video_path, self.get_frame_index()) as reader:
+                if not len(reader):
+                    raise ValueError("Invalid video frame dimensions.")
+                self._validate_frame(reader[0])
+                self.team_assigner.collect_track_samples_from_store(cached_tracks, reader)
+                stage.add_items('decoded_frames', reader.decoded_frames)
+
+    def run_segmented(self):
+        """
+        Runs the football analysis pipeline with detection, tracking, and player color sampling split
+        into time segments of the video that are processed in parallel worker processes.
+
+        Every segment also tracks the last frames of the previous segment, and the track IDs of the
+        segments are joined on these shared frames. Team voting, ball smoothing, ball control, and
+        drawing then run on the whole match as in run_streaming, so the ball possession state carries
+        over from one segment to the next exactly as in a serial run.
+        """
+        tracks_cache_path = self.get_tracks_cache_path()
+        self.import_legacy_tracks(tracks_cache_path)
+        if cache_utils.load_arrays_from_cache(tracks_cache_path) is not None:
+            # Detection and tracking are cached, so the segments have nothing left to parallelize
+            self.run_streaming()
+            return
+
+        # Segments replay cached raw detections if available, otherwise every worker runs the model on its frames
+        detections_cache_path = self.get_detections_cache_path()
+        detections = self.detector.get_cached_detections(detections_cache_path)
+        segments = self.get_segments(len(self.get_frame_index()))
+        segment_detections = [None if detections is None else detections.slice_frames(segment_start, stop_frame or len(detections))
+                              for segment_start, _, stop_frame in segments]
+
+        stitcher = TrackStitcher()
+        segment_stores, detection_stores = [], []
+        with self.metrics.stage('segments') as stage:
+            workers = min(self.segment_workers, len(segments))
+            executor = None
+            if workers > 1:
+                # Export the model for the detector backend once here, instead of once in every worker
+                backends.prepare_model(self.model_path)
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_segment_worker,
+                                               initargs=(max((os.cpu_count() or 1) // workers, 1),))
+            try:
+                arguments = ([self.video_path] * len(segments), *zip(*segments), [self.window_size] * len(segments), segment_detections,
+                             [self.frame_index] * len(segments))
+                if executor:
+                    results = executor.map(_analyze_segment, *arguments)
+                else:
+                    # A single segment or worker runs in this process with the detector of the analyzer
+                    results = map(_analyze_segment, *arguments, [self.detector] * len(segments))
+
+                # Segments are stitched in order as their results arrive
+                for (segment_start, start_frame, _), (tracks, owned_detections, team_assigner) in zip(segments, results):
+                    if tracks is None:
+                        break
+                    tracks, track_ids = stitcher.stitch(tracks, start_frame - segment_start)
+                    segment_stores.append(tracks.slice_frames(start_frame - segment_start, len(tracks)))
+                    if owned_detections is not None:
+                        detection_stores.append(owned_detections)
+
+                    # The first segment initialized the team colors on the first frames of the video
+                    if start_frame == 0:
+                        self.team_assigner = team_assigner
+                    else:
+                        self.team_assigner.merge_track_samples(team_assigner.track_color_samples, track_ids)
+            finally:
+                if executor:
+                    executor.shutdown(cancel_futures=True)
+            stage.frames = sum(len(store) for store in segment_stores)
+            stage.add_items('segments', len(segment_stores))
+            stage.add_items('joined_tracks', stitcher.joined_tracks_number)
+
+        if not segment_stores:
+            raise ValueError("Invalid video frame dimensions.")
+
+        if detection_stores:
+            self.detector.save_detections_to_cache(DetectionStore.concatenate(detection_stores), detections_cache_path,
+                                                   self.get_cache_metadata())
+
+        self.tracks = TrackStore.concatenate(segment_stores)
+        with self.metrics.stage('assign_teams'):
+            self.team_assigner.assign_teams_from_track_samples(self.tracks)
+
+        # Fill in the frames skipped by strided detection, then cache the tracks to avoid recomputation in future runs
+        with self.metrics.stage('track') as stage:
+            self.tracks = self.tracker.interpolate_skipped_frames(self.tracks)
+            stage.add_items('track_rows', len(self.tracks.frame))
+        self.tracker.save_tracks_to_cache(self.tracks, tracks_cache_path, self.get_cache_metadata())
+
+        self._render_tracks()
+
+    def get_segments(self, frames_number):
+        """
+        Splits the video into segments of `segment_length` frames, rounded up to whole detection strides.
+        Every segment but the first starts `segment_overlap` frames early, to join its track IDs with
+        the previous segment.
+
+        :param frames_number: Number of frames in the video, None if unknown.
+        :return: List of (first tracked frame, first frame of the segment, frame after the segment) tuples;
+                 the last segment ends with the video, at None.
+        """
+        stride = self.detector.stride
+        segment_length = -(-max(self.segment_length, 1) // stride) * stride
+        overlap = min(self.segment_overlap, segment_length)
+        if not frames_number:
+            return [(0, 0, None)]
+
+        starts = range(0, frames_number, segment_length)
+        return [(max(start - overlap, 0), start, start + segment_length if start + segment_length < frames_number else None)
+                for start in starts]
+
+    def _render_tracks(self):
+        """
+        Smooths the ball track and assigns ball control on the final tracks, then draws and saves the
+        video in a second streaming pass and exports the metrics of the run.
+        """
+        # Interpolate missing ball positions to improve continuity in tracking
+        with self.metrics.stage('smooth_ball', frames=len(self.tracks)):
+            self.tracks = self.tracker.smooth_ball_track(self.tracks)
+
+        # Assign ball control to players to determine which team is in possession
+        with self.metrics.stage('assign_ball', frames=len(self.tracks)):
+            team_ball_control = self.player_assigner.assign_ball_control(self.tracks)
+
+        # Second pass: decoding, drawing and encoding run in their own threads, joined by bounded queues.
+        # The render workers are started first, so they are not forked while the decode thread runs
+        self.renderer.start()
+        pipeline = pipeline_utils.Pipeline()
+        try:
+            with self.metrics.stage('render', frames=len(team_ball_control)):
+                frames = pipeline.add_stage(video_control_utils.iter_video_frames(self.video_path), 'decode')
+                annotated_frames = pipeline.add_stage(self._annotate_frames(frames, team_ball_control), 'render')
+                video_control_utils.save_video_stream(annotated_frames, self.output_path)
+        finally:
+            pipeline.close()
+            self.renderer.close()
+        pipeline.print_stats()
+        self.export_metrics()
+
+    def detect_with_checkpoints(self, detections_cache_path, frames=None):
+        """
+        Runs resumable detection over the video and caches the resulting raw detections.
+        Finished chunks are checkpointed next to the cache entry, so a restarted run continues
+        from the last completed chunk; the checkpoint is removed once the entry is written.
+
+        :param detections_cache_path: Path to the cache entry of the detections.
+        :param frames: Optional list of decoded frames; the video is streamed from disk when omitted.
+        :return: DetectionStore with the detections of all frames.
+        """
+        checkpoint_path = cache_utils.get_checkpoint_path(detections_cache_path)
+        start_frame = self.detector.get_checkpoint_frames_number(checkpoint_path)
+
+        # Frames streamed from disk are decoded in a background thread while the model runs
+        pipeline = pipeline_utils.Pipeline()
+        if frames is None:
+            frames_number = video_control_utils.get_frame_count(self.video_path)
+            remaining_frames = pipeline.add_stage(video_control_utils.iter_video_frames(self.video_path, start_frame), 'decode')
+        else:
+            frames_number = len(frames)
+            remaining_frames = frames[start_frame:]
+
+        try:
+            with self.metrics.stage('detect', frames=frames_number - start_frame) as stage:
+                detections = self.detector.detect_objects_in_chunks(remaining_frames, checkpoint_path, frames_number)
+                stage.add_items('detections', len(detections.xyxy))
+        finally:
+            pipeline.close()
+        pipeline.print_stats()
+        self.detector.save_detections_to_cache(detections, detections_cache_path, self.get_cache_metadata())
+        cache_utils.remove_cache_entry(checkpoint_path)
+        return detections
+
+    def export_metrics(self):
+        """
+        Adds the events counted by the components to the metrics of the run, prints a summary,
+        and writes the metrics to the JSON file and the Prometheus textfile set in the config.
+        """
+        self.metrics.add_counters(self.team_assigner.event_counts)
+        self.metrics.print_summary()
+        self.metrics.save(self.metrics_path, self.prometheus_path)
+
+    def get_tracks_cache_path(self):
+        """
+        Returns the cache entry for the tracks of the current video. The entry is keyed on the
+        content of the video and the model and on the detector and tracker settings, so a cache
+        computed for another match or configuration is never reused.
+
+        :return: Path to the cache entry of the tracks.
+        """
+        settings = {
+            'detector': self.detector.get_cache_settings(),
+            'tracker': self.tracker.get_cache_settings()
+        }
+        return self._get_cache_path('tracks', settings)
+
+    def import_legacy_tracks(self, tracks_cache_path):
+        """
+        Imports the tracks that earlier versions pickled to config.LEGACY_CACHE_PATH into the tracks cache.
+        The pickle holds the tracks of config.VIDEO_PATH, so it is only imported for that video.
+
+        :param tracks_cache_path: Path to the cache entry of the tracks.
+        """
+        if not config.LEGACY_CACHE_PATH or os.path.abspath(self.video_path) != os.path.abspath(config.VIDEO_PATH):
+            return
+        self.tracker.import_legacy_tracks(config.LEGACY_CACHE_PATH, tracks_cache_path,
+                                          video_control_utils.get_frame_count(self.video_path), self.get_cache_metadata())
 
-        # Prepare list to hold processed video frames
-        video_frames = []
+    def get_detections_cache_path(self):
+        """
+        Returns the cache entry for the raw detections of the current video. The entry does not
+        depend on the tracker settings, so tracker tuning replays detections instead of re-running the model.
 
-        # Process each frame to annotate and calculate possession statistics
-        for frame_num in range(len(self.video)):
-            # Calculate possession statistics up to the current frame
-            home_team_time, away_team_time, home_team_possession, away_team_possession = self.possession_calculator.calculate_possession(team_ball_control[:frame_num + 1])
+        :return: Path to the cache entry of the detections.
+        """
+        settings = {'detector': self.detector.get_cache_settings()}
+        return self._get_cache_path('detections', settings)
+
+    def get_frame_index(self):
+        """
+        Returns the frame index of the current video, loaded from the cache or built and cached once.
+        The index only depends on the content of the video.
+
+        :return: FrameIndex of the video.
+        """
+        if self.frame_index is None:
+            file_hashes = {'video': cache_utils.compute_file_hash(self.video_path, self.cache_dir)}
+            cache_key = cache_utils.build_cache_key(file_hashes, {})
+            cache_path = cache_utils.get_cache_entry_path(self.cache_dir, 'frame_index', cache_key)
+            self.frame_index = frame_index_utils.get_frame_index(self.video_path, cache_path)
+        return self.frame_index
+
+    def _get_cache_path(self, name, settings):
+        """
+        Returns the cache entry keyed on the content of the video and the model and on the given settings.
+
+        :param name: Name of the cached data, e.g. 'tracks'.
+        :param settings: Settings that affect the cached data.
+        :return: Path to the cache entry.
+        """
+        file_hashes = {
+            'video': cache_utils.compute_file_hash(self.video_path, self.cache_dir),
+            'model': cache_utils.compute_file_hash(self.model_path, self.cache_dir)
+        }
+        cache_key = cache_utils.build_cache_key(file_hashes, settings)
+        return cache_utils.get_cache_entry_path(self.cache_dir, name, cache_key)
 
-            # Draw annotations on the current frame
-            frame = self.drawer.draw_annotations(
-                frame_num,  # Current frame number
-                self.video[frame_num],  # Current frame
-                self.tracks, 
+    def get_cache_metadata(self):
+        """
+        Returns a description of the inputs stored alongside cache entries for inspection.
+
+        :return: Dictionary with the video and model paths and the detector and tracker settings.
+        """
+        return {
+            'video_path': self.video_path,
+            'model_path': self.model_path,
+            'detector': self.detector.get_cache_settings(),
+            'tracker': self.tracker.get_cache_settings()
+        }
+
+    def _annotate_frames(self, frames, team_ball_control):
+        """
+        Lazily draws annotations and possession statistics on a stream of frames, using the parallel renderer.
+
+        :param frames: Iterable of video frames.
+        :param team_ball_control: List indicating which team has ball control for each frame.
+        :return: Generator of annotated frames.
+        """
+        # Calculate running possession statistics for every frame in one pass
+        home_team_times, away_team_times, home_team_possessions, away_team_possessions = self.possession_calculator.calculate_possession_series(team_ball_control)
+
+        # Per-frame data is collected here, so workers draw frames without the tracks of the whole video
+        frame_data = (
+            self.drawer.get_frame_data(
+                self.tracks,
+                frame_num,
                 team_ball_control,
-                home_team_time, 
-                away_team_time, 
-                home_team_possession, 
-                away_team_possession,
-                self.team_assigner.home_team_color,  # Home team color
-                self.team_assigner.away_team_color   # Away team color
+                home_team_times[frame_num],
+                away_team_times[frame_num],
+                home_team_possessions[frame_num],
+                away_team_possessions[frame_num],
+                self.team_assigner.home_team_color,
+                self.team_assigner.away_team_color
             )
+            for frame_num in range(len(team_ball_control))
+        )
+        return self.renderer.render(frames, frame_data)
 
-            # Append the annotated frame to the output video list
-            video_frames.append(frame)
-
-        # Save the processed video with annotations
-        video_control_utils.save_video(video_frames, self.output_path)
+    def _validate_frame(self, frame):
+        """
+        Validates the dimensions of a decoded video frame.
 
+        :param frame: The video frame to validate.
+        """
+        if frame.shape[0] == 0 or frame.shape[1] == 0:
+            raise ValueError("Invalid video frame dimensions.")
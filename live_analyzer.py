@@ -0,0 +1,260 @@
+import json
+import os
+import stat
+import sys
+import time
+from collections import deque
+import numpy as np
+from utils import video_control_utils, pipeline_utils
+from track_objects import ObjectTracker, TrackStore, OnlineBallSmoother
+from detect_objects import ObjectDetector
+from classify_players import TeamClassifier
+from assign_ball import BallAssigner
+from calculate_possession import PossessionCalculator
+import config
+import constants
+
+
+class LiveAnalyzer:
+    def __init__(self, source=None):
+        """
+        Initializes the live analyzer, which follows a video source while it is being recorded and keeps
+        the possession figures up to date. Frames are analyzed once, in order, in small batches: the results
+        of a frame are final when they are published and are never recomputed when later frames arrive.
+
+        :param source: Growing video file, pipe, stream URL, or '-' for raw BGR frames on stdin,
+                       defaults to config.LIVE_SOURCE or, if that is not set, config.VIDEO_PATH.
+        """
+        self.source = source or config.LIVE_SOURCE or config.VIDEO_PATH
+        self.status_path = config.LIVE_STATUS_PATH
+        self.max_queued_frames = config.LIVE_MAX_QUEUED_FRAMES
+        self.frame_rate = config.FRAME_RATE
+        self.team_assignment_mode = config.TEAM_ASSIGNMENT_MODE
+
+        # Initialize components for object detection, tracking, and analysis
+        self.detector = ObjectDetector()
+        self.tracker = ObjectTracker()
+        self.team_assigner = TeamClassifier()
+        self.ball_smoother = OnlineBallSmoother()
+        self.player_assigner = BallAssigner()
+        self.possession_calculator = PossessionCalculator()
+
+        # The first batch holds the frames used to initialize the team colors, rounded up to whole detection strides
+        self.batch_size = config.LIVE_BATCH_SIZE
+        stride = self.detector.stride
+        self.first_batch_size = -(-max(self.batch_size, self.team_assigner.initialization_frames) // stride) * stride
+
+        # Analyzed frames wait here until the ball smoother has their final ball positions
+        self.pending_tracks = None
+        self.pending_arrival_times = []
+
+        self.frames_analyzed = 0
+        self.frames_published = 0
+        self.frames_queued = 0
+        self.possession = self.possession_calculator.calculate_possession([])
+        self.ball_control = None
+        self.latencies = deque(maxlen=config.LIVE_LATENCY_WINDOW)  # Seconds from reading to publishing each recent frame
+
+    def run(self):
+        """
+        Analyzes the source until it ends. Frames are read in a background thread, and a batch is analyzed
+        as soon as it is full or no further frame is waiting, so the latency stays bounded while the analysis
+        keeps up with the source; the possession figures are published after every batch.
+        """
+        pipeline = pipeline_utils.Pipeline(self.max_queued_frames)
+        try:
+            source = pipeline.add_stage(self._timestamp_frames(self.get_frames()), 'read')
+            frames, arrival_times = [], []
+            for arrival_time, frame in source:
+                if self.frames_analyzed == 0 and not frames:
+                    self._validate_frame(frame)
+                frames.append(frame)
+                arrival_times.append(arrival_time)
+                self.frames_queued = source.get_queue_depth()
+
+                frames_number = self._get_ready_frames_number(len(frames), caught_up=self.frames_queued == 0)
+                if frames_number:
+                    self.analyze_frames(frames[:frames_number], arrival_times[:frames_number])
+                    frames, arrival_times = frames[frames_number:], arrival_times[frames_number:]
+
+            self.frames_queued = 0
+            if frames:
+                self.analyze_frames(frames, arrival_times)
+        finally:
+            pipeline.close()
+
+        # The source has ended, so the frames still waiting for the ball are final
+        self._publish_frames(self.ball_smoother.flush())
+        pipeline.print_stats()
+        print(f"Live analysis finished after {self.frames_published} frames: {self.format_status(self.get_status())}")
+
+    def get_frames(self):
+        """
+        Returns the frames of the source: raw frames from stdin, a stream or pipe read once until it ends,
+        or a video file followed while it grows.
+
+        :return: Iterable of frames.
+        """
+        if self.source == '-':
+            width, height = config.LIVE_RAW_FRAME_SIZE
+            return video_control_utils.iter_raw_frames(sys.stdin.buffer, width, height)
+
+        if '://' in self.source or (os.path.exists(self.source) and stat.S_ISFIFO(os.stat(self.source).st_mode)):
+            return video_control_utils.iter_video_frames(self.source)
+
+        return video_control_utils.follow_video_frames(self.source, config.LIVE_POLL_INTERVAL, config.LIVE_IDLE_TIMEOUT)
+
+    def analyze_frames(self, frames, arrival_times):
+        """
+        Detects, tracks, and assigns teams on the next frames of the source, then publishes the frames
+        whose ball positions are final.
+
+        :param frames: The next frames, following the frames analyzed before.
+        :param arrival_times: Time (time.perf_counter) at which each frame was read from the source.
+        """
+        start_frame = self.frames_analyzed
+        detections = self.detector.detect_objects_with_stride(frames, start_frame)
+
+        # The tracker and the team classifier keep their state between batches
+        tracks = self.tracker.track_objects(detections, len(frames))
+        if self.team_assignment_mode == 'track':
+            # Only sample colors here; teams are voted when the frames are published
+            self.team_assigner.collect_track_samples(tracks, frames)
+        else:
+            self.team_assigner.assign_teams_to_players(tracks, frames)
+        tracks = self.tracker.interpolate_skipped_frames(TrackStore.from_tracks(tracks))
+        self.frames_analyzed += len(frames)
+
+        self.pending_tracks = tracks if self.pending_tracks is None else TrackStore.concatenate([self.pending_tracks, tracks])
+        self.pending_arrival_times.extend(arrival_times)
+        self._publish_frames(self.ball_smoother.update(self.tracker.get_ball_positions(tracks)))
+
+    def _publish_frames(self, ball_positions):
+        """
+        Assigns ball control on the oldest pending frames, adds them to the possession figures, and writes the status.
+        With track-level team assignment, the teams of the tracks in these frames are voted on the color samples
+        collected so far, and a track with all its samples keeps its team. Teams are final once published, so they
+        can differ from a vote over the finished video.
+
+        :param ball_positions: Final ball positions of the oldest pending frames, NaN where there is no ball.
+        """
+        frames_number = len(ball_positions)
+        if frames_number == 0:
+            return
+
+        tracks = self.tracker.with_ball_positions(self.pending_tracks.slice_frames(0, frames_number), ball_positions)
+        self.pending_tracks = self.pending_tracks.slice_frames(frames_number, len(self.pending_tracks))
+        if self.team_assignment_mode == 'track' and self.team_assigner.initialized:
+            # Only the tracks of these frames are voted, so publishing costs the same at any point of the match
+            track_ids = tracks.get_track_ids(constants.PLAYERS_KEY).tolist()
+            tracks = self.team_assigner.assign_teams_from_track_samples(tracks, track_ids)
+
+        # The ball assigner carries its possession state from the previous frames
+        team_ball_control = self.player_assigner.assign_ball_control(tracks)
+        for team_id in team_ball_control:
+            self.possession = self.possession_calculator.update(team_id)
+        self.ball_control = team_ball_control[-1]
+
+        published_time = time.perf_counter()
+        self.latencies.extend(published_time - arrival_time for arrival_time in self.pending_arrival_times[:frames_number])
+        del self.pending_arrival_times[:frames_number]
+
+        # Report about once per second of video
+        previous_second = self.frames_published // self.frame_rate
+        self.frames_published += frames_number
+        status = self.get_status()
+        self.write_status(status)
+        if self.frames_published // self.frame_rate > previous_second:
+            print(self.format_status(status))
+
+    def get_status(self):
+        """
+        Returns the current possession figures and the latency of the recently published frames.
+
+        :return: Dictionary of live status values.
+        """
+        home_team_time, away_team_time, home_team_possession, away_team_possession = self.possession
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'source': self.source,
+            'frames_published': self.frames_published,
+            'frames_analyzed': self.frames_analyzed,
+            'frames_queued': self.frames_queued,
+            'match_time': self.frames_published / self.frame_rate,
+            'home_team_time': float(home_team_time),
+            'away_team_time': float(away_team_time),
+            'home_team_possession': int(home_team_possession),
+            'away_team_possession': int(away_team_possession),
+            'ball_control': None if self.ball_control is None else int(self.ball_control),
+            'latency': {
+                'p50': float(np.percentile(latencies, 50)),
+                'p95': float(np.percentile(latencies, 95)),
+                'max': float(latencies.max())
+            },
+            'updated_at': time.time()
+        }
+
+    def format_status(self, status):
+        """
+        Formats the live status as one line for the console.
+
+        :param status: Dictionary from get_status.
+        :return: The formatted status.
+        """
+        latency = status['latency']
+        return (f"Frame {status['frames_published']} ({status['match_time']:.1f}s): possession "
+                f"{status['home_team_possession']}% - {status['away_team_possession']}%, latency "
+                f"p50 {latency['p50'] * 1000:.0f} ms, p95 {latency['p95'] * 1000:.0f} ms, {status['frames_queued']} frames queued")
+
+    def write_status(self, status):
+        """
+        Writes the live status to the status file. The file is replaced atomically, so readers
+        never see a partially written status.
+
+        :param status: Dictionary from get_status.
+        """
+        if not self.status_path:
+            return
+
+        status_dir = os.path.dirname(self.status_path)
+        if status_dir:
+            os.makedirs(status_dir, exist_ok=True)
+        temporary_path = f"{self.status_path}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(status, f, indent=2)
+        os.replace(temporary_path, self.status_path)
+
+    def _get_ready_frames_number(self, frames_number, caught_up):
+        """
+        Returns how many of the collected frames to analyze now. A batch is analyzed once it is full or,
+        when no further frame is waiting, right away. Until the team colors are initialized, the first
+        batch waits for the initialization frames. With strided detection a batch ends right before a
+        detected frame, so every batch starts with a detected frame.
+
+        :param frames_number: Number of frames collected and not analyzed yet.
+        :param caught_up: Whether no further frame is waiting to be read.
+        :return: Number of frames to analyze, 0 to keep collecting.
+        """
+        batch_size = self.batch_size if self.team_assigner.initialized else self.first_batch_size
+        if frames_number < batch_size and (not caught_up or not self.team_assigner.initialized):
+            return 0
+        return frames_number - (self.frames_analyzed + frames_number) % self.detector.stride
+
+    def _timestamp_frames(self, frames):
+        """
+        Pairs every frame with the time it was read, which is where its latency is measured from.
+
+        :param frames: Iterable of frames.
+        :return: Generator of (time.perf_counter(), frame) tuples.
+        """
+        for frame in frames:
+            yield time.perf_counter(), frame
+
+    def _validate_frame(self, frame):
+        """
+        Validates the dimensions of a decoded video frame.
+
+        :param frame: The video frame to validate.
+        """
+        if frame.shape[0] == 0 or frame.shape[1] == 0:
+            raise ValueError("Invalid video frame dimensions.")
@@ -1,5 +1,19 @@
+import time
+startup_start_time = time.perf_counter()
+
 from football_analyzer import FootballAnalyzer
+from live_analyzer import LiveAnalyzer
+import config
 
 if __name__ == '__main__':
-    analyzer = FootballAnalyzer()
-    analyzer.run()
+    import_seconds = time.perf_counter() - startup_start_time
+    analyzer = LiveAnalyzer() if config.LIVE_ENABLED else FootballAnalyzer()
+    print(f"Startup took {time.perf_counter() - startup_start_time:.2f}s (imports {import_seconds:.2f}s)")
+    if config.LIVE_ENABLED:
+        analyzer.run()
+    elif config.SEGMENT_ENABLED:
+        analyzer.run_segmented()
+    elif config.STREAMING_ENABLED:
+        analyzer.run_streaming()
+    else:
+        analyzer.run()
@@ -1 +1,4 @@
-from .tracker import ObjectTracker
\ No newline at end of file
+from .tracker import ObjectTracker
+from .track_store import TrackStore
+from .ball_smoother import OnlineBallSmoother
+from .track_stitcher import TrackStitcher
\ No newline at end of file
@@ -0,0 +1,199 @@
+import numpy as np
+import config
+from typing import Optional, Tuple
+
+
+def get_centers(bounding_boxes: np.ndarray) -> np.ndarray:
+    """
+    Returns the centers of bounding boxes.
+
+    :param bounding_boxes: Array of shape (n, 4) with (x1, y1, x2, y2) rows.
+    :return: Array of shape (n, 2) with (x, y) centers.
+    """
+    return np.stack([(bounding_boxes[:, 0] + bounding_boxes[:, 2]) / 2, (bounding_boxes[:, 1] + bounding_boxes[:, 3]) / 2], axis=1)
+
+
+def filter_false_positives(bounding_boxes: np.ndarray, min_consecutive_frames: int, last_center: Optional[np.ndarray] = None,
+                           consecutive_frames: int = 0) -> Tuple[np.ndarray, Optional[np.ndarray], int]:
+    """
+    Discards ball positions that are not confirmed by enough consecutive moving detections.
+    The first detection is always kept. After that, a position is only kept once its center has differed
+    from the last kept center for `min_consecutive_frames` detected frames in a row; a missing frame or a
+    detection at the last kept center restarts the count. Once a position is kept, later positions are
+    kept for as long as the ball keeps moving from frame to frame.
+
+    The frames are processed in phases of constant state rather than one by one, so the Python overhead
+    grows with the number of times the ball is lost, not with the number of frames. The state is returned,
+    so a video can be filtered in consecutive parts with the same result as in one call.
+
+    :param bounding_boxes: Array of shape (n, 4) with one ball position per frame, NaN where there is no ball.
+    :param min_consecutive_frames: Minimum number of consecutive frames required to consider a new position valid.
+    :param last_center: Center of the last kept position from an earlier call, None if there is none.
+    :param consecutive_frames: Count of consecutive moving detections from an earlier call.
+    :return: Tuple of the kept positions (NaN rows for discarded positions), the last kept center, and the count.
+    """
+    bounding_boxes = np.asarray(bounding_boxes, dtype=np.float64).reshape(-1, 4)
+    frames_number = len(bounding_boxes)
+    detected = ~np.isnan(bounding_boxes).any(axis=1)
+    centers = get_centers(bounding_boxes)
+    kept = np.zeros(frames_number, dtype=bool)
+
+    if min_consecutive_frames <= 0:
+        # Every detection is confirmed right away
+        kept = detected
+        if detected.any():
+            last_center = centers[np.flatnonzero(detected)[-1]]
+        position = frames_number
+    else:
+        position = 0
+
+    while position < frames_number:
+        if last_center is None:
+            # Nothing kept yet: the first detection is kept as it is
+            detected_frames = np.flatnonzero(detected[position:])
+            if len(detected_frames) == 0:
+                consecutive_frames = 0
+                break
+            first = position + detected_frames[0]
+            consecutive_frames = 1
+        else:
+            # The last kept center is fixed until the next position is kept, so the count of every frame
+            # is the distance to the last frame that restarted it. Frames are examined in growing windows,
+            # so a phase costs time in proportion to its length rather than to the rest of the video.
+            first, window = None, 2 * min_consecutive_frames
+            while first is None and position < frames_number:
+                stop = min(position + window, frames_number)
+                frame_index = np.arange(position, stop)
+                restarts = ~detected[position:stop] | np.all(centers[position:stop] == last_center, axis=1)
+                last_restart = np.maximum.accumulate(np.where(restarts, frame_index, -1))
+                counts = np.where(last_restart >= 0, frame_index - last_restart, consecutive_frames + frame_index - position + 1)
+
+                confirmed = np.flatnonzero(counts >= min_consecutive_frames)
+                if len(confirmed):
+                    first = position + confirmed[0]
+                    consecutive_frames = int(counts[confirmed[0]])
+                else:
+                    consecutive_frames = int(counts[-1])
+                    position, window = stop, window * 2
+            if first is None:
+                break
+
+        kept[first] = True
+        last_center = centers[first]
+        if consecutive_frames < min_consecutive_frames:
+            position = first + 1
+            continue
+
+        # Confirmed: the following frames are kept while the ball is detected and moving from the previous frame
+        end, window = first + 1, 2 * min_consecutive_frames
+        while end < frames_number:
+            stop = min(end + window, frames_number)
+            moving = detected[end:stop] & np.any(centers[end:stop] != centers[end - 1:stop - 1], axis=1)
+            stops = np.flatnonzero(~moving)
+            if len(stops):
+                end += stops[0]
+                break
+            end, window = stop, window * 2
+        kept[first:end] = True
+        last_center = centers[end - 1]
+        consecutive_frames += end - 1 - first
+        if end == frames_number:
+            break
+
+        # The frame at `end` is missing or repeats the last kept center, which restarts the count
+        consecutive_frames = 0
+        position = end + 1
+
+    filtered = np.full_like(bounding_boxes, np.nan)
+    filtered[kept] = bounding_boxes[kept]
+    return filtered, last_center, consecutive_frames
+
+
+def interpolate_positions(bounding_boxes: np.ndarray) -> np.ndarray:
+    """
+    Fills missing positions linearly between the known positions. Frames before the first
+    and after the last known position take that position.
+
+    :param bounding_boxes: Array of shape (n, 4), NaN where the position is unknown.
+    :return: Array of shape (n, 4), NaN only if no position is known at all.
+    """
+    bounding_boxes = np.asarray(bounding_boxes, dtype=np.float64).reshape(-1, 4)
+    known = np.flatnonzero(~np.isnan(bounding_boxes).any(axis=1))
+    if len(known) == 0:
+        return bounding_boxes.copy()
+
+    frame_index = np.arange(len(bounding_boxes))
+    return np.stack([np.interp(frame_index, known, bounding_boxes[known, i]) for i in range(4)], axis=1)
+
+
+class OnlineBallSmoother:
+    def __init__(self, min_consecutive_frames: int = 8, lookahead: Optional[int] = None):
+        """
+        Initializes a ball smoother for frames that arrive over time. Positions are filtered as they
+        arrive, and a frame without a ball is held back until the ball is seen again, so it can be
+        interpolated, but for at most `lookahead` frames; after that the last position is held.
+        When the ball is never missing for more than `lookahead` frames, the output is the same as
+        filtering and interpolating the whole video at once.
+
+        :param min_consecutive_frames: Minimum number of consecutive frames required to consider a new position valid.
+        :param lookahead: Maximum number of frames a frame is held back, defaults to config.BALL_SMOOTHING_LOOKAHEAD.
+        """
+        self.min_consecutive_frames = min_consecutive_frames
+        self.lookahead = config.BALL_SMOOTHING_LOOKAHEAD if lookahead is None else lookahead
+        self.last_center = None
+        self.consecutive_frames = 0
+        self.pending = np.empty((0, 4))  # Filtered positions of the frames not returned yet
+        self.last_position = None  # Position of the last returned frame, the start of the next interpolation
+        self.frames_returned = 0
+
+    def update(self, bounding_boxes: np.ndarray) -> np.ndarray:
+        """
+        Adds the ball positions of the next frames and returns the smoothed positions of the frames that are final.
+
+        :param bounding_boxes: Array of shape (n, 4) with one ball position per frame, NaN where there is no ball.
+        :return: Array of shape (m, 4) with the positions of the next m frames in order, NaN where there is no ball.
+        """
+        filtered, self.last_center, self.consecutive_frames = filter_false_positives(
+            bounding_boxes, self.min_consecutive_frames, self.last_center, self.consecutive_frames)
+        self.pending = np.concatenate([self.pending, filtered])
+        return self._pop_frames(final=False)
+
+    def flush(self) -> np.ndarray:
+        """
+        Returns the positions of all frames held back, e.g. at the end of the video.
+
+        :return: Array of shape (m, 4) with the positions of the remaining frames.
+        """
+        return self._pop_frames(final=True)
+
+    def _pop_frames(self, final: bool) -> np.ndarray:
+        """
+        Removes the frames that are final from the pending frames and returns their smoothed positions.
+        A frame is final once a later position is known, once `lookahead` later frames are known, or at the end.
+
+        :param final: Whether no more frames will follow.
+        :return: Array of shape (m, 4) with the smoothed positions.
+        """
+        known = np.flatnonzero(~np.isnan(self.pending).any(axis=1))
+        if final:
+            frames_number = len(self.pending)
+        else:
+            frames_number = max(known[-1] + 1 if len(known) else 0, len(self.pending) - self.lookahead)
+        if frames_number == 0:
+            return np.empty((0, 4))
+
+        # Interpolate from the last returned position (at index -1) through the known positions
+        anchors, positions = known, self.pending[known]
+        if self.last_position is not None:
+            anchors, positions = np.concatenate([[-1], anchors]), np.vstack([self.last_position, positions])
+
+        if len(anchors) == 0:
+            smoothed = np.full((frames_number, 4), np.nan)
+        else:
+            frame_index = np.arange(frames_number)
+            smoothed = np.stack([np.interp(frame_index, anchors, positions[:, i]) for i in range(4)], axis=1)
+            self.last_position = smoothed[-1]
+
+        self.pending = self.pending[frames_number:]
+        self.frames_returned += frames_number
+        return smoothed
@@ -0,0 +1,115 @@
+import numpy as np
+import config
+import constants
+from utils import geometry_utils
+from .track_store import TrackStore, TRACK_KEYS
+from typing import Dict, Optional, Tuple
+
+
+class TrackStitcher:
+    def __init__(self, iou_threshold: Optional[float] = None, min_matched_frames: Optional[int] = None):
+        """
+        Joins the track IDs of video segments that were tracked separately. Every segment starts with
+        frames that are also the last frames of the previous segment; a track of the new segment continues
+        the track of the previous segment whose boxes it overlaps in most of these frames. The ball keeps
+        its single track ID.
+
+        :param iou_threshold: Minimum IoU for two boxes in the same frame to belong to the same object,
+                              defaults to config.SEGMENT_STITCH_IOU_THRESHOLD.
+        :param min_matched_frames: Minimum number of overlap frames in which two tracks must match to be joined,
+                                   defaults to config.SEGMENT_STITCH_MIN_FRAMES.
+        """
+        self.iou_threshold = config.SEGMENT_STITCH_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+        self.min_matched_frames = config.SEGMENT_STITCH_MIN_FRAMES if min_matched_frames is None else min_matched_frames
+        self.previous_tracks = None  # Stitched tracks of the previous segment
+        self.next_track_id = 1
+        self.joined_tracks_number = 0
+
+    def stitch(self, tracks: TrackStore, overlap_frames: int) -> Tuple[TrackStore, Dict[int, int]]:
+        """
+        Maps the track IDs of the next segment to the IDs of the segments before it.
+        Tracks that do not continue a track of the previous segment get new IDs.
+        Segments must be stitched in order.
+
+        :param tracks: Tracks of the next segment, with its local track IDs.
+        :param overlap_frames: Number of frames at the start of the segment that repeat the end of the previous segment.
+        :return: Tuple of the tracks with stitched IDs and a dictionary mapping the local track IDs
+                 of players and referees to their stitched IDs.
+        """
+        people = tracks.object_class != TRACK_KEYS.index(constants.BALL_KEY)
+        local_track_ids = np.unique(tracks.track_id[people]).tolist()
+
+        if self.previous_tracks is None:
+            # The first segment keeps its IDs
+            track_ids = {track_id: track_id for track_id in local_track_ids}
+        else:
+            track_ids = self.match_tracks(self.previous_tracks, tracks, overlap_frames)
+            self.joined_tracks_number += len(track_ids)
+            for track_id in local_track_ids:
+                if track_id not in track_ids:
+                    track_ids[track_id] = self.next_track_id
+                    self.next_track_id += 1
+
+        if track_ids:
+            self.next_track_id = max(self.next_track_id, max(track_ids.values()) + 1)
+        self.previous_tracks = self.with_track_ids(tracks, track_ids)
+        return self.previous_tracks, track_ids
+
+    def match_tracks(self, previous_tracks: TrackStore, tracks: TrackStore, overlap_frames: int) -> Dict[int, int]:
+        """
+        Matches the tracks of two segments on the frames they share. In every shared frame, each box of
+        the new segment votes for the box of the previous segment it overlaps most; track pairs are then
+        joined greedily, most votes first, so every track is joined at most once.
+
+        :param previous_tracks: Stitched tracks of the previous segment, ending with the shared frames.
+        :param tracks: Tracks of the next segment, starting with the shared frames.
+        :param overlap_frames: Number of shared frames.
+        :return: Dictionary mapping local track IDs of the new segment to stitched IDs of the previous segment.
+        """
+        overlap_frames = min(overlap_frames, len(previous_tracks), len(tracks))
+        previous_start = len(previous_tracks) - overlap_frames
+        ball_group = TRACK_KEYS.index(constants.BALL_KEY)
+        votes = {}
+
+        for frame_num in range(overlap_frames):
+            # Players and referees are stored before the ball in every frame
+            previous_group = (previous_start + frame_num) * len(TRACK_KEYS)
+            previous_rows = slice(previous_tracks.group_offsets[previous_group], previous_tracks.group_offsets[previous_group + ball_group])
+            rows = slice(tracks.group_offsets[frame_num * len(TRACK_KEYS)], tracks.group_offsets[frame_num * len(TRACK_KEYS) + ball_group])
+            if previous_rows.start == previous_rows.stop or rows.start == rows.stop:
+                continue
+
+            iou = geometry_utils.iou_matrix(tracks.bounding_box[rows], previous_tracks.bounding_box[previous_rows])
+            best_match = iou.argmax(axis=1)
+            matched = iou[np.arange(len(best_match)), best_match] > self.iou_threshold
+            for track_id, previous_track_id in zip(tracks.track_id[rows][matched].tolist(),
+                                                   previous_tracks.track_id[previous_rows][best_match[matched]].tolist()):
+                votes[(track_id, previous_track_id)] = votes.get((track_id, previous_track_id), 0) + 1
+
+        track_ids, joined_ids = {}, set()
+        for (track_id, previous_track_id), count in sorted(votes.items(), key=lambda vote: -vote[1]):
+            if count < self.min_matched_frames:
+                break
+            if track_id not in track_ids and previous_track_id not in joined_ids:
+                track_ids[track_id] = previous_track_id
+                joined_ids.add(previous_track_id)
+        return track_ids
+
+    def with_track_ids(self, tracks: TrackStore, track_ids: Dict[int, int]) -> TrackStore:
+        """
+        Returns a new store in which the track IDs of players and referees are replaced.
+
+        :param tracks: The tracks.
+        :param track_ids: Dictionary mapping every player and referee track ID to its new ID.
+        :return: The updated TrackStore.
+        """
+        new_track_id = tracks.track_id.copy()
+        people = np.flatnonzero(tracks.object_class != TRACK_KEYS.index(constants.BALL_KEY))
+        if track_ids and len(people):
+            old_ids = np.array(list(track_ids), dtype=np.int64)
+            new_ids = np.array(list(track_ids.values()), dtype=np.int64)
+            order = np.argsort(old_ids)
+            new_track_id[people] = new_ids[order][np.searchsorted(old_ids[order], tracks.track_id[people])]
+
+        return TrackStore(tracks.frame, new_track_id, tracks.object_class, tracks.bounding_box, tracks.team,
+                          tracks.has_ball, len(tracks), tracks.palette, tracks.group_offsets)
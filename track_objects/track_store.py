@@ -0,0 +1,299 @@
+import numpy as np
+import constants
+from typing import Dict, List, Optional
+
+# Object classes stored in the class column, in the order rows are kept within a frame
+TRACK_KEYS = (constants.PLAYERS_KEY, constants.REFEREES_KEY, constants.BALL_KEY)
+NO_TEAM = 0  # Team value for rows without an assigned team
+
+
+class TrackStore:
+    def __init__(self, frame: np.ndarray, track_id: np.ndarray, object_class: np.ndarray, bounding_box: np.ndarray,
+                 team: np.ndarray, has_ball: np.ndarray, frames_number: int, palette: Optional[Dict[int, np.ndarray]] = None,
+                 group_offsets: Optional[np.ndarray] = None):
+        """
+        Initializes a columnar store of tracks with one row per tracked object per frame.
+        Rows must be sorted by frame and, within a frame, by object class.
+
+        :param frame: Frame number of each row.
+        :param track_id: Track ID of each row.
+        :param object_class: Index into TRACK_KEYS of each row.
+        :param bounding_box: Bounding box (x1, y1, x2, y2) of each row.
+        :param team: Team ID of each row, NO_TEAM if not assigned.
+        :param has_ball: Whether the object in each row has the ball.
+        :param frames_number: Number of frames covered by the store.
+        :param palette: Dictionary mapping team IDs to their colors.
+        :param group_offsets: Precomputed row offsets of every (frame, class) group, e.g. from a cache.
+        """
+        self.frame = np.asarray(frame, dtype=np.int32)
+        self.track_id = np.asarray(track_id, dtype=np.int32)
+        self.object_class = np.asarray(object_class, dtype=np.int8)
+        self.bounding_box = np.asarray(bounding_box, dtype=np.float32).reshape(-1, 4)
+        self.team = np.asarray(team, dtype=np.int8)
+        self.has_ball = np.asarray(has_ball, dtype=bool)
+        self.frames_number = frames_number
+        self.palette = dict(palette) if palette else {}
+
+        # Row offsets of every (frame, class) group for constant-time per-frame slicing
+        if group_offsets is None:
+            group = self.frame.astype(np.int64) * len(TRACK_KEYS) + self.object_class
+            group_offsets = np.searchsorted(group, np.arange(frames_number * len(TRACK_KEYS) + 1))
+        self.group_offsets = np.asarray(group_offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.frames_number
+
+    @classmethod
+    def from_tracks(cls, tracks: Dict[str, List[Dict[int, Dict]]]) -> 'TrackStore':
+        """
+        Builds a store from the dictionary layout produced by ObjectTracker.
+
+        :param tracks: Tracking data with players, referees, and ball per frame.
+        :return: The equivalent TrackStore.
+        """
+        frames_number = len(tracks[constants.PLAYERS_KEY])
+        frame, track_id, object_class, bounding_box, team, has_ball = [], [], [], [], [], []
+        palette = {}
+
+        for frame_num in range(frames_number):
+            for class_index, key in enumerate(TRACK_KEYS):
+                for object_id, track in tracks[key][frame_num].items():
+                    team_id = track.get(constants.TEAM_KEY)
+                    team_id = NO_TEAM if team_id is None else int(team_id)
+                    if team_id != NO_TEAM and constants.TEAM_COLOR_KEY in track:
+                        palette.setdefault(team_id, np.asarray(track[constants.TEAM_COLOR_KEY]))
+
+                    frame.append(frame_num)
+                    track_id.append(object_id)
+                    object_class.append(class_index)
+                    bounding_box.append(track[constants.BOUNDING_BOX_KEY])
+                    team.append(team_id)
+                    has_ball.append(track.get(constants.HAS_BALL_KEY, False))
+
+        return cls(frame, track_id, object_class, bounding_box, team, has_ball, frames_number, palette)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'TrackStore':
+        """
+        Rebuilds a store from the arrays returned by to_arrays. The arrays are used as they are,
+        so memory-mapped arrays are only read from disk when their rows are accessed.
+
+        :param arrays: Dictionary of column arrays.
+        :return: The restored TrackStore.
+        """
+        palette = dict(zip(arrays['palette_team'].tolist(), arrays['palette_color']))
+        return cls(arrays['frame'], arrays['track_id'], arrays['object_class'], arrays['bounding_box'],
+                   arrays['team'], arrays['has_ball'], int(arrays['frames_number']), palette,
+                   arrays['group_offsets'])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns the columns of the store as plain arrays, e.g. for caching.
+
+        :return: Dictionary of column arrays.
+        """
+        palette_team = np.array(sorted(self.palette), dtype=np.int8)
+        palette_color = np.array([self.palette[team_id] for team_id in palette_team.tolist()], dtype=np.float64).reshape(-1, 3)
+        return {
+            'frame': self.frame,
+            'track_id': self.track_id,
+            'object_class': self.object_class,
+            'bounding_box': self.bounding_box,
+            'team': self.team,
+            'has_ball': self.has_ball,
+            'frames_number': np.array(self.frames_number),
+            'palette_team': palette_team,
+            'palette_color': palette_color,
+            'group_offsets': self.group_offsets
+        }
+
+    @classmethod
+    def concatenate(cls, stores: List['TrackStore']) -> 'TrackStore':
+        """
+        Joins stores of consecutive frame windows into one store.
+
+        :param stores: Stores in frame order.
+        :return: A store covering all frames of the given stores.
+        """
+        if not stores:
+            raise ValueError("At least one track store is required for concatenation.")
+
+        frame_starts = np.cumsum([0] + [len(store) for store in stores])
+        palette = {}
+        for store in stores:
+            for team_id, color in store.palette.items():
+                palette.setdefault(team_id, color)
+
+        return cls(
+            np.concatenate([store.frame + start for store, start in zip(stores, frame_starts)]),
+            np.concatenate([store.track_id for store in stores]),
+            np.concatenate([store.object_class for store in stores]),
+            np.concatenate([store.bounding_box for store in stores]),
+            np.concatenate([store.team for store in stores]),
+            np.concatenate([store.has_ball for store in stores]),
+            int(frame_starts[-1]),
+            palette
+        )
+
+    def slice_frames(self, start: int, stop: int) -> 'TrackStore':
+        """
+        Returns the tracks of a range of frames as a new store sharing the same arrays.
+
+        :param start: First frame number.
+        :param stop: Frame number after the last frame.
+        :return: Store with the tracks of the frames in the range, numbered from 0.
+        """
+        groups = slice(start * len(TRACK_KEYS), stop * len(TRACK_KEYS) + 1)
+        rows = slice(self.group_offsets[groups.start], self.group_offsets[groups.stop - 1])
+        return TrackStore(self.frame[rows] - start, self.track_id[rows], self.object_class[rows], self.bounding_box[rows],
+                          self.team[rows], self.has_ball[rows], stop - start, self.palette,
+                          self.group_offsets[groups] - self.group_offsets[groups.start])
+
+    def get_rows(self, frame_num: int, key: str) -> slice:
+        """
+        Returns the rows holding one class of objects in a frame.
+
+        :param frame_num: The frame number.
+        :param key: One of TRACK_KEYS.
+        :return: Slice of rows in the column arrays.
+        """
+        group = frame_num * len(TRACK_KEYS) + TRACK_KEYS.index(key)
+        return slice(self.group_offsets[group], self.group_offsets[group + 1])
+
+    def get_track_ids(self, key: str) -> np.ndarray:
+        """
+        Returns the distinct track IDs of one class of objects.
+
+        :param key: One of TRACK_KEYS.
+        :return: Sorted array of track IDs.
+        """
+        return np.unique(self.track_id[self.object_class == TRACK_KEYS.index(key)])
+
+    def get_team_color(self, team_id: int, default_color=None):
+        """
+        Returns the color of a team from the palette.
+
+        :param team_id: The team ID.
+        :param default_color: Color returned if the team has no color.
+        :return: The team color.
+        """
+        return self.palette.get(int(team_id), default_color)
+
+    def set_player_teams(self, track_ids: np.ndarray, teams: np.ndarray, palette: Dict[int, np.ndarray]):
+        """
+        Sets the team of all player rows from a per-track lookup in one vectorized pass.
+        Players whose track ID is not in the lookup keep their team.
+
+        :param track_ids: Track IDs with a known team.
+        :param teams: Team ID of every track ID.
+        :param palette: Dictionary mapping team IDs to their colors.
+        """
+        players = np.flatnonzero(self.object_class == TRACK_KEYS.index(constants.PLAYERS_KEY))
+        if len(track_ids) == 0 or len(players) == 0:
+            self.palette.update(palette)
+            return
+
+        order = np.argsort(track_ids)
+        track_ids, teams = np.asarray(track_ids)[order], np.asarray(teams)[order]
+        positions = np.minimum(np.searchsorted(track_ids, self.track_id[players]), len(track_ids) - 1)
+        known = track_ids[positions] == self.track_id[players]
+
+        self.team = self.team.copy()
+        self.team[players[known]] = teams[positions[known]]
+        self.palette.update(palette)
+
+    def get_frame(self, frame_num: int, key: str) -> Dict[int, Dict]:
+        """
+        Returns one class of objects in a frame in the dictionary layout of ObjectTracker.
+
+        :param frame_num: The frame number.
+        :param key: One of TRACK_KEYS.
+        :return: Dictionary mapping track IDs to their track data.
+        """
+        rows = self.get_rows(frame_num, key)
+        frame_tracks = {}
+        for object_id, bounding_box, team_id, has_ball in zip(self.track_id[rows].tolist(), self.bounding_box[rows].tolist(),
+                                                              self.team[rows].tolist(), self.has_ball[rows].tolist()):
+            track = {constants.BOUNDING_BOX_KEY: bounding_box}
+            if team_id != NO_TEAM:
+                track[constants.TEAM_KEY] = team_id
+                if team_id in self.palette:
+                    track[constants.TEAM_COLOR_KEY] = self.palette[team_id]
+            if has_ball:
+                track[constants.HAS_BALL_KEY] = True
+            frame_tracks[object_id] = track
+        return frame_tracks
+
+    def get_track_list(self, key: str, start: int = 0, stop: Optional[int] = None) -> List[Dict[int, Dict]]:
+        """
+        Returns one class of objects for a range of frames in the dictionary layout of ObjectTracker.
+
+        :param key: One of TRACK_KEYS.
+        :param start: First frame number.
+        :param stop: Frame number after the last frame, defaults to the end of the store.
+        :return: List with one dictionary of tracks per frame.
+        """
+        stop = self.frames_number if stop is None else stop
+        return [self.get_frame(frame_num, key) for frame_num in range(start, stop)]
+
+    def to_tracks(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, List[Dict[int, Dict]]]:
+        """
+        Returns a compatibility view of the store in the dictionary layout of ObjectTracker.
+
+        :param start: First frame number.
+        :param stop: Frame number after the last frame, defaults to the end of the store.
+        :return: Tracking data with players, referees, and ball per frame.
+        """
+        return {key: self.get_track_list(key, start, stop) for key in TRACK_KEYS}
+
+    def with_tracks(self, key: str, frame_tracks: List[Dict[int, Dict]]) -> 'TrackStore':
+        """
+        Returns a new store in which one class of objects is replaced, e.g. after ball interpolation.
+
+        :param key: One of TRACK_KEYS.
+        :param frame_tracks: List with one dictionary of tracks per frame for that class.
+        :return: The updated TrackStore.
+        """
+        replacement = TrackStore.from_tracks({
+            other_key: frame_tracks if other_key == key else [{} for _ in range(self.frames_number)]
+            for other_key in TRACK_KEYS
+        })
+        keep = self.object_class != TRACK_KEYS.index(key)
+        store = TrackStore(self.frame[keep], self.track_id[keep], self.object_class[keep], self.bounding_box[keep],
+                           self.team[keep], self.has_ball[keep], self.frames_number, self.palette)
+        return store.with_rows(replacement.frame, replacement.track_id, replacement.object_class, replacement.bounding_box,
+                               replacement.team, replacement.has_ball, replacement.palette)
+
+    def with_rows(self, frame: np.ndarray, track_id: np.ndarray, object_class: np.ndarray, bounding_box: np.ndarray,
+                  team: np.ndarray, has_ball: np.ndarray, palette: Optional[Dict[int, np.ndarray]] = None) -> 'TrackStore':
+        """
+        Returns a new store with additional rows, e.g. for frames filled in by interpolation.
+        Within a (frame, class) group, the existing rows come before the added rows.
+
+        :param frame: Frame number of each added row.
+        :param track_id: Track ID of each added row.
+        :param object_class: Index into TRACK_KEYS of each added row.
+        :param bounding_box: Bounding box (x1, y1, x2, y2) of each added row.
+        :param team: Team ID of each added row.
+        :param has_ball: Whether the object in each added row has the ball.
+        :param palette: Team colors of the added rows; existing colors take precedence.
+        :return: The extended TrackStore.
+        """
+        frame = np.concatenate([self.frame, np.asarray(frame, dtype=np.int32)])
+        object_class = np.concatenate([self.object_class, np.asarray(object_class, dtype=np.int8)])
+        order = np.lexsort((object_class, frame))  # Stable, so row order within a group is kept
+
+        added_palette, palette = palette or {}, dict(self.palette)
+        for team_id, color in added_palette.items():
+            palette.setdefault(team_id, color)
+
+        return TrackStore(
+            frame[order],
+            np.concatenate([self.track_id, np.asarray(track_id, dtype=np.int32)])[order],
+            object_class[order],
+            np.concatenate([self.bounding_box, np.asarray(bounding_box, dtype=np.float32).reshape(-1, 4)])[order],
+            np.concatenate([self.team, np.asarray(team, dtype=np.int8)])[order],
+            np.concatenate([self.has_ball, np.asarray(has_ball, dtype=bool)])[order],
+            self.frames_number,
+            palette
+        )
@@ -1,19 +1,45 @@
-import supervision as sv
+import numpy as np
 import config
 import constants
 from cache import cache_utils
 import os
-import pandas as pd
-from typing import List, Dict, Optional
+from .track_store import TrackStore, TRACK_KEYS, NO_TEAM
+from . import ball_smoother
+from typing import TYPE_CHECKING, List, Dict, Optional
+
+if TYPE_CHECKING:
+    import supervision as sv
+
+BALL_TRACK_ID = 1  # There is only one ball, so all ball detections share one track
 
 class ObjectTracker:
-    def __init__(self):
-        self.tracker = sv.ByteTrack(
-            track_activation_threshold=config.TRACKER_TRACK_ACTIVATION_THRESHOLD,
-            lost_track_buffer=config.TRACKER_LOST_TRACK_BUFFER,
-            minimum_matching_threshold=config.TRACKER_MINIMUM_MATCHING_THRESHOLD,
-            minimum_consecutive_frames=config.TRACKER_MINIMUM_CONSECUTIVE_FRAMES
-        )
+    def __init__(self, stride: Optional[int] = None):
+        """
+        Initializes the tracker. With strided detection the tracker only sees every stride-th frame,
+        so the frame-based tracker settings are scaled to cover the same time span.
+
+        :param stride: Number of frames between detected frames, defaults to config.DETECTOR_STRIDE.
+        """
+        self.stride = config.DETECTOR_STRIDE if stride is None else stride
+        self._tracker = None  # Created on first use, so runs that hit the tracks cache never import supervision
+
+    @property
+    def tracker(self):
+        """
+        Returns the ByteTrack tracker, creating it on first access.
+
+        :return: The supervision ByteTrack tracker.
+        """
+        if self._tracker is None:
+            import supervision as sv
+
+            self._tracker = sv.ByteTrack(
+                track_activation_threshold=config.TRACKER_TRACK_ACTIVATION_THRESHOLD,
+                lost_track_buffer=max(config.TRACKER_LOST_TRACK_BUFFER // self.stride, 1),
+                minimum_matching_threshold=config.TRACKER_MINIMUM_MATCHING_THRESHOLD,
+                minimum_consecutive_frames=max(-(-config.TRACKER_MINIMUM_CONSECUTIVE_FRAMES // self.stride), 1)
+            )
+        return self._tracker
 
     def initialize_tracking_dictionaries(self, frames_number: int) -> Dict[str, List[Dict[int, Dict]]]:
         """
@@ -28,38 +54,103 @@ class ObjectTracker:
             constants.BALL_KEY: [{} for _ in range(frames_number)]
         }
 
-    def get_cached_tracks(self, cache_path: str) -> Optional[Dict[str, List[Dict[int, Dict]]]]:
+    def get_cache_settings(self) -> Dict:
+        """
+        Returns the tracker settings that affect the tracks, used to key the tracks cache.
+
+        :return: Dictionary of tracker settings.
+        """
+        return {
+            'track_activation_threshold': config.TRACKER_TRACK_ACTIVATION_THRESHOLD,
+            'lost_track_buffer': config.TRACKER_LOST_TRACK_BUFFER,
+            'minimum_matching_threshold': config.TRACKER_MINIMUM_MATCHING_THRESHOLD,
+            'minimum_consecutive_frames': config.TRACKER_MINIMUM_CONSECUTIVE_FRAMES,
+            'frame_rate': config.FRAME_RATE
+        }
+
+    def get_cached_tracks(self, cache_path: str) -> Optional[TrackStore]:
         """
         Returns cached tracks if they exist. Otherwise, returns None.
+        The cached arrays are memory-mapped, so frames are only read when they are accessed.
 
-        :param cache_path: Path to the cached tracks file.
+        :param cache_path: Path to the cache entry of the tracks.
         :return: Cached tracks or None if not available.
         """
-        if cache_path and os.path.exists(cache_path):
-            print(f"Loading cached tracks from {cache_path}")
-            return cache_utils.load_tracks_from_cache(cache_path)
-        else:
+        arrays = cache_utils.load_arrays_from_cache(cache_path) if cache_path else None
+        if arrays is None:
             print("No cached tracks found.")
             return None
 
+        print(f"Loaded cached tracks from {cache_path}")
+        return TrackStore.from_arrays(arrays)
+
+    def import_legacy_tracks(self, legacy_cache_path: str, cache_path: str, frames_number: Optional[int] = None,
+                             metadata: Optional[Dict] = None) -> Optional[TrackStore]:
+        """
+        Converts tracks pickled in the dictionary layout by earlier versions into a cache entry, once.
+        The pickle is not keyed on its video, so tracks with another number of frames are not imported.
+
+        :param legacy_cache_path: Path to the pickled tracks.
+        :param cache_path: Path to the cache entry the tracks are saved to.
+        :param frames_number: Number of frames of the video, None if unknown.
+        :param metadata: Optional description of the inputs the tracks were computed from.
+        :return: The imported tracks, or None if nothing was imported.
+        """
+        if os.path.exists(cache_path) or not os.path.exists(legacy_cache_path):
+            return None
+
+        tracks = cache_utils.load_tracks_from_cache(legacy_cache_path)
+        if tracks is None:
+            return None
+
+        tracks = TrackStore.from_tracks(tracks)
+        if frames_number is not None and len(tracks) != frames_number:
+            print(f"Not importing {legacy_cache_path}: {len(tracks)} frames, but the video has {frames_number}")
+            return None
+
+        self.save_tracks_to_cache(tracks, cache_path, metadata)
+        return tracks
+
+    def save_tracks_to_cache(self, tracks: TrackStore, cache_path: str, metadata: Optional[Dict] = None):
+        """
+        Saves tracks to the cache so detection and tracking can be skipped in future runs.
+
+        :param tracks: The tracks to cache.
+        :param cache_path: Path to the cache entry of the tracks.
+        :param metadata: Optional description of the inputs the tracks were computed from.
+        """
+        cache_utils.save_arrays_to_cache(tracks.to_arrays(), cache_path, metadata)
+
     def track_objects(self, detections: List, frames_number: int) -> Dict[str, List[Dict[int, Dict]]]:
         """
         Tracks objects (players, referees, and ball) across video frames.
 
-        :param detections: List of detections for each frame.
+        :param detections: DetectionStore, or any sequence of supervision detections with one entry per frame.
         :param frames_number: Number of frames in the video.
         :return: Updated tracks with players, referees, and ball information.
         """
         tracks = self.initialize_tracking_dictionaries(frames_number)
+        self.update_tracks(tracks, detections, start_frame=0)
+        return tracks
+
+    def update_tracks(self, tracks: Dict[str, List[Dict[int, Dict]]], detections: List, start_frame: int):
+        """
+        Runs the tracker over detections and stores the results in the tracking data.
 
-        for frame_number, detection in enumerate(detections):
-            detection_supervision = sv.Detections.from_ultralytics(detection)
-            detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
+        :param tracks: The tracking data dictionary.
+        :param detections: DetectionStore, or any sequence of supervision detections with one entry per frame.
+        :param start_frame: Frame number of the first detection in the list.
+        """
+        # Frames skipped by strided detection are left empty and filled in by interpolate_skipped_frames
+        detected = getattr(detections, 'detected', None)
+        for offset, detection in enumerate(detections):
+            frame_number = start_frame + offset
+            if detected is not None and not detected[offset]:
+                continue
+            detection_with_tracks = self.tracker.update_with_detections(detection)
             
             self.update_player_and_referee_tracks(tracks, frame_number, detection_with_tracks)
-            self.update_ball_tracks(tracks, frame_number, detection_supervision)
-
-        return tracks
+            self.update_ball_tracks(tracks, frame_number, detection)
 
     def update_player_and_referee_tracks(self, tracks: Dict[str, List[Dict[int, Dict]]], frame_number: int, 
                                          detection_with_tracks: List):
@@ -82,7 +173,7 @@ class ObjectTracker:
                 tracks[constants.REFEREES_KEY][frame_number][track_id] = {constants.BOUNDING_BOX_KEY: bounding_box}
 
     def update_ball_tracks(self, tracks: Dict[str, List[Dict[int, Dict]]], frame_number: int, 
-                           detection_supervision: sv.Detections):
+                           detection_supervision: 'sv.Detections'):
         """
         Updates ball tracks in the tracking data.
 
@@ -95,71 +186,110 @@ class ObjectTracker:
             class_id = frame_detection[3]
 
             if class_id == constants.BALL_CLASS_ID:
-                tracks[constants.BALL_KEY][frame_number][1] = {constants.BOUNDING_BOX_KEY: bounding_box}
+                tracks[constants.BALL_KEY][frame_number][BALL_TRACK_ID] = {constants.BOUNDING_BOX_KEY: bounding_box}
 
-    def interpolate_ball_positions(self, ball_positions: List[Dict[int, Dict]], min_consecutive_frames: int = 8) -> List[Dict[int, Dict]]:
+    def interpolate_skipped_frames(self, tracks: TrackStore) -> TrackStore:
         """
-        Interpolates missing ball positions to ensure smoother tracking,
-        discarding false positives based on consecutive frame threshold.
+        Fills in the frames skipped by strided detection. The box of every player, referee, and the ball
+        is interpolated linearly between consecutive detected frames in which the track is present, and
+        held after the last detected frame. Filled rows keep the team of the earlier detected frame.
 
-        :param ball_positions: List of dictionaries representing ball positions per frame.
+        :param tracks: Tracks built from strided detections.
+        :return: Tracks with positions in every frame.
+        """
+        if self.stride <= 1 or len(tracks.frame) == 0:
+            return tracks
+
+        # Sort rows by class, track, and frame, so every track's sightings are consecutive
+        order = np.lexsort((tracks.frame, tracks.track_id, tracks.object_class))
+        frame, track_id, object_class = tracks.frame[order], tracks.track_id[order], tracks.object_class[order]
+        bounding_box, team = tracks.bounding_box[order].astype(np.float64), tracks.team[order]
+
+        # Pairs of sightings of the same track at most `stride` frames apart have skipped frames between them
+        same_track = (track_id[1:] == track_id[:-1]) & (object_class[1:] == object_class[:-1])
+        gap = frame[1:] - frame[:-1]
+        starts = np.flatnonzero(same_track & (gap > 1) & (gap <= self.stride))
+        steps = gap[starts] - 1
+
+        pair = np.repeat(starts, steps)
+        step = np.arange(len(pair)) - np.repeat(np.cumsum(steps) - steps, steps) + 1
+        weight = (step / gap[pair])[:, None]
+        filled_box = bounding_box[pair] * (1 - weight) + bounding_box[pair + 1] * weight
+        filled_frame, filled_rows = frame[pair] + step, pair
+
+        # Hold the tracks of the last detected frame until the end of the video
+        last_detected_frame = (tracks.frames_number - 1) // self.stride * self.stride
+        tail_steps = tracks.frames_number - 1 - last_detected_frame
+        if tail_steps > 0:
+            last_rows = np.flatnonzero(frame == last_detected_frame)
+            held_rows = np.repeat(last_rows, tail_steps)
+            held_frame = frame[held_rows] + np.tile(np.arange(1, tail_steps + 1), len(last_rows))
+            filled_box = np.concatenate([filled_box, bounding_box[held_rows]])
+            filled_frame = np.concatenate([filled_frame, held_frame])
+            filled_rows = np.concatenate([filled_rows, held_rows])
+
+        return tracks.with_rows(filled_frame, track_id[filled_rows], object_class[filled_rows], filled_box,
+                                team[filled_rows], np.zeros(len(filled_rows), dtype=bool))
+
+    def smooth_ball_track(self, tracks: TrackStore, min_consecutive_frames: int = 8) -> TrackStore:
+        """
+        Discards false ball positions and interpolates the missing ones on the columns of a store.
+
+        :param tracks: The tracks.
         :param min_consecutive_frames: Minimum number of consecutive frames required to consider a new position valid.
-        :return: Updated list with interpolated positions.
+        :return: Tracks in which the ball has the smoothed position in every frame.
         """
-        ball_positions_data = [
-            entry.get(1, {}).get(constants.BOUNDING_BOX_KEY, [None, None, None, None]) 
-            for entry in ball_positions
-        ]
+        ball_positions = self.get_ball_positions(tracks)
+        ball_positions, _, _ = ball_smoother.filter_false_positives(ball_positions, min_consecutive_frames)
+        return self.with_ball_positions(tracks, ball_smoother.interpolate_positions(ball_positions))
 
-        valid_positions = self.filter_false_positives(ball_positions_data, min_consecutive_frames)
+    def get_ball_positions(self, tracks: TrackStore) -> np.ndarray:
+        """
+        Returns the ball bounding box of every frame.
 
-        df_ball_positions = pd.DataFrame(valid_positions, columns=['x1', 'y1', 'x2', 'y2'])
-        df_ball_positions.interpolate(method='linear', limit_direction='both', inplace=True)
-        df_ball_positions.bfill(inplace=True)
+        :param tracks: The tracks.
+        :return: Array of shape (frames, 4), NaN in frames without a ball.
+        """
+        ball_rows = np.flatnonzero((tracks.object_class == TRACK_KEYS.index(constants.BALL_KEY)) & (tracks.track_id == BALL_TRACK_ID))
+        ball_positions = np.full((len(tracks), 4), np.nan)
+        ball_positions[tracks.frame[ball_rows]] = tracks.bounding_box[ball_rows]
+        return ball_positions
 
-        interpolated_positions = df_ball_positions.to_numpy().tolist()
-        updated_ball_positions = [
-            {1: {constants.BOUNDING_BOX_KEY: pos}} if pos != [None, None, None, None] else {}
-            for pos in interpolated_positions
-        ]
+    def with_ball_positions(self, tracks: TrackStore, ball_positions: np.ndarray) -> TrackStore:
+        """
+        Returns a new store in which the ball rows are replaced by the given positions.
+
+        :param tracks: The tracks.
+        :param ball_positions: Array of shape (frames, 4), NaN in frames without a ball.
+        :return: The updated TrackStore.
+        """
+        keep = tracks.object_class != TRACK_KEYS.index(constants.BALL_KEY)
+        store = TrackStore(tracks.frame[keep], tracks.track_id[keep], tracks.object_class[keep], tracks.bounding_box[keep],
+                           tracks.team[keep], tracks.has_ball[keep], len(tracks), tracks.palette)
 
-        return updated_ball_positions
+        ball_frames = np.flatnonzero(~np.isnan(ball_positions).any(axis=1))
+        return store.with_rows(ball_frames, np.full(len(ball_frames), BALL_TRACK_ID),
+                               np.full(len(ball_frames), TRACK_KEYS.index(constants.BALL_KEY)), ball_positions[ball_frames],
+                               np.full(len(ball_frames), NO_TEAM), np.zeros(len(ball_frames), dtype=bool))
 
-    def filter_false_positives(self, positions: List[List[Optional[float]]], min_consecutive_frames: int) -> List[List[Optional[float]]]:
+    def interpolate_ball_positions(self, ball_positions: List[Dict[int, Dict]], min_consecutive_frames: int = 8) -> List[Dict[int, Dict]]:
         """
-        Filters out false positives in ball positions based on consecutive frames threshold.
+        Interpolates missing ball positions to ensure smoother tracking,
+        discarding false positives based on consecutive frame threshold.
 
-        :param positions: List of positions per frame.
+        :param ball_positions: List of dictionaries representing ball positions per frame.
         :param min_consecutive_frames: Minimum number of consecutive frames required to consider a new position valid.
-        :return: List of positions with false positives filtered out.
+        :return: Updated list with interpolated positions.
         """
-        valid_positions = []
-        last_valid_position = None
-        consecutive_frames = 0
+        positions = np.array([
+            entry[BALL_TRACK_ID][constants.BOUNDING_BOX_KEY] if BALL_TRACK_ID in entry else [np.nan] * 4
+            for entry in ball_positions
+        ], dtype=np.float64).reshape(-1, 4)
 
-        for pos in positions:
-            if pos == [None, None, None, None]:
-                valid_positions.append(pos)
-                consecutive_frames = 0
-                continue
+        positions, _, _ = ball_smoother.filter_false_positives(positions, min_consecutive_frames)
+        interpolated_positions = ball_smoother.interpolate_positions(positions)
 
-            if last_valid_position is not None:
-                current_center = ((pos[0] + pos[2]) / 2, (pos[1] + pos[3]) / 2)
-                last_center = ((last_valid_position[0] + last_valid_position[2]) / 2, (last_valid_position[1] + last_valid_position[3]) / 2)
-
-                if current_center != last_center:
-                    consecutive_frames += 1
-                else:
-                    consecutive_frames = 0
-
-                if consecutive_frames >= min_consecutive_frames:
-                    last_valid_position = pos
-                    valid_positions.append(pos)
-                else:
-                    valid_positions.append([None, None, None, None])
-            else:
-                last_valid_position = pos
-                valid_positions.append(pos)
-                consecutive_frames = 1
-
-        return valid_positions
+        return [
+            {BALL_TRACK_ID: {constants.BOUNDING_BOX_KEY: position}} if not np.isnan(position).any() else {}
+            for position in interpolated_positions.tolist()
+        ]
@@ -0,0 +1,267 @@
+import cv2
+import numpy as np
+from cache import cache_utils
+
+
+class FrameIndex:
+    def __init__(self, frames_number, keyframes, fps=0.0, width=0, height=0):
+        """
+        Holds the number of frames of a video and the frame numbers of its keyframes, which are
+        the frames a decoder can start from without decoding the frames before them.
+
+        Args:
+            frames_number (int): Exact number of frames in the video.
+            keyframes (numpy.ndarray): Sorted frame numbers of the keyframes; always starts with 0.
+            fps (float): Frame rate of the video.
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+        """
+        self.frames_number = int(frames_number)
+        self.keyframes = np.union1d(np.asarray(keyframes, dtype=np.int64), [0])
+        self.fps = float(fps)
+        self.width = int(width)
+        self.height = int(height)
+
+    def __len__(self):
+        return self.frames_number
+
+    def get_keyframe(self, frame_number):
+        """
+        Returns the last keyframe at or before a frame, where decoding must start to reach that frame.
+
+        Args:
+            frame_number (int): Number of the frame.
+
+        Returns:
+            int: Frame number of the keyframe.
+        """
+        return int(self.keyframes[np.searchsorted(self.keyframes, frame_number, side='right') - 1])
+
+    def to_arrays(self):
+        return {
+            'frames_number': np.array(self.frames_number, dtype=np.int64),
+            'keyframes': self.keyframes,
+            'fps': np.array(self.fps, dtype=np.float64),
+            'size': np.array([self.width, self.height], dtype=np.int64)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        width, height = arrays['size'].tolist()
+        return cls(arrays['frames_number'], np.array(arrays['keyframes']), arrays['fps'], width, height)
+
+
+def build_frame_index(video_path):
+    """
+    Builds the frame index of a video in one pass over its compressed packets. The packets are read
+    without decoding them, so indexing takes a fraction of the time of decoding the video. Where the
+    backend cannot read packets, the frames are decoded to count them and only frame 0 is used as a
+    keyframe, so seeks always decode forward from the start and stay exact.
+
+    Args:
+        video_path (str): Path to the video file.
+
+    Returns:
+        FrameIndex: The frame index of the video.
+    """
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    raw_packets = cap.isOpened() and cap.get(cv2.CAP_PROP_FORMAT) == -1
+    if not raw_packets:
+        cap.release()
+        cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video file: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    frames_number, keyframes = 0, [0]
+    try:
+        while cap.grab():
+            if raw_packets and frames_number > 0 and cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(frames_number)
+            frames_number += 1
+    finally:
+        cap.release()
+
+    return FrameIndex(frames_number, keyframes, fps, width, height)
+
+
+def get_frame_index(video_path, cache_path=None):
+    """
+    Returns the frame index of a video from the cache, building and caching it if it is missing.
+
+    Args:
+        video_path (str): Path to the video file.
+        cache_path (str): Path to the cache entry of the index; the index is not cached if None.
+
+    Returns:
+        FrameIndex: The frame index of the video.
+    """
+    arrays = cache_utils.load_arrays_from_cache(cache_path) if cache_path else None
+    if arrays is not None:
+        return FrameIndex.from_arrays(arrays)
+
+    frame_index = build_frame_index(video_path)
+    print(f"Indexed {frame_index.frames_number} frames and {len(frame_index.keyframes)} keyframes of {video_path}")
+    if cache_path:
+        cache_utils.save_arrays_to_cache(frame_index.to_arrays(), cache_path, {'video_path': video_path})
+    return frame_index
+
+
+class VideoFrameReader:
+    def __init__(self, video_path, frame_index=None):
+        """
+        Decodes arbitrary frames, frame ranges, and sparse sets of frames of a video. Requested frames
+        are decoded in ascending order: the reader decodes forward from its current position, and only
+        seeks when the keyframe before the next requested frame lies beyond that position or the frame
+        lies behind it, so every frame between the keyframe and the requested frame is decoded once.
+
+        Args:
+            video_path (str): Path to the video file.
+            frame_index (FrameIndex): Frame index of the video, built here if omitted.
+        """
+        self.video_path = video_path
+        self.frame_index = frame_index or build_frame_index(video_path)
+        self.capture = None
+        self.position = 0  # Number of the frame the next read returns
+        self.decoded_frames = 0
+        self.seeks_number = 0
+
+    def __len__(self):
+        return len(self.frame_index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.read_frames(range(*key.indices(len(self))))
+        if key < 0:
+            key += len(self)
+        return self.read_frame(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_frame(self, frame_number):
+        """
+        Decodes one frame.
+
+        Args:
+            frame_number (int): Number of the frame.
+
+        Returns:
+            numpy.ndarray: The decoded frame.
+        """
+        self._move_to(frame_number)
+        return self._read()
+
+    def iter_range(self, start=0, stop=None):
+        """
+        Decodes a range of consecutive frames lazily, yielding one frame at a time.
+
+        Args:
+            start (int): Number of the first frame.
+            stop (int): Number of the frame after the last frame, None to read to the end of the video.
+
+        Yields:
+            numpy.ndarray: The next decoded frame.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        self._move_to(start)
+        for _ in range(start, stop):
+            yield self._read()
+
+    def read_range(self, start=0, stop=None):
+        """
+        Decodes a range of consecutive frames.
+
+        Args:
+            start (int): Number of the first frame.
+            stop (int): Number of the frame after the last frame, None to read to the end of the video.
+
+        Returns:
+            list: List of frames as numpy array objects.
+        """
+        return list(self.iter_range(start, stop))
+
+    def iter_frames(self, frame_numbers):
+        """
+        Decodes a sparse set of frames lazily, in ascending order and each frame once.
+
+        Args:
+            frame_numbers (Iterable[int]): Numbers of the frames, in any order and possibly repeated.
+
+        Yields:
+            tuple: The frame number and the decoded frame.
+        """
+        for frame_number in np.unique(np.asarray(list(frame_numbers), dtype=np.int64)).tolist():
+            yield frame_number, self.read_frame(frame_number)
+
+    def read_frames(self, frame_numbers):
+        """
+        Decodes a sparse set of frames, decoding each frame once.
+
+        Args:
+            frame_numbers (Iterable[int]): Numbers of the frames, in any order and possibly repeated.
+
+        Returns:
+            list: The frames in the requested order; a repeated frame number gives the same array.
+        """
+        frame_numbers = list(frame_numbers)
+        frames = dict(self.iter_frames(frame_numbers))
+        return [frames[frame_number] for frame_number in frame_numbers]
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def _open(self):
+        self.close()
+        self.capture = cv2.VideoCapture(self.video_path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Cannot open video file: {self.video_path}")
+        self.position = 0
+
+    def _move_to(self, frame_number):
+        if not 0 <= frame_number < len(self):
+            raise IndexError(f"Frame {frame_number} is outside the video with {len(self)} frames")
+        if self.capture is None:
+            self._open()
+
+        keyframe = self.frame_index.get_keyframe(frame_number)
+        if frame_number < self.position or keyframe > self.position:
+            self.seeks_number += 1
+            if keyframe == 0:
+                self._open()
+            else:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+                self.position = keyframe
+                if int(self.capture.get(cv2.CAP_PROP_POS_FRAMES)) != keyframe:
+                    # The backend could not seek exactly, so decode forward from the start instead
+                    print(f"Inexact seek to frame {keyframe} of {self.video_path}, decoding from the start")
+                    self._open()
+
+        while self.position < frame_number:
+            if not self.capture.grab():
+                raise IndexError(f"Cannot decode frame {self.position} of {self.video_path}")
+            self.position += 1
+            self.decoded_frames += 1
+
+    def _read(self):
+        ret, frame = self.capture.read()
+        if not ret:
+            raise IndexError(f"Cannot decode frame {self.position} of {self.video_path}")
+        self.position += 1
+        self.decoded_frames += 1
+        return frame
+
+
+# Example usage:
+# frame_index = get_frame_index('match.mp4', 'cache/frame_index')
+# with VideoFrameReader('match.mp4', frame_index) as reader:
+#     first_frames = reader.read_range(0, 5)
+#     sampled_frames = reader.read_frames([120, 4800, 9600])
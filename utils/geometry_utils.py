@@ -1,4 +1,4 @@
-import pandas as pd
+import numpy as np
 
 def get_center_of_bounding_box(bounding_box):
     x1, y1, x2, y2 = bounding_box
@@ -17,26 +17,42 @@ def get_foot_position(bounding_box):
     x1, y1, x2, y2 = bounding_box
     return int((x1 + x2) / 2), int(y2)
 
+def pairwise_iou(bounding_boxes):
+    """
+    Computes the IoU of every pair of bounding boxes in one NumPy call.
+
+    :param bounding_boxes: Array of boxes (x1, y1, x2, y2) with shape (n, 4), or (frames, n, 4) for a batch
+                           of frames; frames with fewer boxes can be padded with NaN rows.
+    :return: IoU matrix with shape (n, n), or (frames, n, n); pairs with padding rows are NaN.
+    """
+    return iou_matrix(bounding_boxes, bounding_boxes)
+
+def iou_matrix(bounding_boxes_a, bounding_boxes_b):
+    """
+    Computes the IoU of every box of one set with every box of another set in one NumPy call.
+
+    :param bounding_boxes_a: Array of boxes (x1, y1, x2, y2) with shape (n, 4), or (frames, n, 4).
+    :param bounding_boxes_b: Array of boxes with shape (m, 4), or (frames, m, 4).
+    :return: IoU matrix with shape (n, m), or (frames, n, m); pairs with NaN rows are NaN.
+    """
+    boxes_a = np.asarray(bounding_boxes_a, dtype=np.float64)
+    boxes_b = np.asarray(bounding_boxes_b, dtype=np.float64)
+    pairs_a, pairs_b = boxes_a[..., :, None, :], boxes_b[..., None, :, :]
+
+    inter_width = np.clip(np.minimum(pairs_a[..., 2], pairs_b[..., 2]) - np.maximum(pairs_a[..., 0], pairs_b[..., 0]), 0, None)
+    inter_height = np.clip(np.minimum(pairs_a[..., 3], pairs_b[..., 3]) - np.maximum(pairs_a[..., 1], pairs_b[..., 1]), 0, None)
+    inter_area = inter_width * inter_height
+
+    area_a = (boxes_a[..., 2] - boxes_a[..., 0]) * (boxes_a[..., 3] - boxes_a[..., 1])
+    area_b = (boxes_b[..., 2] - boxes_b[..., 0]) * (boxes_b[..., 3] - boxes_b[..., 1])
+    union_area = area_a[..., :, None] + area_b[..., None, :] - inter_area
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(union_area > 0, inter_area / union_area, np.where(np.isnan(union_area), np.nan, 0.0))
+
 def get_triangle_from_bounding_box(bounding_box):
     x1, y1, x2, y2 = bounding_box
     center_x, center_y = get_center_of_bounding_box(bounding_box)
     top_point = (center_x, y1)
     bottom_left_point = (x1, y2)
     bottom_right_point = (x2, y2)
-    return [top_point, bottom_left_point, bottom_right_point]
-
-def interpolate_ball_positions(self, ball_positions):
-        # Извлачење bounding box-ова лопте
-        ball_positions = [x.get(1, {}).get('bbox', []) for x in ball_positions]
-
-        # Креирање DataFrame-а за лакшу интерполацију
-        df_ball_positions = pd.DataFrame(ball_positions, columns=['x1', 'y1', 'x2', 'y2'])
-
-        # Интерполација недостајућих вредности
-        df_ball_positions = df_ball_positions.interpolate(method='linear', limit_direction='both')
-        df_ball_positions = df_ball_positions.bfill()
-
-        # Конвертовање назад у оригинални формат
-        ball_positions = [{1: {"bbox": x}} for x in df_ball_positions.to_numpy().tolist()]
-
-        return ball_positions
\ No newline at end of file
+    return [top_point, bottom_left_point, bottom_right_point]
\ No newline at end of file
@@ -0,0 +1,229 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+METRIC_PREFIX = 'football_analysis'
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size of the process so far.
+
+    Returns:
+        int: Peak RSS in bytes, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+class StageMetrics:
+    def __init__(self, name):
+        """
+        Holds the measurements of one pipeline stage. A stage entered several times, e.g. once
+        per window of frames, adds up its wall time, frames, and item counts.
+
+        Args:
+            name (str): Name of the stage.
+        """
+        self.name = name
+        self.seconds = 0.0
+        self.frames = 0
+        self.items = {}
+        self.peak_rss = None
+
+    def add_items(self, name, count):
+        """
+        Adds to a count of items the stage has produced or processed, e.g. detections or track rows.
+
+        Args:
+            name (str): Name of the items.
+            count (int): Number of items to add.
+        """
+        self.items[name] = self.items.get(name, 0) + int(count)
+
+    def to_dict(self):
+        return {
+            'seconds': self.seconds,
+            'frames': self.frames,
+            'frames_per_second': self.frames / self.seconds if self.seconds > 0 and self.frames else None,
+            'peak_rss_bytes': self.peak_rss,
+            'items': dict(self.items)
+        }
+
+
+class MetricsRecorder:
+    def __init__(self, labels=None):
+        """
+        Records the wall time, frames per second, peak RSS, and item counts of every pipeline stage,
+        and counts of repeated events, and writes them as JSON and as a Prometheus textfile.
+
+        Args:
+            labels (dict): Labels added to every Prometheus sample, e.g. the video name.
+        """
+        self.labels = dict(labels) if labels else {}
+        self.stages = {}
+        self.counters = {}
+        self.start_time = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, frames=0):
+        """
+        Times a block of code as a pipeline stage. The peak RSS is taken when the block ends,
+        so it is the highest memory use of the process up to the end of the stage.
+
+        Args:
+            name (str): Name of the stage.
+            frames (int): Number of frames the block processes; can also be added to `frames` of the yielded stage.
+
+        Yields:
+            StageMetrics: The measurements of the stage, for adding frames and item counts.
+        """
+        stage = self.stages.setdefault(name, StageMetrics(name))
+        stage.frames += frames
+        start_time = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds += time.perf_counter() - start_time
+            stage.peak_rss = get_peak_rss()
+
+    def increment(self, name, value=1):
+        """
+        Adds to the counter of an event that is too frequent to print every time.
+
+        Args:
+            name (str): Name of the event.
+            value (int): Number of occurrences to add.
+        """
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def add_counters(self, counters):
+        """
+        Adds a dictionary of event counts, e.g. the events counted by a component.
+
+        Args:
+            counters (dict): Dictionary mapping event names to counts.
+        """
+        for name, value in counters.items():
+            self.increment(name, value)
+
+    def get_metrics(self):
+        """
+        Returns all measurements.
+
+        Returns:
+            dict: Labels, total wall time, peak RSS, measurements per stage, and event counters.
+        """
+        return {
+            'labels': dict(self.labels),
+            'timestamp': time.time(),
+            'total_seconds': time.perf_counter() - self.start_time,
+            'peak_rss_bytes': get_peak_rss(),
+            'stages': {name: stage.to_dict() for name, stage in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+    def format_prometheus(self, metrics=None):
+        """
+        Formats the measurements in the Prometheus text exposition format.
+
+        Args:
+            metrics (dict): Measurements from get_metrics, taken now when omitted.
+
+        Returns:
+            str: The Prometheus textfile content.
+        """
+        metrics = self.get_metrics() if metrics is None else metrics
+        lines = []
+
+        def add_metric(name, metric_type, help_text, samples):
+            samples = [(labels, value) for labels, value in samples if value is not None]
+            if not samples:
+                return
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}_{name}{self._format_labels(labels)} {value}")
+
+        stages = metrics['stages']
+        add_metric('run_seconds', 'gauge', "Wall time of the last run.", [({}, metrics['total_seconds'])])
+        add_metric('peak_rss_bytes', 'gauge', "Peak resident set size of the last run.", [({}, metrics['peak_rss_bytes'])])
+        add_metric('last_run_timestamp_seconds', 'gauge', "Unix time at which the last run finished.", [({}, metrics['timestamp'])])
+        add_metric('stage_seconds', 'gauge', "Wall time of each pipeline stage.",
+                   [({'stage': name}, stage['seconds']) for name, stage in stages.items()])
+        add_metric('stage_frames', 'gauge', "Frames processed by each pipeline stage.",
+                   [({'stage': name}, stage['frames']) for name, stage in stages.items()])
+        add_metric('stage_frames_per_second', 'gauge', "Throughput of each pipeline stage.",
+                   [({'stage': name}, stage['frames_per_second']) for name, stage in stages.items()])
+        add_metric('stage_peak_rss_bytes', 'gauge', "Peak resident set size of the process at the end of each stage.",
+                   [({'stage': name}, stage['peak_rss_bytes']) for name, stage in stages.items()])
+        add_metric('stage_items', 'gauge', "Items produced or processed by each pipeline stage.",
+                   [({'stage': name, 'item': item}, count) for name, stage in stages.items() for item, count in stage['items'].items()])
+        add_metric('events_total', 'counter', "Occurrences of repeated events during the last run.",
+                   [({'event': name}, count) for name, count in metrics['counters'].items()])
+        return '\n'.join(lines) + '\n'
+
+    def save(self, json_path=None, prometheus_path=None):
+        """
+        Writes the measurements as JSON and as a Prometheus textfile. Files are replaced atomically,
+        so a node exporter reading the textfile directory never sees a partial file.
+
+        Args:
+            json_path (str): Path of the JSON file, skipped when None.
+            prometheus_path (str): Path of the Prometheus textfile (ending in .prom for the node exporter), skipped when None.
+        """
+        metrics = self.get_metrics()
+        if json_path:
+            self._write_atomically(json_path, json.dumps(metrics, indent=2))
+        if prometheus_path:
+            self._write_atomically(prometheus_path, self.format_prometheus(metrics))
+
+    def print_summary(self):
+        """
+        Prints the measurements of every stage and the event counters.
+        """
+        for name, stage in self.stages.items():
+            stage = stage.to_dict()
+            throughput = f", {stage['frames_per_second']:.1f} frames/s" if stage['frames_per_second'] else ''
+            items = ''.join(f", {count} {item}" for item, count in stage['items'].items())
+            print(f"Stage {name}: {stage['seconds']:.2f}s{throughput}{items}")
+        for name, count in self.counters.items():
+            print(f"Event {name}: {count} times")
+        peak_rss = get_peak_rss()
+        if peak_rss is not None:
+            print(f"Peak memory: {peak_rss / 2 ** 20:.0f} MiB")
+
+    def _format_labels(self, labels):
+        labels = {**self.labels, **labels}
+        if not labels:
+            return ''
+        escaped = {name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for name, value in labels.items()}
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped.items()) + '}'
+
+    def _write_atomically(self, path, content):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'w') as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+
+
+# Example usage:
+# metrics = MetricsRecorder({'video': 'match.mp4'})
+# with metrics.stage('detect', frames=len(frames)) as stage:
+#     detections = detector.detect_objects_on_frames(frames)
+#     stage.add_items('detections', len(detections.xyxy))
+# metrics.increment('team_color_changes')
+# metrics.save('metrics.json', 'football_analysis.prom')
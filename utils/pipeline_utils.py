@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+import config
+
+# Markers for the kind of entry put into a stage queue
+_ITEM, _ERROR, _END = range(3)
+
+
+class BackgroundStage:
+    def __init__(self, iterable, name, max_queue_size):
+        """
+        Runs an iterable in a background thread and hands its items over through a bounded queue,
+        so the producer works ahead while the consumer is busy, but never more than max_queue_size items.
+
+        Args:
+            iterable: Source of items, e.g. a generator of decoded or annotated frames.
+            name (str): Name of the stage, used in the statistics.
+            max_queue_size (int): Maximum number of items waiting in the queue.
+        """
+        self.name = name
+        self.max_queue_size = max_queue_size
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.stopped = threading.Event()
+
+        # Queue depth seen by the consumer on every get, and time the consumer waited for items
+        self.items_number = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.wait_time = 0.0
+
+        self.thread = threading.Thread(target=self._produce, args=(iterable,), name=f"pipeline-{name}", daemon=True)
+        self.thread.start()
+
+    def _produce(self, iterable):
+        try:
+            for item in iterable:
+                if not self._put((_ITEM, item)):
+                    return
+        except BaseException as error:
+            self._put((_ERROR, error))
+            return
+        self._put((_END, None))
+
+    def _put(self, entry):
+        # Waits for space in the queue, giving up when the consumer has stopped
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        try:
+            while True:
+                depth = self.queue.qsize()
+                start_time = time.perf_counter()
+                kind, value = self.queue.get()
+                self.wait_time += time.perf_counter() - start_time
+
+                if kind == _END:
+                    return
+                if kind == _ERROR:
+                    raise value
+
+                self.items_number += 1
+                self.depth_total += depth
+                self.max_depth = max(self.max_depth, depth)
+                yield value
+        finally:
+            self.close()
+
+    def get_queue_depth(self):
+        """
+        Returns the number of items the producer has ready, e.g. to tell whether the consumer has caught up.
+
+        Returns:
+            int: Number of entries waiting in the queue.
+        """
+        return self.queue.qsize()
+
+    def close(self):
+        """
+        Stops the background thread, e.g. when the consumer stops early.
+        """
+        self.stopped.set()
+
+    def get_stats(self):
+        """
+        Returns the queue statistics of the stage. A queue that is mostly full means the consumer
+        is the bottleneck; a mostly empty queue with a long wait time means this stage is.
+
+        Returns:
+            dict: Name, queue size, number of items, mean and maximum queue depth, and consumer wait time in seconds.
+        """
+        return {
+            'name': self.name,
+            'max_queue_size': self.max_queue_size,
+            'items': self.items_number,
+            'mean_depth': self.depth_total / self.items_number if self.items_number else 0.0,
+            'max_depth': self.max_depth,
+            'consumer_wait_time': self.wait_time
+        }
+
+
+class Pipeline:
+    def __init__(self, max_queue_size=None):
+        """
+        Chains processing stages, each running in its own thread and joined by bounded queues,
+        so decoding, compute, and encoding overlap instead of running one after another.
+
+        Args:
+            max_queue_size (int): Maximum number of items waiting between two stages.
+        """
+        self.max_queue_size = config.PIPELINE_QUEUE_SIZE if max_queue_size is None else max_queue_size
+        self.stages = []
+
+    def add_stage(self, iterable, name):
+        """
+        Starts consuming an iterable in a background thread.
+
+        Args:
+            iterable: Source of items; usually built on the iterator returned by the previous stage.
+            name (str): Name of the stage.
+
+        Returns:
+            BackgroundStage: Iterator over the items of the stage.
+        """
+        stage = BackgroundStage(iterable, name, self.max_queue_size)
+        self.stages.append(stage)
+        return stage
+
+    def close(self):
+        """
+        Stops all stages of the pipeline.
+        """
+        for stage in self.stages:
+            stage.close()
+
+    def get_stats(self):
+        """
+        Returns the queue statistics of every stage.
+
+        Returns:
+            list: One dictionary per stage, see BackgroundStage.get_stats.
+        """
+        return [stage.get_stats() for stage in self.stages]
+
+    def print_stats(self):
+        """
+        Prints the queue depth of every stage to show which stage is the bottleneck.
+        """
+        for stats in self.get_stats():
+            print(f"Stage {stats['name']}: {stats['items']} items, queue depth mean {stats['mean_depth']:.1f} "
+                  f"max {stats['max_depth']}/{stats['max_queue_size']}, consumer waited {stats['consumer_wait_time']:.2f}s")
+
+
+# Example usage:
+# pipeline = Pipeline()
+# frames = pipeline.add_stage(video_control_utils.iter_video_frames('input.mp4'), 'decode')
+# annotated_frames = pipeline.add_stage((annotate(frame) for frame in frames), 'render')
+# video_control_utils.save_video_stream(annotated_frames, 'output.avi')
+# pipeline.print_stats()
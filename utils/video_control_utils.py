@@ -1,4 +1,6 @@
+import time
 import cv2
+import numpy as np
 
 def read_video(video_path):
     """
@@ -46,6 +48,177 @@ def save_video(video_frames, output_video_path, fps=24, codec='XVID'):
     
     out.release()
 
+def get_frame_count(video_path):
+    """
+    Reads the number of frames reported by the video container, without decoding.
+
+    Args:
+        video_path (str): Path to the video file.
+
+    Returns:
+        int: Number of frames, or None if the container does not report it.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video file: {video_path}")
+
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return frame_count if frame_count > 0 else None
+
+def iter_video_frames(video_path, start_frame=0):
+    """
+    Reads a video lazily, yielding one frame at a time.
+
+    Args:
+        video_path (str): Path to the video file.
+        start_frame (int): Index of the first frame to yield. Default is 0.
+
+    Yields:
+        numpy.ndarray: The next decoded frame.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video file: {video_path}")
+
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+def follow_video_frames(video_path, poll_interval=0.2, idle_timeout=10.0):
+    """
+    Reads a video file that is still being written, yielding frames as they are appended.
+
+    When the end of the written part is reached, the file is reopened after `poll_interval`
+    seconds and read on from the first frame not yielded yet. The last frame decoded before
+    the end may be incomplete, so it is only yielded once more data follows it or the file
+    has stopped growing. The container must be readable while it is written, e.g. MPEG-TS
+    or Matroska, but not MP4.
+
+    Args:
+        video_path (str): Path to the video file; it does not need to exist yet.
+        poll_interval (float): Seconds to wait before looking for new frames.
+        idle_timeout (float): Seconds without new frames after which the video is considered complete.
+
+    Yields:
+        numpy.ndarray: The next decoded frame.
+    """
+    frames_yielded = 0
+    last_growth_time = time.perf_counter()
+
+    while True:
+        held_frame = None
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if cap.isOpened():
+                if frames_yielded > 0:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frames_yielded)
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if held_frame is not None:
+                        yield held_frame
+                        frames_yielded += 1
+                        last_growth_time = time.perf_counter()
+                    held_frame = frame
+        finally:
+            cap.release()
+
+        if time.perf_counter() - last_growth_time > idle_timeout:
+            if held_frame is not None:
+                yield held_frame
+            return
+        time.sleep(poll_interval)
+
+def iter_raw_frames(stream, width, height):
+    """
+    Reads raw BGR frames from a binary stream, e.g. a pipe from
+    `ffmpeg -i <source> -f rawvideo -pix_fmt bgr24 -`.
+
+    Args:
+        stream: Binary file object, e.g. sys.stdin.buffer.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+
+    Yields:
+        numpy.ndarray: The next frame, of shape (height, width, 3).
+    """
+    frame_size = width * height * 3
+    while True:
+        data = stream.read(frame_size)
+        if len(data) < frame_size:
+            return
+        yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3).copy()  # Writable, like decoded frames
+
+def iter_frame_windows(frames, window_size):
+    """
+    Groups a stream of frames into consecutive windows.
+
+    Args:
+        frames (iterable): Iterable of frames, e.g. from iter_video_frames.
+        window_size (int): Maximum number of frames held in one window.
+
+    Yields:
+        tuple: Index of the first frame in the window and the list of frames.
+    """
+    if window_size <= 0:
+        raise ValueError("Window size must be a positive number of frames.")
+
+    window = []
+    start_frame = 0
+    for frame in frames:
+        window.append(frame)
+        if len(window) == window_size:
+            yield start_frame, window
+            start_frame += len(window)
+            window = []
+
+    if window:
+        yield start_frame, window
+
+def save_video_stream(video_frames, output_video_path, fps=24, codec='XVID'):
+    """
+    Saves frames to a video file as they are produced, without collecting them first.
+
+    Args:
+        video_frames (iterable): Iterable of frames as numpy array objects.
+        output_video_path (str): Path where the video will be saved.
+        fps (int): Frames per second for the output video. Default is 24.
+        codec (str): Fourcc codec. Default is 'XVID'.
+
+    Returns:
+        int: Number of frames written.
+    """
+    out = None
+    frames_written = 0
+
+    try:
+        for frame in video_frames:
+            if out is None:
+                height, width = frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*codec)
+                out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
+            out.write(frame)
+            frames_written += 1
+    finally:
+        if out is not None:
+            out.release()
+
+    if frames_written == 0:
+        raise ValueError("The stream of frames is empty, cannot save video.")
+
+    return frames_written
+
 # Example usage:
 # frames = read_video('input_video.mp4')
-# save_video(frames, 'output_video.avi')
\ No newline at end of file
+# save_video(frames, 'output_video.avi')
+# save_video_stream(iter_video_frames('input_video.mp4'), 'output_video.avi')
\ No newline at end of file